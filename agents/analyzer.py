@@ -1,6 +1,17 @@
 from utils.gemini_client import GeminiClient
 from typing import List, Dict, Any
 
+
+def format_context_text(contexts: List[Dict[str, Any]]) -> str:
+    """
+    将上下文列表拼接为提示词中的上下文文本 (分析、生成、审计、修正共用同一格式)
+    """
+    return "\n\n".join([
+        f"【来源：{ctx['metadata']['file_name']}，页码：{ctx['metadata']['page']}】\n{ctx['metadata']['content']}"
+        for ctx in contexts
+    ])
+
+
 class DomainAnalyzer:
     def __init__(self):
         """
@@ -8,22 +19,21 @@ class DomainAnalyzer:
         """
         self.gemini_client = GeminiClient()
     
-    def analyze_context(self, query: str, retrieved_contexts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    def analyze_context(self, query: str, retrieved_contexts: List[Dict[str, Any]], context_text: str = None) -> Dict[str, Any]:
         """
         分析检索到的上下文，为生成回答做准备
         
         Args:
             query: 用户查询
             retrieved_contexts: 检索到的上下文列表
+            context_text: 预先拼接好的上下文文本 (可选，省去重复拼接)
             
         Returns:
             分析结果，包含关键信息、上下文摘要等
         """
         # 准备上下文文本
-        context_text = "\n\n".join([
-            f"【来源：{ctx['metadata']['file_name']}，页码：{ctx['metadata']['page']}】\n{ctx['metadata']['content']}"
-            for ctx in retrieved_contexts
-        ])
+        if context_text is None:
+            context_text = format_context_text(retrieved_contexts)
         
         # 生成上下文摘要和关键信息提取
         analysis_prompt = f"""
@@ -94,7 +104,7 @@ class DomainAnalyzer:
         
         return parsed_result
     
-    def generate_answer(self, query: str, retrieved_contexts: List[Dict[str, Any]], analysis_result: Dict[str, Any]) -> str:
+    def generate_answer(self, query: str, retrieved_contexts: List[Dict[str, Any]], analysis_result: Dict[str, Any], context_text: str = None) -> str:
         """
         生成回答
         
@@ -102,15 +112,28 @@ class DomainAnalyzer:
             query: 用户查询
             retrieved_contexts: 检索到的上下文列表
             analysis_result: 上下文分析结果
+            context_text: 预先拼接好的上下文文本 (可选)
             
         Returns:
             生成的回答
         """
+        answer_prompt = self._build_answer_prompt(query, retrieved_contexts, analysis_result, context_text)
+        return self.gemini_client.generate_text(answer_prompt, use_pro=True)
+    
+    async def agenerate_answer(self, query: str, retrieved_contexts: List[Dict[str, Any]], analysis_result: Dict[str, Any], context_text: str = None) -> str:
+        """
+        生成回答 (异步版本)
+        """
+        answer_prompt = self._build_answer_prompt(query, retrieved_contexts, analysis_result, context_text)
+        return await self.gemini_client.generate_text_async(answer_prompt, use_pro=True)
+    
+    def _build_answer_prompt(self, query: str, retrieved_contexts: List[Dict[str, Any]], analysis_result: Dict[str, Any], context_text: str = None) -> str:
+        """
+        构造回答生成提示词
+        """
         # 准备上下文文本
-        context_text = "\n\n".join([
-            f"【来源：{ctx['metadata']['file_name']}，页码：{ctx['metadata']['page']}】\n{ctx['metadata']['content']}"
-            for ctx in retrieved_contexts
-        ])
+        if context_text is None:
+            context_text = format_context_text(retrieved_contexts)
         
         # 生成回答
         answer_prompt = f"""
@@ -145,9 +168,7 @@ class DomainAnalyzer:
         请用中文回答。
         """
         
-        answer = self.gemini_client.generate_text(answer_prompt, use_pro=True)
-        
-        return answer
+        return answer_prompt
     
     def format_answer_with_references(self, answer: str, retrieved_contexts: List[Dict[str, Any]]) -> str:
         """
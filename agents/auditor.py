@@ -1,4 +1,5 @@
 from utils.gemini_client import GeminiClient
+from agents.analyzer import format_context_text
 from typing import List, Dict, Any
 import logging
 
@@ -11,22 +12,45 @@ class ResponseAuditor:
         """
         self.gemini_client = GeminiClient()
     
-    def audit_response(self, original_contexts: List[Dict[str, Any]], generated_answer: str) -> Dict[str, Any]:
+    def audit_response(self, original_contexts: List[Dict[str, Any]], generated_answer: str, context_text: str = None) -> Dict[str, Any]:
         """
         审计生成的回答是否符合原始上下文
         
         Args:
             original_contexts: 原始上下文列表
             generated_answer: 生成的回答
+            context_text: 预先拼接好的上下文文本 (可选)
             
         Returns:
             审计结果，包含是否通过、错误信息、建议等
         """
+        prompt = self._build_audit_prompt(original_contexts, generated_answer, context_text)
+        try:
+            # Use Flash model for speed as this is an internal check
+            response = self.gemini_client.generate_text(prompt, use_pro=False, temperature=0.0)
+        except Exception as e:
+            logger.error(f"[审计] 审计失败: {e}")
+            response = None
+        return self._parse_audit_response(response, generated_answer)
+    
+    async def aaudit_response(self, original_contexts: List[Dict[str, Any]], generated_answer: str, context_text: str = None) -> Dict[str, Any]:
+        """
+        审计生成的回答 (异步版本)
+        """
+        prompt = self._build_audit_prompt(original_contexts, generated_answer, context_text)
+        try:
+            response = await self.gemini_client.generate_text_async(prompt, use_pro=False, temperature=0.0)
+        except Exception as e:
+            logger.error(f"[审计] 审计失败: {e}")
+            response = None
+        return self._parse_audit_response(response, generated_answer)
+    
+    def _build_audit_prompt(self, original_contexts: List[Dict[str, Any]], generated_answer: str, context_text: str = None) -> str:
+        """
+        构造审计提示词
+        """
         # 准备原始上下文文本
-        original_text = "\n\n".join([
-            f"【来源：{ctx['metadata']['file_name']}，页码：{ctx['metadata']['page']}】\n{ctx['metadata']['content']}"
-            for ctx in original_contexts
-        ])
+        original_text = context_text if context_text is not None else format_context_text(original_contexts)
         
         prompt = f"""
         你是一位严格的事实审计专家，负责检查生成的回答是否完全符合原始上下文。
@@ -45,41 +69,55 @@ class ResponseAuditor:
         
         请按照以下格式输出审计结果：
         审计结果：[通过/不通过]
+        置信度：[0 到 1 之间的小数，表示回答整体有原始上下文依据的程度]
         错误信息：[如果不通过，列出所有错误；如果通过，留空]
         
         请严格按照上述格式输出，不要添加任何其他内容。
         """
-        
+        return prompt
+    
+    def _parse_audit_response(self, response: str, generated_answer: str) -> Dict[str, Any]:
+        """
+        解析审计模型输出 (response 为 None 表示请求失败)
+        """
         try:
-            # Use Flash model for speed as this is an internal check
-            response = self.gemini_client.generate_text(prompt, use_pro=False, temperature=0.0)
+            if response is None:
+                # 请求失败已在调用方记录，直接走下方的默认通过分支
+                raise RuntimeError("审计请求失败")
             
             # 解析审计结果
             lines = response.strip().split("\n")
             audit_result = {
                 "passed": False,
-                "errors": []
+                "errors": [],
+                "score": None
             }
             
             for line in lines:
                 if line.startswith("审计结果："):
                     audit_result["passed"] = "通过" in line
+                elif line.startswith("置信度："):
+                    try:
+                        audit_result["score"] = min(max(float(line[4:].strip()), 0.0), 1.0)
+                    except ValueError:
+                        pass
                 elif line.startswith("错误信息："):
                     errors = line[5:].strip()
                     if errors and errors != "无":
                         audit_result["errors"] = errors.split("；")
             
         except Exception as e:
-            logger.error(f"[审计] 审计失败: {e}")
+            if response is not None:
+                logger.error(f"[审计] 审计失败: {e}")
             # If audit fails, default to passed to avoid blocking user, moving forward
-            audit_result = {"passed": True, "errors": []}
+            audit_result = {"passed": True, "errors": [], "score": None}
 
         # 增强审计结果，添加更详细的信息
         enhanced_result = {
             "audit_passed": audit_result["passed"],
             "errors": audit_result["errors"],
+            "score": audit_result["score"],
             "hallucinations": [],
-            "original_contexts": original_contexts,
             "generated_answer": generated_answer
         }
         
@@ -92,12 +130,14 @@ class ResponseAuditor:
         
         return enhanced_result
     
-    def generate_correction_prompt(self, audit_result: Dict[str, Any]) -> str:
+    def generate_correction_prompt(self, audit_result: Dict[str, Any], original_contexts: List[Dict[str, Any]], context_text: str = None) -> str:
         """
         生成修正提示，用于重新生成回答
         
         Args:
             audit_result: 审计结果
+            original_contexts: 原始上下文列表 (即工作流状态中的 retrieved_contexts)
+            context_text: 预先拼接好的上下文文本 (可选)
             
         Returns:
             修正提示
@@ -106,10 +146,8 @@ class ResponseAuditor:
         error_text = "\n".join([f"- {error}" for error in audit_result["errors"]])
         
         # 准备原始上下文
-        context_text = "\n\n".join([
-            f"【来源：{ctx['metadata']['file_name']}，页码：{ctx['metadata']['page']}】\n{ctx['metadata']['content']}"
-            for ctx in audit_result["original_contexts"]
-        ])
+        if context_text is None:
+            context_text = format_context_text(original_contexts)
         
         # 生成修正提示
         correction_prompt = f"""
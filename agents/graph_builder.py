@@ -43,6 +43,7 @@ class GraphBuilder:
         }
         
         from concurrent.futures import ThreadPoolExecutor, as_completed
+        from core.config import settings
         import hashlib
         
         # 准备任务
@@ -56,24 +57,38 @@ class GraphBuilder:
         
         if progress_callback: progress_callback(0, total_valid, "开始提取实体关系...")
 
-        with ThreadPoolExecutor(max_workers=5) as executor:
+        # 同一级别的块共用提示词，按级别分组后每 GRAPH_EXTRACTION_BATCH_SIZE 个块合并为一次 LLM 请求
+        blocks_by_tier = {}
+        for idx, block in valid_blocks:
+            blocks_by_tier.setdefault(block.get("tier", "GREEN"), []).append((idx, block))
+        batch_size = max(1, settings.GRAPH_EXTRACTION_BATCH_SIZE)
+        batches = [
+            items[i:i + batch_size]
+            for items in blocks_by_tier.values()
+            for i in range(0, len(items), batch_size)
+        ]
+
+        # 线程数不超过批次数 (至少 1 个)，小文档不额外创建空闲线程
+        max_workers = max(1, min(settings.MAX_WORKERS, len(batches)))
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
             # 提交任务
-            future_to_block = {
-                executor.submit(self._process_single_block, block, file_name, idx): idx 
-                for idx, block in valid_blocks
+            future_to_batch = {
+                executor.submit(self._process_block_batch, batch, file_name): batch
+                for batch in batches
             }
             
             # 处理结果
-            for future in as_completed(future_to_block):
-                idx = future_to_block[future]
+            for future in as_completed(future_to_batch):
+                batch = future_to_batch[future]
+                idx = batch[-1][0]
                 try:
-                    result = future.result()
-                    if result["processed"]:
-                        stats["processed_blocks"] += 1
-                        stats["entities_created"] += result["entities_count"]
-                        stats["relations_created"] += result["relations_count"]
+                    for result in future.result():
+                        if result["processed"]:
+                            stats["processed_blocks"] += 1
+                            stats["entities_created"] += result["entities_count"]
+                            stats["relations_created"] += result["relations_count"]
                 except Exception as exc:
-                    logger.error(f"[图谱构建] 块 {idx+1} 处理产生异常: {exc}")
+                    logger.error(f"[图谱构建] 块 {batch[0][0]+1}-{idx+1} 处理产生异常: {exc}")
                 
                 # Update progress
                 if progress_callback:
@@ -92,9 +107,30 @@ class GraphBuilder:
         return stats
 
 
-    def _process_single_block(self, block: Dict[str, Any], file_name: str, idx: int) -> Dict[str, Any]:
+    def _process_block_batch(self, batch: List[tuple], file_name: str) -> List[Dict[str, Any]]:
+        """
+        处理一批同级别的文档块：一次 LLM 请求提取全部块的实体关系，再逐块写入数据库
+        
+        Args:
+            batch: [(块索引, 块), ...]，块的级别相同
+            file_name: 文件名
+        """
+        tier = batch[0][1].get("tier", "GREEN")
+        extracted = self.extract_entities_relations_batch([block["verified_content"] for _, block in batch], tier)
+        
+        results = []
+        for (idx, block), entities_relations in zip(batch, extracted):
+            try:
+                results.append(self._process_single_block(block, file_name, idx, entities_relations))
+            except Exception:
+                # 单个块写库失败不影响同批其他块 (异常已在 _process_single_block 中记录)
+                results.append({"processed": False, "entities_count": 0, "relations_count": 0})
+        return results
+
+    def _process_single_block(self, block: Dict[str, Any], file_name: str, idx: int, entities_relations: List[Dict[str, Any]] = None) -> Dict[str, Any]:
         """
         处理单个文档块：提取实体关系并写入数据库
+        (entities_relations 已由批量提取给出时跳过提取)
         """
         import hashlib
         
@@ -108,8 +144,9 @@ class GraphBuilder:
             logger.info(f"[图谱构建] [Thread] 处理块 {idx+1} - 类型: {block.get('type', 'N/A')}")
             
             # 提取实体和关系 (Gemini Call - I/O Bound)
-            tier = block.get("tier", "GREEN")
-            entities_relations = self.extract_entities_relations(block["verified_content"], tier)
+            if entities_relations is None:
+                tier = block.get("tier", "GREEN")
+                entities_relations = self.extract_entities_relations(block["verified_content"], tier)
             
             # 创建块节点 (DB Write)
             block_content = block["verified_content"]
@@ -127,10 +164,11 @@ class GraphBuilder:
             if entities_relations:
                 self.graph_store.batch_create_entities_and_relations(entities_relations)
                 
-                # 建立实体与块的关系
-                for relation in entities_relations:
-                    self.graph_store.create_relation_entity_to_block(relation["source"], block_id)
-                    self.graph_store.create_relation_entity_to_block(relation["target"], block_id)
+                # 建立实体与块的关系 (一次批量写入，替代逐个实体的单条 MERGE)
+                self.graph_store.link_entities_to_block(
+                    [name for er in entities_relations for name in (er["source"], er["target"])],
+                    block_id
+                )
                 
                 unique_entities = len(set([er["source"] for er in entities_relations] + [er["target"] for er in entities_relations]))
                 
@@ -159,14 +197,36 @@ class GraphBuilder:
         Returns:
             实体和关系的列表
         """
-        logger.info(f"[实体提取] 开始提取实体 ({tier} Mode)，内容长度: {len(content)}")
+        logger.info("[实体提取] 开始提取实体 (%s Mode)，内容长度: %d", tier, len(content))
         
         # Select Prompt based on Tier
         prompt_template = self.prompts.get(tier, self.prompts["GREEN"])
         
         # 使用 Gemini 提取实体和关系
         entities_relations = self.gemini_client.extract_entities(content, prompt_template)
-        logger.info(f"[实体提取] Gemini 提取到 {len(entities_relations)} 个原始实体关系")
+        return self._filter_entities_relations(entities_relations)
+    
+    def extract_entities_relations_batch(self, contents: List[str], tier: str = "GREEN") -> List[List[Dict[str, Any]]]:
+        """
+        单次 LLM 请求从多段同级别文本中提取实体和关系
+        
+        Args:
+            contents: 文本内容列表
+            tier: 块级别 (RED/YELLOW/GREEN)
+            
+        Returns:
+            与 contents 顺序一致的实体关系列表的列表
+        """
+        logger.info("[实体提取] 开始批量提取实体 (%s Mode)，文本数: %d", tier, len(contents))
+        prompt_template = self.prompts.get(tier, self.prompts["GREEN"])
+        batch_results = self.gemini_client.extract_entities_batch(contents, prompt_template)
+        return [self._filter_entities_relations(entities_relations) for entities_relations in batch_results]
+    
+    def _filter_entities_relations(self, entities_relations: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        过滤源/关系/目标有空值的实体关系
+        """
+        logger.info("[实体提取] Gemini 提取到 %d 个原始实体关系", len(entities_relations))
         
         # 过滤无效的实体和关系
         filtered_results = []
@@ -174,12 +234,12 @@ class GraphBuilder:
             # 确保源实体和目标实体都不为空
             if item["source"] and item["target"] and item["relation"]:
                 filtered_results.append(item)
-                logger.info(f"[实体提取] 保留有效实体关系: {item}")
+                logger.debug("[实体提取] 保留有效实体关系: %s", item)
             else:
-                logger.warning(f"[实体提取] 过滤无效实体关系 - 源: '{item.get('source', 'None')}', 关系: '{item.get('relation', 'None')}', 目标: '{item.get('target', 'None')}'")
+                logger.warning("[实体提取] 过滤无效实体关系 - 源: '%s', 关系: '%s', 目标: '%s'", item.get('source', 'None'), item.get('relation', 'None'), item.get('target', 'None'))
         
-        logger.info(f"[实体提取] 过滤后保留 {len(filtered_results)} 个有效实体关系")
-        logger.info(f"[实体提取] 最终有效实体关系列表: {filtered_results}")
+        logger.info("[实体提取] 过滤后保留 %d 个有效实体关系", len(filtered_results))
+        logger.debug("[实体提取] 最终有效实体关系列表: %s", filtered_results)
         return filtered_results
     
     def update_graph(self, document_blocks: List[Dict[str, Any]], file_name: str) -> Dict[str, Any]:
@@ -212,20 +272,12 @@ class GraphBuilder:
         Returns:
             图谱统计信息
         """
-        # 获取所有实体
-        all_entities = self.graph_store.get_all_entities()
-        
-        # 获取所有关系
-        all_relations = self.graph_store.get_all_relations()
-        
-        # 统计关系类型
-        relation_types = {}
-        for relation in all_relations:
-            rel_type = relation["relation"]
-            relation_types[rel_type] = relation_types.get(rel_type, 0) + 1
+        # 计数在 Neo4j 端聚合，不再拉取全部实体和关系
+        counts = self.graph_store.get_graph_counts()
+        relation_types = counts["relation_types"]
         
         return {
-            "total_entities": len(all_entities),
-            "total_relations": len(all_relations),
+            "total_entities": counts["total_entities"],
+            "total_relations": sum(relation_types.values()),
             "relation_types": relation_types
         }
@@ -1,6 +1,34 @@
 from utils.gemini_client import GeminiClient
 from typing import Dict, Any
 
+# 各路由类型的检索策略 (与查询无关的常量表)
+RETRIEVAL_STRATEGIES = {
+    "FACTUAL": {
+        "methods": ["exact_match", "vector_search", "table_extraction", "image_retrieval"],
+        "exact_match_params": {"limit": 3},
+        "vector_search_params": {"limit": 2, "threshold": 0.85},
+        "table_extraction_params": {"limit": 3},
+        "image_retrieval_params": {"limit": 2}
+    },
+    "CONCEPTUAL": {
+        "methods": ["vector_search", "image_retrieval", "table_extraction"],
+        "vector_search_params": {"limit": 5, "threshold": 0.75},
+        "image_retrieval_params": {"limit": 3},
+        "table_extraction_params": {"limit": 3}
+    },
+    "RELATIONAL": {
+        "methods": ["graph_search", "image_retrieval", "table_extraction"],
+        "graph_search_params": {"depth": 3},
+        "image_retrieval_params": {"limit": 2},
+        "table_extraction_params": {"limit": 3}
+    },
+    "COMPARATIVE": {
+        "methods": ["vector_search", "table_extraction"],
+        "vector_search_params": {"limit": 10},  # Removed strict table filter, increased limit
+        "table_extraction_params": {"limit": 3}
+    }
+}
+
 class QueryRouter:
     def __init__(self):
         """
@@ -79,31 +107,5 @@ class QueryRouter:
         Returns:
             检索策略，包含使用的检索方法、参数等
         """
-        strategies = {
-            "FACTUAL": {
-                "methods": ["exact_match", "vector_search", "table_extraction", "image_retrieval"],
-                "exact_match_params": {"limit": 3},
-                "vector_search_params": {"limit": 2, "threshold": 0.85},
-                "table_extraction_params": {"limit": 3},
-                "image_retrieval_params": {"limit": 2}
-            },
-            "CONCEPTUAL": {
-                "methods": ["vector_search", "image_retrieval", "table_extraction"],
-                "vector_search_params": {"limit": 5, "threshold": 0.75},
-                "image_retrieval_params": {"limit": 3},
-                "table_extraction_params": {"limit": 3}
-            },
-            "RELATIONAL": {
-                "methods": ["graph_search", "image_retrieval", "table_extraction"],
-                "graph_search_params": {"depth": 3},
-                "image_retrieval_params": {"limit": 2},
-                "table_extraction_params": {"limit": 3}
-            },
-            "COMPARATIVE": {
-                "methods": ["vector_search", "table_extraction"],
-                "vector_search_params": {"limit": 10},  # Removed strict table filter, increased limit
-                "table_extraction_params": {"limit": 3}
-            }
-        }
-        
-        return strategies.get(route_type, strategies["CONCEPTUAL"])
+        # 策略表是模块级常量，直接返回共享对象 (调用方只读)
+        return RETRIEVAL_STRATEGIES.get(route_type, RETRIEVAL_STRATEGIES["CONCEPTUAL"])
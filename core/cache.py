@@ -0,0 +1,118 @@
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from collections import OrderedDict
+from typing import Any
+
+logger = logging.getLogger(__name__)
+
+
+def file_content_hash(file_path: str, chunk_size: int = 1 << 20) -> str:
+    """
+    流式计算文件内容哈希 (BLAKE2b, 128 bit)
+
+    Args:
+        file_path: 文件路径
+        chunk_size: 每次读取的字节数
+
+    Returns:
+        十六进制哈希字符串
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def content_hash(text: str) -> str:
+    """
+    计算文本内容哈希 (BLAKE2b, 128 bit)
+    """
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class FileCache:
+    def __init__(self, cache_dir: str):
+        """
+        基于本地目录的 JSON 键值缓存 (每个键一个文件，写入采用原子替换)
+
+        Args:
+            cache_dir: 缓存目录
+        """
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """
+        读取缓存，未命中或文件损坏时返回 default
+        """
+        try:
+            with open(self._path(key), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return default
+        except (OSError, ValueError) as e:
+            logger.warning(f"[缓存] 读取缓存失败 ({key}): {e}")
+            return default
+
+    def set(self, key: str, value: Any) -> None:
+        """
+        写入缓存 (先写临时文件再 os.replace，避免并发读到半写入的内容)
+        """
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            logger.warning(f"[缓存] 写入缓存失败 ({key}): {e}")
+            try:
+                os.remove(tmp_path)
+            except OSError:
+                pass
+
+
+class TTLCache:
+    def __init__(self, maxsize: int, ttl: float):
+        """
+        线程安全的内存 LRU 缓存，条目超过 ttl 秒后视为过期
+
+        Args:
+            maxsize: 最大条目数
+            ttl: 条目有效期 (秒)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return default
+            expires_at, value = item
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
@@ -1,7 +1,7 @@
 import re
 import logging
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Iterable, Iterator
 from core.embedding import LocalEmbedding
 
 logger = logging.getLogger(__name__)
@@ -44,7 +44,16 @@ class ChunkMerger:
         Merge consecutive text blocks while preserving structure (tables, images) 
         and detecting potential tables. Now enhanced with Semantic Checks.
         """
-        merged_blocks = []
+        return list(self.iter_merge_blocks(raw_blocks))
+
+    def iter_merge_blocks(self, raw_blocks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of merge_blocks: consumes raw blocks lazily and yields each
+        merged block as soon as its buffer is flushed.
+        """
+        merged_blocks = []  # flushed blocks not yet yielded
+        raw_count = 0
+        merged_count = 0
         current_text_buffer = []
         current_buffer_len = 0
         current_page = 1
@@ -55,9 +64,15 @@ class ChunkMerger:
         # Or use average of buffer. Using last block is often better for detecting immediate shifts.
         last_block_embedding = None 
 
-        logger.info(f"[ChunkMerger] Starting SEMANTIC merge on {len(raw_blocks)} raw blocks.")
+        logger.info(f"[ChunkMerger] Starting SEMANTIC merge (streaming).")
 
         for i, block in enumerate(raw_blocks):
+            raw_count += 1
+            if merged_blocks:
+                merged_count += len(merged_blocks)
+                yield from merged_blocks
+                merged_blocks.clear()
+            
             block_type = block.get("type", "unknown")
             content = block.get("content", "")
             page = block.get("page", 1)
@@ -91,7 +106,7 @@ class ChunkMerger:
                 
                 # Compute embedding for new content
                 try:
-                    current_embedding = self.embedding_model.embed(content)
+                    current_embedding = self.embedding_model.embed(content, use_cache=False)
                     if hasattr(current_embedding, 'tolist'): 
                         current_embedding = current_embedding.tolist()
                     
@@ -138,7 +153,7 @@ class ChunkMerger:
             # If we missed calculating embedding (e.g. len < 20 or first block)
             if self.embedding_model and last_block_embedding is None and len(content) > 5:
                  try:
-                    last_block_embedding = self.embedding_model.embed(content)
+                    last_block_embedding = self.embedding_model.embed(content, use_cache=False)
                     if hasattr(last_block_embedding, 'tolist'):
                         last_block_embedding = last_block_embedding.tolist()
                  except: pass
@@ -148,9 +163,10 @@ class ChunkMerger:
 
         # Flush remaining
         self._flush_buffer(merged_blocks, current_text_buffer, current_page, current_coords)
+        merged_count += len(merged_blocks)
+        yield from merged_blocks
         
-        logger.info(f"[ChunkMerger] Merged into {len(merged_blocks)} blocks (Reduction: {100 * (1 - len(merged_blocks)/len(raw_blocks) if len(raw_blocks) else 0):.1f}%)")
-        return merged_blocks
+        logger.info(f"[ChunkMerger] Merged {raw_count} raw blocks into {merged_count} blocks (Reduction: {100 * (1 - merged_count/raw_count) if raw_count else 0:.1f}%)")
 
     def _flush_buffer(self, merged_blocks, buffer, page, coords):
         if not buffer:
@@ -6,18 +6,48 @@ class Settings(BaseModel):
     HOST: str = "127.0.0.1"
     PORT: int = 38080
     TEMP_DIR: str = "temp_uploads"
+    UPLOAD_CONCURRENCY: int = 2  # 同时处理的上传文件数 (每个文件内部的解析/图谱构建另有各自的并发)
+    TASK_RETENTION: int = 3600  # 上传任务结束后保留状态的时长 (秒)，之后从内存中清理
     
     # Retrieval Settings
     MAX_WORKERS: int = 5
     VECTOR_SEARCH_LIMIT: int = 5
     EXACT_MATCH_LIMIT: int = 3
     GRAPH_SEARCH_LIMIT: int = 50
+    CORRECTION_CANDIDATES: int = 2  # 修正阶段并发生成并审计的候选回答数
+    AUDIT_MIN_SCORE: float = 0.5  # 审计通过但置信度低于此值时仍进行修正
+    AUDIT_HIGH_CONFIDENCE: float = 0.9  # 审计置信度达到此值时不再修正
+    RETRIEVAL_CACHE_SIZE: int = 1024  # 检索结果缓存条数
+    RETRIEVAL_CACHE_TTL: int = 600  # 检索结果缓存有效期 (秒)
+    RETRIEVAL_TIMEOUT: float = 2.0  # 已有向量结果时等待图谱检索的最长时间 (秒)，超时的图谱结果被丢弃；向量检索始终等待完成
+    FILE_LIST_CACHE_TTL: float = 5.0  # /api/files 文件列表缓存有效期 (秒)，上传/删除后立即失效
+    DOC_METADATA_FLUSH_INTERVAL: float = 2.0  # 文档元数据写缓冲的定时刷新间隔 (秒)
+    DOC_METADATA_FLUSH_SIZE: int = 10  # 缓冲的文档元数据达到此数量时立即写入 Neo4j
+    
+    # Vector Store Settings
+    VECTOR_UPSERT_BATCH_SIZE: int = 64  # 每次 upsert 写入的点数
+    VECTOR_UPSERT_CONCURRENCY: int = 8  # 异步写入时的最大并发 upsert 请求数
+    QDRANT_POOL_SIZE: int = 100  # Qdrant REST 客户端的最大连接数 (同步/异步客户端各一个池)
     
     # Parsing Settings
     USE_OCR: bool = False
+    USE_FAST_TEXT_PATH: bool = True  # 不含图片的原生文本 PDF 使用 pymupdf4llm 快速路径 (需安装 pymupdf4llm)
+    NATIVE_TEXT_RATIO_THRESHOLD: float = 0.7
+    ENABLE_PARSE_CACHE: bool = True
+    PARSE_CACHE_DIR: str = "parse_cache"
+    LLM_CONCURRENCY: int = 16  # QA 验证的最大在途 LLM 请求数 (线程池大小 / 异步信号量)
+    GEMINI_POOL_SIZE: int = 64  # Gemini HTTP 客户端的 keep-alive 连接池大小 (进程内所有 GeminiClient 共享)
+    QA_BATCH_SIZE: int = 8  # 同类型块 (RED 文本 / 表格) 合并为一次 LLM 请求的块数
+    QA_IMAGE_BATCH_SIZE: int = 4  # 图片块合并为一次多模态请求的图片数
+    GRAPH_EXTRACTION_BATCH_SIZE: int = 4  # 图谱构建时同级别块合并为一次实体抽取请求的块数
+    DOCLING_DOC_BATCH_SIZE: int = 4  # Docling convert_all 每批文档数
+    DOCLING_PAGE_BATCH_CONCURRENCY: int = 4  # Docling 页批次并发数
+    PARSE_WORKERS: int = 1  # >1 时按页码区间切分 PDF，在常驻进程池 (spawn) 中并行解析；每个子进程只加载一次 Docling 模型 (各占一份显存)，合并/分级在主进程
     
     # Model Settings
     EMBEDDING_MODEL: str = "BAAI/bge-m3"
+    EMBEDDING_CACHE_SIZE: int = 4096  # 按内容哈希缓存的查询嵌入条数 (float32，每条约 4 KB；批量入库不写入)
+    EMBEDDING_BATCH_SIZE: int = 100  # 入库时每次写入的块数，同时作为嵌入模型前向的批大小
     QDRANT_COLLECTION: str = os.getenv("QDRANT_COLLECTION_NAME", "ic_bcd_knowledge_base")
 
     # Classification Prototypes & Keywords
@@ -32,6 +62,8 @@ class Settings(BaseModel):
         "YELLOW": "Detailed data tables, cross-section diagrams, schematic views, performance plots, figure captures."
     }
     SEMANTIC_THRESHOLD: float = 0.6
+    SEMANTIC_MIN_CHARS: int = 3  # 短于此长度的块不做语义匹配，直接判为 GREEN
+    CLASSIFY_CACHE_SIZE: int = 4096  # classify_block 结果的 LRU 缓存条数
 
     # Adaptive Graph Construction Prompts
     ENTITY_EXTRACTION_PROMPTS: dict = {
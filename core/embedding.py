@@ -1,4 +1,9 @@
 from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from core.cache import content_hash
+from core.config import settings
+import threading
+import numpy as np
 import torch
 import logging
 
@@ -26,6 +31,11 @@ class LocalEmbedding:
         
         try:
             self.model = SentenceTransformer(model_name, device=self.device)
+            self.model_name = model_name
+            # 按内容哈希缓存查询侧的嵌入: content_hash -> float32 ndarray (每条约 4 KB)
+            # 批量入库 (embed_batch) 只读不写，避免大量文档块挤掉检索热点查询的嵌入
+            self._cache = OrderedDict()
+            self._cache_lock = threading.Lock()
             # BGE-M3 usually produces 1024 dim dense vectors
             self._initialized = True
             logger.info(f"[LocalEmbedding] Model loaded successfully.")
@@ -33,20 +43,79 @@ class LocalEmbedding:
             logger.error(f"[LocalEmbedding] Failed to load model: {e}")
             raise e
 
-    def embed(self, text: str) -> list[float]:
+    def embed(self, text: str, use_cache: bool = True) -> list[float]:
         """
         生成文本嵌入
         
         Args:
             text: 输入文本
+            use_cache: 是否读写嵌入缓存 (解析阶段逐块调用时传 False，不占用查询缓存)
             
         Returns:
             List[float]: 1024维向量
         """
         if not text:
             return []
+        
+        key = content_hash(text) if use_cache else None
+        if key:
+            cached = self._cache_get(key)
+            if cached is not None:
+                return cached.tolist()
             
         # BGE-M3 specific: It can return a dict for sparse/dense/colbert
         # But SentenceTransformer.encode default returns dense numpy array
         embedding = self.model.encode(text, convert_to_numpy=True)
+        if key:
+            self._cache_put(key, embedding)
         return embedding.tolist()
+
+    def embed_batch(self, texts: list[str], batch_size: int = 32) -> list[list[float]]:
+        """
+        批量生成文本嵌入 (单次 encode 调用，GPU 上按 batch_size 分批前向)
+        用于批量入库: 命中缓存的文本直接复用，新算出的嵌入不写入缓存
+        
+        Args:
+            texts: 输入文本列表
+            batch_size: 模型前向的批大小
+            
+        Returns:
+            List[List[float]]: 与输入顺序一致的向量列表，空文本对应空列表
+        """
+        results = [[] for _ in texts]
+        # 未命中缓存的文本按哈希去重，同一内容只前向一次: key -> (文本, [下标...])
+        pending = {}
+        for i, t in enumerate(texts):
+            if not t:
+                continue
+            key = content_hash(t)
+            cached = self._cache_get(key)
+            if cached is not None:
+                results[i] = cached.tolist()
+            else:
+                pending.setdefault(key, (t, []))[1].append(i)
+        if not pending:
+            return results
+        
+        embeddings = self.model.encode([t for t, _ in pending.values()], batch_size=batch_size, convert_to_numpy=True)
+        for (_, indices), embedding in zip(pending.values(), embeddings):
+            embedding = embedding.tolist()
+            for i in indices:
+                results[i] = list(embedding)
+        return results
+    
+    def _cache_get(self, key: str):
+        with self._cache_lock:
+            cached = self._cache.get(key)
+            if cached is not None:
+                self._cache.move_to_end(key)
+            return cached
+    
+    def _cache_put(self, key: str, embedding: np.ndarray):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        embedding.flags.writeable = False
+        with self._cache_lock:
+            self._cache[key] = embedding
+            self._cache.move_to_end(key)
+            while len(self._cache) > settings.EMBEDDING_CACHE_SIZE:
+                self._cache.popitem(last=False)
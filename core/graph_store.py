@@ -2,6 +2,7 @@ from neo4j import GraphDatabase
 from typing import List, Dict, Any
 import os
 from dotenv import load_dotenv
+import asyncio
 import logging
 
 # 加载环境变量
@@ -19,6 +20,7 @@ class GraphStore:
             auth=(os.getenv("NEO4J_USER", "neo4j"), os.getenv("NEO4J_PASSWORD", "password"))
         )
         self.verify_connectivity()
+        self.ensure_indexes()
 
     def verify_connectivity(self):
         try:
@@ -28,6 +30,22 @@ class GraphStore:
         except Exception as e:
             logger.error(f"[图数据库] Neo4j 连接验证失败: {e}")
 
+    def ensure_indexes(self):
+        """
+        创建常用查找键的索引 (已存在时跳过)，MERGE / MATCH 按名称、哈希、文件名查找时走索引
+        """
+        indexes = [
+            "CREATE INDEX entity_name IF NOT EXISTS FOR (e:Entity) ON (e.name)",
+            "CREATE INDEX document_hash IF NOT EXISTS FOR (d:Document) ON (d.hash)",
+            "CREATE INDEX document_filename IF NOT EXISTS FOR (d:Document) ON (d.filename)",
+        ]
+        try:
+            with self.driver.session() as session:
+                for statement in indexes:
+                    session.run(statement)
+        except Exception as e:
+            logger.warning(f"[图数据库] 创建索引失败: {e}")
+
     def query(self, query: str, parameters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
         """
         执行通用的 Cypher 查询
@@ -130,6 +148,33 @@ class GraphStore:
                 relation=relation_type
             )
     
+    def link_entities_to_block(self, entity_names: List[str], block_id: str, relation_type: str = "MENTIONED_IN") -> None:
+        """
+        批量创建实体到文档块的关系 (一次 UNWIND 写入)
+        
+        Args:
+            entity_names: 实体名称列表 (重复名称只建一次关系)
+            block_id: 文档块ID
+            relation_type: 关系类型（默认：MENTIONED_IN）
+        """
+        names = list(dict.fromkeys(name for name in entity_names if name))
+        if not names:
+            return
+        with self.driver.session() as session:
+            session.run(
+                """
+                MERGE (b:Entity {name: $block_id})
+                WITH b
+                UNWIND $names AS name
+                MERGE (e:Entity {name: name})
+                MERGE (e)-[r:RELATION]->(b)
+                SET r.type = $relation
+                """,
+                names=names,
+                block_id=block_id,
+                relation=relation_type
+            )
+    
     def __enter__(self):
         return self
 
@@ -237,6 +282,56 @@ class GraphStore:
             
             return relations
     
+    def search_relations_bulk(self, entity_names: List[str], limit: int = None) -> List[Dict[str, Any]]:
+        """
+        单次查询批量搜索多个实体的关系 (UNWIND)，结果按实体在输入中的顺序排列
+        
+        Args:
+            entity_names: 实体名称列表
+            limit: 返回关系数上限（可选）
+            
+        Returns:
+            关系列表
+        """
+        if not entity_names:
+            return []
+        
+        query = """
+            UNWIND range(0, size($entities) - 1) AS idx
+            MATCH (e:Entity)-[r:RELATION]->(t:Entity)
+            WHERE e.name = $entities[idx]
+            RETURN e.name as source, 
+                   r.type as relation, 
+                   t.name as target
+            ORDER BY idx
+            """
+        if limit is not None:
+            query += "LIMIT $limit"
+        
+        with self.driver.session() as session:
+            result = session.run(query, entities=list(entity_names), limit=limit)
+            
+            return [
+                {
+                    "source": record["source"],
+                    "relation": record["relation"],
+                    "target": record["target"]
+                }
+                for record in result
+            ]
+    
+    async def asearch_relations(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        """
+        search_relations 的异步版本 (在线程中执行)
+        """
+        return await asyncio.to_thread(self.search_relations, *args, **kwargs)
+    
+    async def asearch_relations_bulk(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        """
+        search_relations_bulk 的异步版本 (在线程中执行)
+        """
+        return await asyncio.to_thread(self.search_relations_bulk, *args, **kwargs)
+    
     def find_shortest_path(self, source_entity: str, target_entity: str) -> List[Dict[str, Any]]:
         """
         查找两个实体之间的最短路径
@@ -303,6 +398,21 @@ class GraphStore:
             logger.debug(f"[图数据库] 查询到 {len(entities)} 个实体")
             return entities
     
+    def get_graph_counts(self) -> Dict[str, Any]:
+        """
+        在数据库端聚合统计实体数与各类型关系数 (不拉取全量实体/关系)
+        
+        Returns:
+            {"total_entities": int, "relation_types": {关系类型: 数量}}
+        """
+        with self.driver.session() as session:
+            total_entities = session.run("MATCH (e:Entity) RETURN count(e) as count").single()["count"]
+            result = session.run(
+                "MATCH (:Entity)-[r:RELATION]->(:Entity) RETURN r.type as relation, count(*) as count"
+            )
+            relation_types = {record["relation"]: record["count"] for record in result}
+        return {"total_entities": total_entities, "relation_types": relation_types}
+    
     def get_all_relations(self) -> List[Dict[str, Any]]:
         """
         获取所有关系
@@ -397,6 +507,29 @@ class GraphStore:
             )
             logger.info(f"[图数据库] 文档元数据已保存: {filename} (hash: {doc_hash})")
 
+    def add_documents(self, documents: List[Dict[str, Any]]) -> None:
+        """
+        批量添加文档元数据节点 (一次 UNWIND 写入)
+        
+        Args:
+            documents: 元数据列表，每项包含 hash, filename, size, upload_time
+        """
+        if not documents:
+            return
+        with self.driver.session() as session:
+            session.run(
+                """
+                UNWIND $rows AS row
+                MERGE (d:Document {hash: row.hash})
+                SET d.filename = row.filename,
+                    d.size = row.size,
+                    d.upload_time = row.upload_time,
+                    d.status = 'processed'
+                """,
+                rows=documents
+            )
+        logger.info(f"[图数据库] 批量保存文档元数据: {len(documents)} 个")
+
     def get_document(self, doc_hash: str) -> Dict[str, Any]:
         """
         根据哈希获取文档元数据
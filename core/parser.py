@@ -1,55 +1,154 @@
 from docling.document_converter import DocumentConverter
 from docling.datamodel.document import DoclingDocument as Document
-from typing import List, Dict, Any
-import base64
+from typing import List, Dict, Any, Iterable, Iterator
+import asyncio
+import functools
+import operator
 import os
+import re
 import logging
+import threading
+from collections import OrderedDict
 
 import logging
-from docling_core.types.doc import TableItem, PictureItem, TextItem
+from docling_core.types.doc import TableItem, PictureItem, TextItem, GroupItem, NodeItem
+from core.cache import content_hash
+
+# 可选: pybase64 使用 SIMD 编码；未安装时直接调用 binascii.b2a_base64 (标准库 base64.b64encode 的底层 C 实现)
+try:
+    from pybase64 import b64encode
+except ImportError:
+    import binascii
+    b64encode = functools.partial(binascii.b2a_base64, newline=False)
 
 logger = logging.getLogger(__name__)
 
+@functools.lru_cache(maxsize=1)
+def _get_converter(use_ocr: bool) -> DocumentConverter:
+    """
+    构建并缓存 Docling 转换器 (进程级单例，模型只加载一次)
+    
+    Args:
+        use_ocr: 是否启用 OCR
+        
+    Returns:
+        已初始化 PDF 流水线的 DocumentConverter
+    """
+    from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
+    from docling.document_converter import PdfFormatOption
+    from docling.datamodel.base_models import InputFormat
+    
+    pipeline_options = PdfPipelineOptions()
+    pipeline_options.accelerator_options = AcceleratorOptions(
+        num_threads=4, device=AcceleratorDevice.CUDA
+    )
+    # Hybrid Parsing: 
+    # If USE_OCR=False, we skip dense OCR. Native text is extracted directly.
+    # Images (including scanned tables) are handled by Multimodal LLM later.
+    pipeline_options.do_ocr = use_ocr
+    pipeline_options.do_table_structure = True
+    pipeline_options.table_structure_options.do_cell_matching = True
+    pipeline_options.generate_picture_images = True  # Ensure images are generated
+    
+    # Docling 批处理并发 (convert_all 多文件时按文档/页批次流水线执行)
+    from core.config import settings
+    from docling.datamodel.settings import settings as docling_settings
+    docling_settings.perf.doc_batch_size = settings.DOCLING_DOC_BATCH_SIZE
+    docling_settings.perf.page_batch_concurrency = settings.DOCLING_PAGE_BATCH_CONCURRENCY
+    
+    converter = DocumentConverter(
+        format_options={
+            InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
+        }
+    )
+    # 预加载流水线模型，避免首个请求承担模型加载耗时
+    logger.info("[PDF解析] 初始化 Docling PDF 流水线...")
+    converter.initialize_pipeline(InputFormat.PDF)
+    return converter
+
 class PDFParser:
+    # 扩展的内容提取方式列表 (类级别只构建一次，按顺序探测；
+    # 简单属性用 C 实现的 attrgetter，缺失时抛出的 AttributeError 由调用处捕获)
+    _EXTRACTORS = (
+        ('text', operator.attrgetter('text')),
+        ('content', operator.attrgetter('content')),
+        ('text_content', operator.attrgetter('text_content')),
+        ('full_text', operator.attrgetter('full_text')),
+        ('body', lambda b: str(b.body) if getattr(b, 'body', None) is not None else None),
+        ('paragraphs', lambda b: "".join([p.text for p in b.paragraphs]) if hasattr(b, 'paragraphs') else None),
+        ('lines', lambda b: "".join([line.text for line in b.lines]) if hasattr(b, 'lines') else None),
+        ('string_value', operator.attrgetter('string_value')),
+        ('value', operator.attrgetter('value')),
+        ('data', operator.attrgetter('data')),
+    )
+    # 图片解析要求 (批量多模态请求使用)
+    _IMAGE_INSTRUCTIONS = (
+        "1. 如果图片是表格（包含有线或无线的表结构），请务必将其转换为 Markdown 表格格式输出。\n"
+        "2. 如果是电路图、截面图或示意图，请详细描述其结构、关键参数和特性。\n"
+        "3. 如果是普通文本截图，请提取其中的文字内容。"
+    )
+    # 提取成功后可将 unknown 类型修正为 text 的提取方式
+    _TEXT_EXTRACTORS = frozenset(['text', 'content', 'text_content', 'full_text', 'paragraphs', 'lines', 'string_value'])
+    
     def __init__(self):
         """
         初始化 PDF 解析器
         """
         from core.config import settings
-        from docling.datamodel.pipeline_options import PdfPipelineOptions, AcceleratorOptions, AcceleratorDevice
-        
-        pipeline_options = PdfPipelineOptions()
-        pipeline_options.accelerator_options = AcceleratorOptions(
-            num_threads=4, device=AcceleratorDevice.CUDA
-        )
-        # Hybrid Parsing: 
-        # If USE_OCR=False, we skip dense OCR. Native text is extracted directly.
-        # Images (including scanned tables) are handled by Multimodal LLM later.
-        pipeline_options.do_ocr = settings.USE_OCR
-        pipeline_options.do_table_structure = True
-        pipeline_options.table_structure_options.do_cell_matching = True
-        pipeline_options.generate_picture_images = True  # Ensure images are generated
-        
-        from docling.document_converter import PdfFormatOption
-        from docling.datamodel.base_models import InputFormat
         from core.chunk_merger import ChunkMerger
         from core.embedding import LocalEmbedding
-        from core.config import settings
         
-        self.converter = DocumentConverter(
-            format_options={
-                InputFormat.PDF: PdfFormatOption(pipeline_options=pipeline_options)
-            }
-        )
+        # 共享进程级 DocumentConverter，避免每个实例重复加载版面/表格模型
+        self.converter = _get_converter(settings.USE_OCR)
         
         # Initialize Chunk Merger
         self.chunk_merger = ChunkMerger()
         
+        # 块类型 -> 首个成功的内容提取方式 (内联缓存，避免逐个探测失败的属性)
+        self._type_hit = {}
+        
+        # 解析结果 / QA 结果磁盘缓存 (按文件内容哈希与块内容哈希索引)
+        from core.cache import FileCache
+        self.cache = FileCache(settings.PARSE_CACHE_DIR) if settings.ENABLE_PARSE_CACHE else None
+        
         # Initialize Embedding Model for Semantic Classification
         self.embedding_model = LocalEmbedding()
         self.semantic_prototypes = settings.SEMANTIC_PROTOTYPES
         self.tier_keywords = settings.TIER_KEYWORDS
         
+        # 预编译分级关键词: 每个级别一个交替正则，按 RED > YELLOW 优先级依次探测
+        self._tier_patterns = [
+            (tier, re.compile("|".join(re.escape(k) for k in self.tier_keywords[tier])))
+            for tier in ("RED", "YELLOW")
+        ]
+        # 关键词首字符集合: 块内不含任何首字符时可直接跳过正则扫描
+        self._kw_first_chars = frozenset(
+            k[0] for tier in ("RED", "YELLOW") for k in self.tier_keywords[tier] if k
+        )
+        # 可选: pyahocorasick 多模式自动机，每个级别一个，RED 自动机先扫描且首个命中即返回；
+        # 未安装时使用上面的预编译正则
+        self._tier_automata = None
+        try:
+            import ahocorasick
+            self._tier_automata = []
+            for tier in ("RED", "YELLOW"):
+                keywords = [k for k in self.tier_keywords[tier] if k]
+                if not keywords:
+                    continue
+                automaton = ahocorasick.Automaton()
+                for k in keywords:
+                    automaton.add_word(k, tier)
+                automaton.make_automaton()
+                self._tier_automata.append((tier, automaton))
+        except ImportError:
+            pass
+        
+        # 分级结果 LRU 缓存: (内容哈希, 启发式级别) -> 级别
+        # 以哈希为键，不长期持有 base64 图片、大表格等原文
+        self._classify_cache = OrderedDict()
+        self._classify_cache_lock = threading.Lock()
+        self._classify_cache_size = settings.CLASSIFY_CACHE_SIZE
+        
         # Cache prototype embeddings
         logger.info("[PDFParser] Caching prototype embeddings...")
         self.proto_embeddings = {
@@ -72,10 +171,27 @@ class PDFParser:
         logger.info(f"[PDF解析] 文件解析成功，文档类型: {type(document)}")
         return document
     
+    def parse_pdfs(self, file_paths: List[str]) -> List[Document]:
+        """
+        批量解析多个 PDF 文件 (Docling convert_all，多文件间流水线并发)
+        
+        Args:
+            file_paths: PDF 文件路径列表
+            
+        Returns:
+            与输入顺序一致的文档对象列表
+        """
+        logger.info(f"[PDF解析] 开始批量解析 {len(file_paths)} 个文件")
+        documents = [result.document for result in self.converter.convert_all(file_paths)]
+        logger.info(f"[PDF解析] 批量解析完成")
+        return documents
+    
     def classify_block(self, block_content: str, heuristic_tier: str = None) -> str:
         """
         对文档块进行分级标签 (Hybrid: Rules + Semantics)
         
+        分级是纯函数，结果按 (内容哈希, 启发式级别) 缓存，重复的页眉页脚等样板文本只计算一次
+        
         Args:
             block_content: 文档块内容
             heuristic_tier: 启发式预判级别 (e.g. from ChunkMerger)
@@ -83,6 +199,21 @@ class PDFParser:
         Returns:
             分级标签：RED、YELLOW 或 GREEN
         """
+        key = (content_hash(block_content) if block_content else "", heuristic_tier)
+        with self._classify_cache_lock:
+            tier = self._classify_cache.get(key)
+            if tier is not None:
+                self._classify_cache.move_to_end(key)
+                return tier
+        
+        tier = self._classify_block_uncached(block_content, heuristic_tier)
+        with self._classify_cache_lock:
+            self._classify_cache[key] = tier
+            while len(self._classify_cache) > self._classify_cache_size:
+                self._classify_cache.popitem(last=False)
+        return tier
+    
+    def _classify_block_uncached(self, block_content: str, heuristic_tier: str = None) -> str:
         # 1. 优先尊重启发式判断 (如 ChunkMerger 判定为潜在表格)
         if heuristic_tier and heuristic_tier != "GREEN":
             # 只有当启发式判定非常确定时才直接返回？
@@ -90,25 +221,30 @@ class PDFParser:
             if heuristic_tier == "YELLOW": 
                 return "YELLOW"
         
-        # 2. 规则匹配 (Fast Path)
-        for keyword in self.tier_keywords["RED"]:
-            if keyword in block_content:
-                return "RED"
+        if not block_content:
+            return "GREEN"
         
-        for keyword in self.tier_keywords["YELLOW"]:
-            if keyword in block_content:
-                return "YELLOW"
+        # 2. 规则匹配 (Fast Path, 单次扫描替代逐关键词 in 判断)
+        #    先用首字符集合做快速排除，多数普通文本块无需进入关键词扫描
+        if not self._kw_first_chars.isdisjoint(block_content):
+            keyword_tier = self._match_tier_keywords(block_content)
+            if keyword_tier:
+                return keyword_tier
                 
         # 3. 语义匹配 (Slow Path, using Embeddings)
+        # 页码、短标题等极短块的语义相似度没有意义，跳过向量计算
+        from core.config import settings
+        if len(block_content.strip()) < settings.SEMANTIC_MIN_CHARS:
+            return "GREEN"
+        
         # 计算与 RED/YELLOW原型的相似度
         try:
-            from core.config import settings
             import numpy as np
             
             def cosine_sim(a, b):
                 return np.dot(a, b.T) / (np.linalg.norm(a) * np.linalg.norm(b))
             
-            curr_embed = self.embedding_model.embed(block_content)
+            curr_embed = self.embedding_model.embed(block_content, use_cache=False)
             if not curr_embed: return "GREEN"
             
             # Reshape is not strictly needed if we use simple dot product on 1D arrays
@@ -136,6 +272,21 @@ class PDFParser:
         # 默认标记为 GREEN
         return "GREEN"
     
+    def _match_tier_keywords(self, block_content: str):
+        """
+        按 RED > YELLOW 优先级匹配分级关键词，首个命中即返回该级别，无命中返回 None
+        """
+        if self._tier_automata is not None:
+            for tier, automaton in self._tier_automata:
+                for _ in automaton.iter(block_content):
+                    return tier
+            return None
+        
+        for tier, pattern in self._tier_patterns:
+            if pattern.search(block_content):
+                return tier
+        return None
+    
     def extract_document_blocks(self, document) -> List[Dict[str, Any]]:
         """
         从文档中提取块，并进行分级标签
@@ -146,85 +297,67 @@ class PDFParser:
         Returns:
             文档块列表，每个块包含内容、类型、页码、坐标和分级标签
         """
+        return list(self.iter_document_blocks(document))
+    
+    def iter_document_blocks(self, document) -> Iterator[Dict[str, Any]]:
+        """
+        逐个产出合并并分级后的文档块 (流式版本，下游可边分级边提交 QA 验证)
+        
+        Args:
+            document: 解析后的文档对象
+            
+        Yields:
+            文档块，包含内容、类型、页码、坐标和分级标签
+        """
+        yield from self._iter_merge_and_classify(self._iter_raw_blocks(document))
+    
+    def _iter_raw_blocks(self, document) -> Iterator[Dict[str, Any]]:
+        """
+        遍历文档结构，逐个产出未合并的原始块
+        """
         logger.info(f"[块提取] 开始提取文档块")
-        blocks = []
+        block_count = 0
         
-        # 打印文档对象的所有属性，用于调试
-        logger.debug(f"[块提取] 文档对象类型: {type(document)}")
-        logger.debug(f"[块提取] 文档对象属性: {[attr for attr in dir(document) if not attr.startswith('_')]}")
+        # 打印文档对象的所有属性，用于调试 (dir() 开销较大，仅在 DEBUG 级别开启时计算)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[块提取] 文档对象类型: %s", type(document))
+            logger.debug("[块提取] 文档对象属性: %s", [attr for attr in dir(document) if not attr.startswith('_')])
         
         # 检查文档结构，处理不同的 docling API 版本
         
-        # 1. 首先检查文档的body属性（这是docling的新结构）
-        if hasattr(document, 'body'):
-            logger.info(f"[块提取] 检测到body属性，类型: {type(document.body)}")
+        # 1. DoclingDocument: 使用 iterate_items() 按阅读顺序遍历已解析的节点
+        #    (替代对 body.children 的递归与逐个 RefItem.resolve)
+        if hasattr(document, 'iterate_items'):
+            logger.info(f"[块提取] 使用 iterate_items 遍历文档结构")
             
-            # 处理GroupItem类型的body
-            from docling_core.types.doc.document import GroupItem
-            if isinstance(document.body, GroupItem):
-                logger.info(f"[块提取] 检测到GroupItem类型的body，开始处理其内容")
+            # 已成功处理的节点不再展开其子节点 (如 spans)，通过层级跳过其子树；
+            # 分组节点也要遍历到，否则紧跟在已处理节点之后的列表/行内分组的子节点会被误跳过
+            skip_level = None
+            # 各层级祖先节点的页码，无 prov 的节点 (如分组) 继承父节点的页码
+            page_stack = []
+            for item, level in document.iterate_items(with_groups=True):
+                if skip_level is not None:
+                    if level > skip_level:
+                        continue
+                    skip_level = None
                 
-                # 查看GroupItem的结构
-                logger.debug(f"[块提取] GroupItem属性: {[attr for attr in dir(document.body) if not attr.startswith('_')]}")
+                del page_stack[level:]
+                prov = getattr(item, 'prov', None)
+                page_num = prov[0].page_no if prov else (page_stack[-1] if page_stack else 1)
+                page_stack.append(page_num)
                 
-                # 处理GroupItem的children
-                if hasattr(document.body, 'children'):
-                    logger.info(f"[块提取] GroupItem有children属性")
-                    
-                    # 递归处理GroupItem的children
-                    def process_group_item(group_item, page_num=1):
-                        """递归处理GroupItem的children"""
-                        if hasattr(group_item, 'children'):
-                            for child in group_item.children:
-                                # logger.debug(f"[块提取] 处理GroupItem子元素，类型: {type(child).__name__}")
-                                
-                                
-                                # 尝试解析 RefItem
-                                if hasattr(child, 'resolve'):
-                                    try:
-                                        resolved_child = child.resolve(document)
-                                        if resolved_child:
-                                            # logger.debug(f"[块提取] RefItem解析为: {type(resolved_child).__name__}")
-                                            child = resolved_child
-                                    except Exception as e:
-                                        logger.warning(f"[块提取] 解析RefItem失败: {str(e)}")
-                                
-                                # 检查子元素是否有type属性
-                                if hasattr(child, 'type'):
-                                    # logger.debug(f"[块提取] 子元素type属性: {child.type}")
-                                    pass
-                                
-                                # 尝试从元素中提取页码
-                                current_page = page_num
-                                if hasattr(child, 'prov') and child.prov:
-                                    # 尝试获取第一页
-                                    try:
-                                        if hasattr(child.prov, 'page_no'):
-                                            current_page = child.prov.page_no
-                                        elif isinstance(child.prov, list) and len(child.prov) > 0:
-                                            current_page = child.prov[0].page_no
-                                    except:
-                                        pass
-                                
-                                # logic change: Try to process as a block FIRST
-                                processed_block = self._process_block(child, current_page, document)
-                                if processed_block:
-                                    blocks.append(processed_block)
-                                    # If processed successfully (has content), do not recurse into its children (e.g. spans)
-                                    continue
-                                
-                                # If not processed (e.g. GroupItem with no direct content), recurse if it has children
-                                if hasattr(child, 'children'):
-                                    process_group_item(child, current_page)
-                    
-                    process_group_item(document.body)
+                processed_block = self._process_block(item, page_num, document)
+                if processed_block:
+                    block_count += 1
+                    yield processed_block
+                    skip_level = level
         
         # 2. 检查文档的blocks属性
         elif hasattr(document, 'blocks'):
             # 新的 API 结构：文档直接包含 blocks
             logger.info(f"[块提取] 检测到新的API结构，文档直接包含blocks")
-            logger.debug(f"[块提取] blocks 属性类型: {type(document.blocks)}")
-            logger.debug(f"[块提取] blocks 数量: {len(document.blocks)}")
+            logger.debug("[块提取] blocks 属性类型: %s", type(document.blocks))
+            logger.debug("[块提取] blocks 数量: %s", len(document.blocks))
             
             for block in document.blocks:
                 # 检查块是否有页面信息
@@ -235,20 +368,21 @@ class PDFParser:
                 
                 processed_block = self._process_block(block, page_num, document)
                 if processed_block:
-                    blocks.append(processed_block)
+                    block_count += 1
+                    yield processed_block
         
         # 3. 检查文档的pages属性
         elif hasattr(document, 'pages'):
             # 旧的 API 结构：文档包含 pages
             logger.info(f"[块提取] 检测到旧的API结构，文档包含pages")
-            logger.debug(f"[块提取] pages 属性类型: {type(document.pages)}")
-            logger.debug(f"[块提取] pages 数量: {len(document.pages)}")
+            logger.debug("[块提取] pages 属性类型: %s", type(document.pages))
+            logger.debug("[块提取] pages 数量: %s", len(document.pages))
             
             # 处理 pages 可能是字典或列表的情况
             pages_items = []
             if isinstance(document.pages, dict):
                 # pages 是字典，使用 items() 获取键值对
-                logger.debug(f"[块提取] pages 是字典，键: {list(document.pages.keys())}")
+                logger.debug("[块提取] pages 是字典，键: %s", list(document.pages.keys()))
                 pages_items = list(document.pages.items())
             else:
                 # pages 是列表，使用 enumerate() 获取索引和值
@@ -265,46 +399,51 @@ class PDFParser:
                     except (ValueError, TypeError):
                         page_num = 1  # 默认页码为1
                 
-                logger.debug(f"[块提取] 页面 {page_num} 类型: {type(page_value)}")
-                logger.debug(f"[块提取] 页面 {page_num} 属性: {[attr for attr in dir(page_value) if not attr.startswith('_')]}")
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("[块提取] 页面 %s 类型: %s", page_num, type(page_value))
+                    logger.debug("[块提取] 页面 %s 属性: %s", page_num, [attr for attr in dir(page_value) if not attr.startswith('_')])
                 
                 # 如果 page_value 是整数，跳过
                 if isinstance(page_value, (int, str)):
-                    logger.debug(f"[块提取] 页面值是 {type(page_value)}，跳过")
+                    logger.debug("[块提取] 页面值是 %s，跳过", type(page_value))
                     continue
                 
                 # 检查页面是否有 blocks 属性
                 if hasattr(page_value, 'blocks'):
-                    logger.debug(f"[块提取] 页面 {page_num} 包含 {len(page_value.blocks)} 个块")
+                    logger.debug("[块提取] 页面 %s 包含 %s 个块", page_num, len(page_value.blocks))
                     for block in page_value.blocks:
                         processed_block = self._process_block(block, page_num, document)
                         if processed_block:
-                            blocks.append(processed_block)
+                            block_count += 1
+                            yield processed_block
                 elif hasattr(page_value, 'block'):
                     # 可能是单数形式
                     processed_block = self._process_block(page_value.block, page_num, document)
                     if processed_block:
-                        blocks.append(processed_block)
+                        block_count += 1
+                        yield processed_block
                 else:
                     # 检查是否有其他可能的内容属性
                     content_found = False
                     for content_attr in ['elements', 'content', 'body', 'items', 'children']:
                         if hasattr(page_value, content_attr):
                             content_value = getattr(page_value, content_attr)
-                            logger.debug(f"[块提取] 页面 {page_num} 有 {content_attr} 属性，类型: {type(content_value)}")
+                            logger.debug("[块提取] 页面 %s 有 %s 属性，类型: %s", page_num, content_attr, type(content_value))
                             
                             if hasattr(content_value, '__iter__') and not isinstance(content_value, (str, bytes)):
                                 # 可迭代对象，遍历每个元素
                                 for element in content_value:
                                     processed_block = self._process_block(element, page_num, document)
                                     if processed_block:
-                                        blocks.append(processed_block)
+                                        block_count += 1
+                                        yield processed_block
                                         content_found = True
                             else:
                                 # 单个对象，直接处理
                                 processed_block = self._process_block(content_value, page_num, document)
                                 if processed_block:
-                                    blocks.append(processed_block)
+                                    block_count += 1
+                                    yield processed_block
                                     content_found = True
                             
                             if content_found:
@@ -312,38 +451,49 @@ class PDFParser:
                     
                     if not content_found:
                         # 尝试将整个页面作为整体块处理
-                        logger.debug(f"[块提取] 尝试将页面 {page_num} 作为整体块处理")
+                        logger.debug("[块提取] 尝试将页面 %s 作为整体块处理", page_num)
                         processed_block = self._process_block(page_value, page_num, document)
                         if processed_block:
-                            blocks.append(processed_block)
+                            block_count += 1
+                            yield processed_block
         
         elif hasattr(document, 'content'):
             # 尝试处理content属性
             logger.info(f"[块提取] 检测到content属性")
-            logger.debug(f"[块提取] content 属性类型: {type(document.content)}")
+            logger.debug("[块提取] content 属性类型: %s", type(document.content))
             
             if isinstance(document.content, list):
                 for item in document.content:
                     processed_block = self._process_block(item, 1, document)
                     if processed_block:
-                        blocks.append(processed_block)
+                        block_count += 1
+                        yield processed_block
             else:
                 processed_block = self._process_block(document.content, 1, document)
                 if processed_block:
-                    blocks.append(processed_block)
+                    block_count += 1
+                    yield processed_block
         else:
             logger.warning(f"[块提取] 未检测到blocks或pages属性，文档结构可能不支持")
         
-        logger.info(f"[块提取] 原始块提取完成，共 {len(blocks)} 个块。开始合并...")
-        
+        logger.info(f"[块提取] 原始块提取完成，共 {block_count} 个块")
+    
+    def _merge_and_classify(self, blocks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        对原始块执行智能合并，并在合并后的内容上重新分级
+        """
+        return list(self._iter_merge_and_classify(blocks))
+    
+    def _iter_merge_and_classify(self, blocks: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        对原始块执行智能合并，逐个产出重新分级后的块 (原始块可为生成器，全程流式)
+        """
         # --- Apply Smart Chunk Merging ---
-        merged_blocks = self.chunk_merger.merge_blocks(blocks)
-        logger.info(f"[块提取] 块合并完成，剩余 {len(merged_blocks)} 个块")
+        merged_blocks = self.chunk_merger.iter_merge_blocks(blocks)
         
         # --- Re-classify Merged Blocks ---
         # ChunkMerger might have set 'tier' to 'YELLOW' (heuristic), or 'GREEN'.
         # We need to run the full classification logic on the MERGED content.
-        final_blocks = []
         for block in merged_blocks:
             # If usage 'type' is 'potential_table', we might want to keep it or refine it
             heuristic_tier = block.get("tier", "GREEN")
@@ -352,9 +502,84 @@ class PDFParser:
             # Re-run classifier with semantic check
             final_tier = self.classify_block(content, heuristic_tier)
             block["tier"] = final_tier
-            final_blocks.append(block)
+            yield block
+    
+    def _fast_text_blocks(self, file_path: str) -> List[Dict[str, Any]]:
+        """
+        原生文本 PDF 的快速路径: 使用 pymupdf4llm 直接导出 Markdown 并切分为块，跳过 Docling 版面模型
+        
+        Args:
+            file_path: PDF 文件路径
             
-        return final_blocks
+        Returns:
+            合并并分级后的文档块列表；不适用快速路径时返回 None (调用方回退到 Docling)
+        """
+        from core.config import settings
+        if not settings.USE_FAST_TEXT_PATH or settings.USE_OCR:
+            return None
+        
+        try:
+            import fitz
+            import pymupdf4llm
+        except ImportError:
+            return None
+        
+        # 探测原生文本覆盖率与嵌入图片数，扫描件/图片为主的文档仍走 Docling
+        with fitz.open(file_path) as doc:
+            native_chars = 0
+            image_count = 0
+            for page in doc:
+                native_chars += len(page.get_text())
+                image_count += len(page.get_images())
+            native_ratio = native_chars / max(1, doc.page_count * 500)
+        
+        # 快速路径只产出文本/表格块，含图片的文档交给 Docling，避免图片 (电路图、截面图等) 被丢弃
+        if image_count:
+            logger.info(f"[PDF解析] 文档包含 {image_count} 张图片，使用 Docling 完整解析")
+            return None
+        
+        if native_ratio < settings.NATIVE_TEXT_RATIO_THRESHOLD:
+            logger.info(f"[PDF解析] 原生文本覆盖率 {native_ratio:.2f} 低于阈值，使用 Docling 完整解析")
+            return None
+        
+        logger.info(f"[PDF解析] 原生文本覆盖率 {native_ratio:.2f}，使用 pymupdf4llm 快速路径")
+        page_chunks = pymupdf4llm.to_markdown(file_path, page_chunks=True)
+        
+        blocks = []
+        for page_idx, chunk in enumerate(page_chunks):
+            page_num = chunk.get("metadata", {}).get("page", page_idx + 1)
+            for section in chunk.get("text", "").split("\n\n"):
+                section = section.strip()
+                if not section:
+                    continue
+                lines = section.split("\n")
+                # Markdown 表格 (每行以 | 开头) 直接作为 YELLOW 表格块
+                if all(line.lstrip().startswith("|") for line in lines):
+                    block_type, tier = "table", "YELLOW"
+                else:
+                    block_type, tier = "text", "GREEN"
+                blocks.append({
+                    "type": block_type,
+                    "page": page_num,
+                    "coordinates": {"x1": 0, "y1": 0, "x2": 0, "y2": 0},
+                    "content": section,
+                    "tier": tier
+                })
+        
+        logger.info(f"[块提取] 快速路径提取 {len(blocks)} 个原始块。开始合并...")
+        return self._merge_and_classify(blocks)
+    
+    def _iter_extractors(self, block_type):
+        """
+        按优先级产出内容提取方式: 该块类型曾命中的提取方式优先，其余按 _EXTRACTORS 顺序
+        (命中方式对当前块取不到内容时，继续走完整的探测链)
+        """
+        hit = self._type_hit.get(block_type)
+        if hit:
+            yield hit
+        for entry in self._EXTRACTORS:
+            if entry is not hit:
+                yield entry
     
     def _process_block(self, block, page_num, document):
         """
@@ -367,25 +592,30 @@ class PDFParser:
         Returns:
             处理后的块数据，如果无法处理则返回 None
         """
-        logger.debug(f"[块处理] 开始处理块 - 页码: {page_num}")
-        logger.debug(f"[块处理] 块对象类型: {type(block)}")
-        logger.debug(f"[块处理] 块对象属性: {[attr for attr in dir(block) if not attr.startswith('_')]}")
+        # 分组容器本身没有内容 (其子节点会被单独遍历)，无需探测
+        if isinstance(block, GroupItem):
+            return None
         
-        block_type = getattr(block, 'type', 'unknown')
+        # 热路径: dir() 与列表推导仅在 DEBUG 级别开启时计算
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("[块处理] 开始处理块 - 页码: %s", page_num)
+            logger.debug("[块处理] 块对象类型: %s", type(block))
+            logger.debug("[块处理] 块对象属性: %s", [attr for attr in dir(block) if not attr.startswith('_')])
         
-        # 更鲁棒的坐标提取，处理bbox可能不存在的情况
-        x1 = getattr(block, 'x1', 0)
-        y1 = getattr(block, 'y1', 0)
-        x2 = getattr(block, 'x2', 0)
-        y2 = getattr(block, 'y2', 0)
+        block_type = getattr(block, 'type', 'unknown')
         
-        # 尝试从bbox属性获取坐标
-        if hasattr(block, 'bbox'):
-            bbox = block.bbox
-            x1 = getattr(bbox, 'x1', x1)
-            y1 = getattr(bbox, 'y1', y1)
-            x2 = getattr(bbox, 'x2', x2)
-            y2 = getattr(bbox, 'y2', y2)
+        # 更鲁棒的坐标提取: 优先从bbox属性获取，仅在bbox不存在时逐个探测块自身的坐标属性
+        bbox = getattr(block, 'bbox', None)
+        if bbox is not None:
+            x1 = getattr(bbox, 'x1', 0)
+            y1 = getattr(bbox, 'y1', 0)
+            x2 = getattr(bbox, 'x2', 0)
+            y2 = getattr(bbox, 'y2', 0)
+        else:
+            x1 = getattr(block, 'x1', 0)
+            y1 = getattr(block, 'y1', 0)
+            x2 = getattr(block, 'x2', 0)
+            y2 = getattr(block, 'y2', 0)
         
         block_data = {
             "type": block_type,
@@ -408,23 +638,20 @@ class PDFParser:
                 table_text = ""
                 if hasattr(block, 'export_to_markdown'):
                     table_text = block.export_to_markdown(document)
-                    logger.debug(f"[块处理] 使用 export_to_markdown 提取表格成功")
+                    logger.debug("[块处理] 使用 export_to_markdown 提取表格成功")
                 elif hasattr(block, 'rows'):
-                    # 旧逻辑兼容
-                    table_content = []
-                    for row in block.rows:
-                        if hasattr(row, 'cells'):
-                            row_content = [cell.text for cell in row.cells]
-                            table_content.append(row_content)
-                    if table_content:
-                        table_text = "\n".join(["\t".join(row) for row in table_content])
+                    # 旧逻辑兼容 (生成器直接拼接，不构建中间的行/单元格列表)
+                    table_text = "\n".join(
+                        "\t".join(cell.text for cell in row.cells)
+                        for row in block.rows if hasattr(row, 'cells')
+                    )
                 
                 if table_text.strip():
                     block_data["content"] = table_text
                     block_data["tier"] = "YELLOW"  # 强制标记为 YELLOW 以触发 Table Specialist
                     block_data["type"] = "table"   # 确保类型正确
                     content_found = True
-                    logger.debug(f"[块处理] 表格块处理成功 (优先) - 页码: {page_num}")
+                    logger.debug("[块处理] 表格块处理成功 (优先) - 页码: %s", page_num)
             except Exception as e:
                 logger.warning(f"[块处理] 表格块优先处理失败: {str(e)}")
 
@@ -432,60 +659,51 @@ class PDFParser:
             # 图像块，提取图像内容
             try:
                 # 获取图像的 Base64 编码
-                from docling_core.types.doc import ImageRefMode
                 image_base64 = None
                 
-                # 情况1: block.image 是 ImageRef，有 uri 且是 data uri
+                # 情况1: block.image 是 ImageRef，有 uri: data uri 直接复用已编码的内容，
+                #        文件 uri 直接读取已存储的图片字节，均无需重新编码
                 if hasattr(block, 'image') and hasattr(block.image, 'uri') and block.image.uri:
                     uri_str = str(block.image.uri)
                     if uri_str.startswith('data:image'):
                         image_base64 = uri_str.split(',')[1]
+                    else:
+                        image_path = uri_str[len('file://'):] if uri_str.startswith('file://') else uri_str
+                        if os.path.isfile(image_path):
+                            with open(image_path, 'rb') as f:
+                                image_base64 = b64encode(f.read()).decode("ascii")
                 
                 # 情况2: block.image 是 bytes (可能是旧版本或特定情况)
                 elif hasattr(block, 'image') and isinstance(block.image, bytes):
-                    image_base64 = base64.b64encode(block.image).decode("utf-8")
+                    image_base64 = b64encode(block.image).decode("ascii")
                 
-                # 情况3: 使用 get_image 方法 (需要 document)
-                elif hasattr(block, 'get_image') and document:
+                # 情况3: 使用 get_image 方法 (需要 document)，仅在拿不到原始图片字节时重新编码
+                if not image_base64 and hasattr(block, 'get_image') and document:
                     try:
                         pil_image = block.get_image(document)
                         if pil_image:
-                            # 转换为 base64
+                            # 转换为 base64 (compress_level=1: 仅供 LLM 读取，压缩率换取编码速度)
                             from io import BytesIO
                             buffered = BytesIO()
-                            pil_image.save(buffered, format="PNG")
-                            image_base64 = base64.b64encode(buffered.getvalue()).decode("utf-8")
+                            pil_image.save(buffered, format="PNG", compress_level=1)
+                            image_base64 = b64encode(buffered.getvalue()).decode("ascii")
                     except Exception as e:
-                        logger.debug(f"[块处理] get_image 失败: {e}")
+                        logger.debug("[块处理] get_image 失败: %s", e)
 
                 if image_base64:
                     block_data["content"] = image_base64
                     block_data["tier"] = "YELLOW"
                     block_data["type"] = "image"
                     content_found = True
-                    logger.debug(f"[块处理] 图像块处理成功 (优先) - 页码: {page_num}")
+                    logger.debug("[块处理] 图像块处理成功 (优先) - 页码: %s", page_num)
             except Exception as e:
                 logger.warning(f"[块处理] 图像块优先处理失败: {str(e)}")
 
         # 优先尝试多种内容提取方式，不依赖于块类型
-        logger.debug(f"[块处理] 尝试多种内容提取方式，块类型: {block_type}")
-        
-        # 扩展的内容提取方式列表
-        extraction_methods = [
-            ('text', lambda b: getattr(b, 'text', None)),
-            ('content', lambda b: getattr(b, 'content', None)),
-            ('text_content', lambda b: getattr(b, 'text_content', None)),
-            ('full_text', lambda b: getattr(b, 'full_text', None)),
-            ('body', lambda b: str(getattr(b, 'body', None))),
-            ('paragraphs', lambda b: "".join([p.text for p in b.paragraphs]) if hasattr(b, 'paragraphs') else None),
-            ('lines', lambda b: "".join([line.text for line in b.lines]) if hasattr(b, 'lines') else None),
-            ('string_value', lambda b: getattr(b, 'string_value', None)),
-            ('value', lambda b: getattr(b, 'value', None)),
-            ('data', lambda b: getattr(b, 'data', None)),
-        ]
+        logger.debug("[块处理] 尝试多种内容提取方式，块类型: %s", block_type)
         
         if not content_found:
-            for method_name, extractor in extraction_methods:
+            for method_name, extractor in self._iter_extractors(type(block)):
                 try:
                     content = extractor(block)
                     if content and str(content).strip():
@@ -496,14 +714,16 @@ class PDFParser:
                         block_data["tier"] = self.classify_block(content)
                         
                         # Update type if it was unknown and we found text
-                        if block_data["type"] == "unknown" and method_name in ['text', 'content', 'text_content', 'full_text', 'paragraphs', 'lines', 'string_value']:
+                        if block_data["type"] == "unknown" and method_name in self._TEXT_EXTRACTORS:
                             block_data["type"] = "text"
                         
+                        # 记住该类型首个成功的提取方式，同类型后续块直接命中
+                        self._type_hit[type(block)] = (method_name, extractor)
                         content_found = True
                         # logger.debug(f"[块处理] 使用{method_name}属性获取内容成功 - 页码: {page_num}, 内容长度: {len(content)}")
                         break
                 except Exception as e:
-                    logger.debug(f"[块处理] 使用{method_name}属性获取内容失败: {str(e)}")
+                    logger.debug("[块处理] 使用%s属性获取内容失败: %s", method_name, str(e))
         
         # 不要在这里立即调用 classify_block，我们会在 Chunk合并 后统一进行分类
         # 除非是为了 type guessing
@@ -512,7 +732,7 @@ class PDFParser:
         
         # 如果还是没有找到内容，再根据块类型尝试特殊处理 (Fallback for Text)
         if not content_found:
-            logger.debug(f"[块处理] 根据块类型 {block_type} 进行特殊处理 (Fallback)")
+            logger.debug("[块处理] 根据块类型 %s 进行特殊处理 (Fallback)", block_type)
             
             # 使用 isinstance 检查类型，更健壮
             if isinstance(block, TextItem) or block_type == "text":
@@ -524,110 +744,241 @@ class PDFParser:
                             block_data["content"] = text_content
                             block_data["tier"] = self.classify_block(text_content)
                             content_found = True
-                            logger.debug(f"[块处理] 文本块处理成功 - 页码: {page_num}, 内容长度: {len(text_content)}")
+                            logger.debug("[块处理] 文本块处理成功 - 页码: %s, 内容长度: %s", page_num, len(text_content))
                     except Exception as e:
                         logger.warning(f"[块处理] 文本块处理失败: {str(e)}")
         
         # 最终兜底：尝试将整个块转换为字符串
-        if not content_found:
+        # Docling 节点的 str() 是整棵子树的字段 repr，开销大且不是正文内容，直接跳过
+        if not content_found and not isinstance(block, NodeItem):
             try:
                 block_str = str(block)
-                if block_str.strip() and len(block_str) > 10:  # 降低长度要求，确保更多块能被处理
+                # 默认对象 repr ("<... object at 0x...>") 同样不是内容
+                if block_str.strip() and len(block_str) > 10 and not block_str.startswith('<'):  # 降低长度要求，确保更多块能被处理
                     block_data["content"] = block_str
                     block_data["tier"] = "GREEN"  # 默认级别
                     content_found = True
-                    logger.debug(f"[块处理] 使用块字符串表示获取内容成功 - 页码: {page_num}")
+                    logger.debug("[块处理] 使用块字符串表示获取内容成功 - 页码: %s", page_num)
                 else:
-                    logger.debug(f"[块处理] 块字符串太短或无意义 - 长度: {len(block_str)}")
+                    logger.debug("[块处理] 块字符串太短或无意义 - 长度: %s", len(block_str))
             except Exception as e:
                 logger.warning(f"[块处理] 块字符串转换失败: {str(e)}")
         
         # 只有当找到内容时，才返回块数据
         if content_found:
-            logger.debug(f"[块处理] 块处理成功 - 页码: {page_num}, 类型: {block_type}")
+            logger.debug("[块处理] 块处理成功 - 页码: %s, 类型: %s", page_num, block_type)
             return block_data
         else:
             logger.warning(f"[块处理] 块处理失败，未找到内容 - 页码: {page_num}, 类型: {block_type}")
             return None
     
-    def _verify_single_block(self, block, idx, gemini_client):
+    def process_pdf(self, file_path: str, gemini_client, progress_callback=None) -> List[Dict[str, Any]]:
+        """
+        完整处理 PDF 文件的流程
+        
+        Args:
+            file_path: PDF 文件路径
+            gemini_client: Gemini 客户端实例
+            progress_callback: 进度回调函数 callback(current, total, msg)
+            
+        Returns:
+            处理后的文档块列表
+        """
+        logger.info(f"[PDF处理] ========== 开始处理PDF文件: {file_path} ==========")
+        
+        if progress_callback: progress_callback(0, 0, "正在解析 PDF 结构...")
+
+        # 1-3. 解析 PDF 并流式产出文档块 (带文件级缓存)
+        # 4. 分级 QA 验证: 块一经分级即提交验证，LLM 调用与块提取/分级重叠进行
+        verified_blocks = self.tiered_qa_verification(self._iter_blocks(file_path), gemini_client, progress_callback)
+        
+        logger.info(f"[PDF处理] ========== PDF处理完成，返回 {len(verified_blocks)} 个验证后的块 ==========")
+        return verified_blocks
+
+    def _iter_blocks(self, file_path: str) -> Iterator[Dict[str, Any]]:
+        """
+        流式获取文档块: 文件内容哈希缓存 -> 原生文本快速路径 -> Docling 完整解析
+        
+        Args:
+            file_path: PDF 文件路径
+            
+        Yields:
+            合并并分级后的文档块 (尚未 QA 验证)
+        """
+        cache_key = self._blocks_cache_key(file_path)
+        if cache_key:
+            cached_blocks = self.cache.get(cache_key)
+            if cached_blocks is not None:
+                logger.info(f"[PDF处理] 命中解析缓存，跳过 Docling 解析 ({len(cached_blocks)} 个块)")
+                yield from cached_blocks
+                return
+        
+        # 1. 原生文本快速路径 (不适用时回退到 Docling)
+        block_iter = self._fast_text_blocks(file_path)
+        
+        if block_iter is None:
+            from core.config import settings
+            if settings.PARSE_WORKERS > 1:
+                # 2'. 按页码区间多进程并行解析与块提取 (规避 GIL；子进程以 spawn 启动，见 extract_blocks_parallel)
+                block_iter = iter(self.extract_blocks_parallel(file_path, settings.PARSE_WORKERS))
+            else:
+                # 2. 解析 PDF
+                document = self.parse_pdf(file_path)
+                
+                # 3. 流式提取文档块
+                block_iter = self.iter_document_blocks(document)
+        
+        blocks = []
+        for block in block_iter:
+            # 缓存的是 QA 前的快照，下游验证会原地写入 verified_content
+            blocks.append(dict(block))
+            yield block
+        
+        if cache_key:
+            self.cache.set(cache_key, blocks)
+
+    def _blocks_cache_key(self, file_path: str):
+        """
+        文档块缓存键 (按文件内容哈希)，未启用缓存时返回 None
         """
-        验证单个块的逻辑，用于并行处理
+        if not self.cache:
+            return None
+        from core.cache import file_content_hash
+        return f"blocks_{file_content_hash(file_path)}"
+
+    def process_pdf_batch(self, file_paths: List[str], gemini_client, progress_callback=None) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        批量处理多个 PDF: 需要 Docling 的文件统一经 convert_all 解析，
+        所有文件的块合并后一起做 QA 验证，使批量请求可跨文件凑满
+        
+        Args:
+            file_paths: PDF 文件路径列表
+            gemini_client: Gemini 客户端实例
+            progress_callback: 进度回调函数
+            
+        Returns:
+            文件路径 -> 验证后的文档块列表
         """
-        # 确保 block 有 content 字段
-        if "content" not in block:
-            # logger.warning(f"[QA验证] 块 {idx+1} 没有content字段，跳过")
-            return block
+        logger.info(f"[PDF处理] 开始批量处理 {len(file_paths)} 个文件")
         
+        blocks_by_path = {}
+        docling_jobs = []  # (file_path, cache_key)
+        
+        for file_path in file_paths:
+            cache_key = self._blocks_cache_key(file_path)
+            cached_blocks = self.cache.get(cache_key) if cache_key else None
+            if cached_blocks is not None:
+                logger.info(f"[PDF处理] 命中解析缓存: {file_path}")
+                blocks_by_path[file_path] = cached_blocks
+                continue
+            
+            fast_blocks = self._fast_text_blocks(file_path)
+            if fast_blocks is not None:
+                blocks_by_path[file_path] = fast_blocks
+                if cache_key:
+                    self.cache.set(cache_key, [dict(b) for b in fast_blocks])
+                continue
+            
+            docling_jobs.append((file_path, cache_key))
+        
+        if docling_jobs:
+            if progress_callback: progress_callback(0, 0, f"正在批量解析 {len(docling_jobs)} 个 PDF...")
+            documents = self.parse_pdfs([file_path for file_path, _ in docling_jobs])
+            for (file_path, cache_key), document in zip(docling_jobs, documents):
+                blocks = self.extract_document_blocks(document)
+                blocks_by_path[file_path] = blocks
+                if cache_key:
+                    self.cache.set(cache_key, [dict(b) for b in blocks])
+        
+        all_blocks = [block for file_path in file_paths for block in blocks_by_path[file_path]]
+        verified_blocks = self.tiered_qa_verification(all_blocks, gemini_client, progress_callback)
+        
+        # 按文件拆分回各自的块列表
+        results = {}
+        offset = 0
+        for file_path in file_paths:
+            count = len(blocks_by_path[file_path])
+            results[file_path] = verified_blocks[offset:offset + count]
+            offset += count
+        
+        logger.info(f"[PDF处理] 批量处理完成，共 {len(verified_blocks)} 个块")
+        return results
+
+    def extract_blocks_parallel(self, file_path: str, n_workers: int = 4) -> List[Dict[str, Any]]:
+        """
+        按页码区间切分 PDF，在常驻进程池中并行执行 Docling 解析与原始块提取，再在本进程中合并与分级
+        
+        Args:
+            file_path: PDF 文件路径
+            n_workers: 子进程数量
+            
+        Returns:
+            合并后的文档块列表 (页码已按原文档偏移修正)
+        """
+        from pypdf import PdfReader, PdfWriter
+        import tempfile
+        import shutil
+        
+        reader = PdfReader(file_path)
+        total_pages = len(reader.pages)
+        
+        # 页数太少时切分的进程开销大于收益，直接走单进程路径
+        if n_workers <= 1 or total_pages < 2 * n_workers:
+            return self.extract_document_blocks(self.parse_pdf(file_path))
+        
+        pages_per_chunk = -(-total_pages // n_workers)
+        tmp_dir = tempfile.mkdtemp(prefix="pdf_parse_")
+        chunks = []  # (分片路径, 起始页偏移)
         try:
-            # Retry logic for 503 Overload or other transient errors
-            max_retries = 3
-            retry_delay = 2
+            for start in range(0, total_pages, pages_per_chunk):
+                end = min(start + pages_per_chunk, total_pages)
+                writer = PdfWriter()
+                for page_num in range(start, end):
+                    writer.add_page(reader.pages[page_num])
+                chunk_path = os.path.join(tmp_dir, f"part_{start}.pdf")
+                with open(chunk_path, "wb") as f:
+                    writer.write(f)
+                chunks.append((chunk_path, start))
             
-            for attempt in range(max_retries):
-                try:
-                    if block["tier"] == "RED":
-                        # RED 块：优化为单次高质量解析
-                        if block["type"] == "text":
-                            logger.debug(f"[QA验证] RED块 {idx+1} 开始解析 (优化模式)")
-                            verified_text = gemini_client.generate_text(
-                                f"作为 IC/BCD 工艺专家，请准确解析并修正以下技术内容的表述，提取关键参数：\n{block['content']}",
-                                use_pro=True
-                            )
-                            block["verified_content"] = verified_text
-                            block["verification_passed"] = True
-                    
-                    elif block["tier"] == "YELLOW":
-                        # YELLOW 块
-                        if block["type"] == "table":
-                            logger.debug(f"[QA验证] YELLOW块 {idx+1} 表格解析")
-                            table_markdown = block["content"]
-                            verified_text = gemini_client.generate_text(
-                                f"请准确解析以下工艺参数表格(Markdown格式)，提取关键参数和层级关系：\n{table_markdown}",
-                                use_pro=True
-                            )
-                            block["verified_content"] = verified_text
-                            block["verification_passed"] = True
-                        elif block["type"] == "image":
-                            logger.debug(f"[QA验证] YELLOW块 {idx+1} 图像描述生成")
-                            image_description = gemini_client.generate_multimodal(
-                                prompt="请分析这张 IC/BCD 工艺相关的图片。\n1. 如果图片是表格（包含有线或无线的表结构），请务必将其转换为 Markdown 表格格式输出。\n2. 如果是电路图、截面图或示意图，请详细描述其结构、关键参数和特性。\n3. 如果是普通文本截图，请提取其中的文字内容。",
-                                image_base64=block["content"],
-                                use_pro=True
-                            )
-                            block["verified_content"] = image_description
-                            block["verification_passed"] = True
-                        else:
-                            block["verified_content"] = block["content"]
-                            block["verification_passed"] = True
-                    
-                    elif block["tier"] == "GREEN":
-                        block["verified_content"] = block["content"]
-                        block["verification_passed"] = True
-
-                    # If successful, break retry loop
-                    break
-
-                except Exception as api_error:
-                    if attempt < max_retries - 1:
-                        import time
-                        wait_time = retry_delay * (2 ** attempt)
-                        logger.warning(f"[QA验证] 块 {idx+1} API调用失败 (尝试 {attempt+1}/{max_retries}): {api_error}. 等待 {wait_time}s 重试...")
-                        time.sleep(wait_time)
-                    else:
-                        raise api_error # Re-raise to be caught by outer try-except
+            logger.info(f"[PDF解析] 并行解析: {total_pages} 页切分为 {len(chunks)} 个分片 (workers={n_workers})")
+            
+            from core.config import settings
+            from concurrent.futures.process import BrokenProcessPool
+            executor = _get_parse_pool(n_workers, settings.USE_OCR)
+            raw_blocks = []
+            try:
+                # map 保持分片顺序，拼接结果即为原文档阅读顺序
+                results = executor.map(_extract_raw_blocks_worker, [path for path, _ in chunks])
+                for (_, offset), chunk_blocks in zip(chunks, results):
+                    for block in chunk_blocks:
+                        block["page"] = block.get("page", 1) + offset
+                    raw_blocks.extend(chunk_blocks)
+            except BrokenProcessPool:
+                _reset_parse_pool()
+                raise
+            
+            # 合并与分级 (需要嵌入模型) 在主进程中完成，子进程只做 Docling 解析与原始块提取
+            blocks = self._merge_and_classify(raw_blocks)
+            logger.info(f"[PDF解析] 并行解析完成，共 {len(blocks)} 个块")
+            return blocks
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
 
-        except Exception as e:
-            logger.error(f"[QA验证] 块 {idx+1} 验证最终失败: {str(e)}")
-            block["verified_content"] = str(block.get("content", ""))
-            block["verification_passed"] = False
+    async def parse_pdf_async(self, file_path: str) -> Document:
+        """
+        异步解析 PDF 文件 (Docling 转换在工作线程中执行，不阻塞事件循环)
+        
+        Args:
+            file_path: PDF 文件路径
             
-        return block
+        Returns:
+            解析后的文档对象
+        """
+        return await asyncio.to_thread(self.parse_pdf, file_path)
 
-    
-    def process_pdf(self, file_path: str, gemini_client, progress_callback=None) -> List[Dict[str, Any]]:
+    async def process_pdf_async(self, file_path: str, gemini_client, progress_callback=None) -> List[Dict[str, Any]]:
         """
-        完整处理 PDF 文件的流程
+        完整处理 PDF 文件的异步版本，供 async 调用方 (如 FastAPI 路由) 使用
         
         Args:
             file_path: PDF 文件路径
@@ -637,149 +988,448 @@ class PDFParser:
         Returns:
             处理后的文档块列表
         """
-        logger.info(f"[PDF处理] ========== 开始处理PDF文件: {file_path} ==========")
+        logger.info(f"[PDF处理] ========== 开始异步处理PDF文件: {file_path} ==========")
         
         if progress_callback: progress_callback(0, 0, "正在解析 PDF 结构...")
 
-        # 1. 解析 PDF
-        document = self.parse_pdf(file_path)
-        
-        # 2. 提取文档块
-        blocks = self.extract_document_blocks(document)
+        # 解析与块提取 (Docling / 快速路径 / 缓存) 为阻塞逻辑，放入线程执行
+        blocks = await asyncio.to_thread(lambda: list(self._iter_blocks(file_path)))
         
-        # 3. 分级 QA 验证
+        # QA 验证的 LLM 调用为纯 I/O，直接在事件循环上并发
         if progress_callback: progress_callback(0, len(blocks), "开始 QA 验证...")
-        verified_blocks = self.tiered_qa_verification(blocks, gemini_client, progress_callback)
+        verified_blocks = await self.atiered_qa_verification(blocks, gemini_client, progress_callback)
         
-        logger.info(f"[PDF处理] ========== PDF处理完成，返回 {len(verified_blocks)} 个验证后的块 ==========")
+        logger.info(f"[PDF处理] ========== PDF异步处理完成，返回 {len(verified_blocks)} 个验证后的块 ==========")
         return verified_blocks
 
-    def tiered_qa_verification(self, blocks: List[Dict[str, Any]], gemini_client, progress_callback=None) -> List[Dict[str, Any]]:
+    def tiered_qa_verification(self, blocks: Iterable[Dict[str, Any]], gemini_client, progress_callback=None) -> List[Dict[str, Any]]:
         """
         对不同级别的块进行不同程度的 QA 验证 (Batch Optimization)
-        """
-        total_blocks = len(blocks)
-        logger.info(f"[QA验证] 开始QA验证，共 {total_blocks} 个块 (Batch模式)")
         
-        # 分组
-        red_blocks_indices = []
-        yellow_blocks_with_indices = []
-        green_blocks_indices = []
+        blocks 可以是列表，也可以是流式产出块的生成器: 每个块一经产出即提交到线程池，
+        LLM 调用与上游的块提取/分级重叠执行。
+        """
+        logger.info(f"[QA验证] 开始QA验证 (Batch + 流式模式)")
         
-        for i, block in enumerate(blocks):
-            tier = block.get("tier", "GREEN")
-            b_type = block.get("type", "text")
-            
-            if tier == "RED" and b_type == "text":
-                red_blocks_indices.append(i)
-            elif tier == "YELLOW" or (tier == "RED" and b_type != "text"):
-                # YELLOW 和 非文本RED (如table/image) 仍保持单次处理或特殊处理
-                # 这里我们假设所有 RED table/image 也走 YELLOW path (visual understanding)
-                yellow_blocks_with_indices.append((i, block))
-            else:
-                green_blocks_indices.append(i)
+        from concurrent.futures import ThreadPoolExecutor
+        import concurrent.futures
+        from core.config import settings
         
-        logger.info(f"[QA验证] 统计: RED_TEXT={len(red_blocks_indices)}, SPECIAL/YELLOW={len(yellow_blocks_with_indices)}, GREEN={len(green_blocks_indices)}")
-
+        batch_sizes = {"text": settings.QA_BATCH_SIZE, "table": settings.QA_BATCH_SIZE, "image": settings.QA_IMAGE_BATCH_SIZE}
+        collected_blocks = []
         verified_blocks_map = {} # idx -> block
-
-        # --- 1. Batch Process RED Text Blocks ---
-        if red_blocks_indices:
-            batch_size = 5
-            for k in range(0, len(red_blocks_indices), batch_size):
-                batch_indices = red_blocks_indices[k : k + batch_size]
-                batch_content = []
-                for idx in batch_indices:
-                    # Strip newlines to make it cleaner in prompt
-                    content_clean = blocks[idx].get("content", "").replace("\n", " ")
-                    batch_content.append(f"Block_{idx}: {content_clean}")
+        llm_indices = []
+        pending = {"text": [], "table": [], "image": []}  # 按类型凑批的块 (idx, block)
+        leaders = {}    # 去重键 -> 首个提交 LLM 的块索引
+        followers = {}  # 首个块索引 -> 内容相同的重复块索引列表
+        stats = {"RED_TEXT": 0, "TABLE": 0, "IMAGE": 0, "GREEN": 0, "CACHED": 0, "DUPLICATE": 0}
+        
+        # 线程池大小即在途 LLM 请求上限 (与异步路径共用 LLM_CONCURRENCY，兼顾 API 限流)
+        with ThreadPoolExecutor(max_workers=settings.LLM_CONCURRENCY) as executor:
+            future_to_indices = {}
+            
+            def submit_batch(kind):
+                batch = pending[kind]
+                pending[kind] = []
+                future = executor.submit(self._verify_batch, batch, gemini_client, kind)
+                future_to_indices[future] = [idx for idx, _ in batch]
+            
+            for i, block in enumerate(blocks):
+                collected_blocks.append(block)
                 
-                prompt_text = "\n\n".join(batch_content)
-                full_prompt = (
-                    f"作为 IC/BCD 工艺专家，请批量解析以下技术内容块。提取关键参数。\n"
-                    f"请严格按照JSON格式返回，Key为Block_ID (e.g. 'Block_12')，Value为解析后的修正文本。\n"
-                    f"\n{prompt_text}"
-                )
+                # 命中块级 QA 缓存的块直接复用结果，不再调用 LLM
+                if self._apply_cached_qa(block):
+                    verified_blocks_map[i] = block
+                    stats["CACHED"] += 1
+                    continue
+                
+                # 重复内容 (页眉页脚、跨页重复表格等) 只验证一次，完成后回填
+                if self._needs_llm(block):
+                    leader = leaders.setdefault(self._qa_cache_key(block), i)
+                    if leader != i:
+                        followers.setdefault(leader, []).append(i)
+                        stats["DUPLICATE"] += 1
+                        continue
                 
+                kind = self._batch_kind(block)
+                if kind:
+                    # --- 1. RED 文本块 / 表格块 / 图片块按类型凑满一批即提交 ---
+                    stats[{"text": "RED_TEXT", "table": "TABLE", "image": "IMAGE"}[kind]] += 1
+                    pending[kind].append((i, block))
+                    if len(pending[kind]) >= batch_sizes[kind]:
+                        submit_batch(kind)
+                else:
+                    # --- 2. GREEN 块直接透传，不进入线程池 ---
+                    stats["GREEN"] += 1
+                    block["verified_content"] = block["content"]
+                    block["verification_passed"] = True
+                    verified_blocks_map[i] = block
+                
+                if progress_callback:
+                    progress_callback(len(verified_blocks_map), len(collected_blocks), "提取并提交 QA 验证...")
+            
+            # 提交剩余不足一批的块
+            for kind in pending:
+                if pending[kind]:
+                    submit_batch(kind)
+            
+            total_blocks = len(collected_blocks)
+            logger.info(f"[QA验证] 统计: 共 {total_blocks} 个块, {stats}")
+            
+            for future in concurrent.futures.as_completed(future_to_indices):
+                indices = future_to_indices[future]
                 try:
-                    logger.info(f"[QA验证] 发送Batch请求 (Size: {len(batch_indices)})")
-                    response_text = gemini_client.generate_text(full_prompt, use_pro=True)
-                    logger.info(f"[QA验证] Batch请求成功，解析完成")
-                    
-                    # 简单解析 JSON-like response (Gemini sometimes returns markdown json)
-                    import json
-                    # Try to find JSON structure
-                    json_str = response_text
-                    if "```json" in response_text:
-                        json_str = response_text.split("```json")[1].split("```")[0].strip()
-                    elif "```" in response_text:
-                        json_str = response_text.split("```")[1].split("```")[0].strip()
-                    
-                    try:
-                        parsed_batch = json.loads(json_str)
-                    except:
-                        logger.warning(f"[QA验证] Batch JSON解析失败，尝试Fallback")
-                        parsed_batch = {}
-
-                    # Fill results
-                    for idx in batch_indices:
-                        block = blocks[idx]
-                        key = f"Block_{idx}"
-                        if key in parsed_batch:
-                            block["verified_content"] = str(parsed_batch[key])
-                            block["verification_passed"] = True
-                        else:
-                            # Fallback if key missing
-                            block["verified_content"] = block["content"]
-                            block["verification_passed"] = True
-                        verified_blocks_map[idx] = block
-
+                    future.result()
+                    logger.info(f"[QA验证] Blocks {indices} 验证完成")
                 except Exception as e:
-                    logger.error(f"[QA验证] Batch处理异常: {e}")
-                    # Fallback for entire batch
-                    for idx in batch_indices:
-                        block = blocks[idx]
-                        block["verified_content"] = block["content"]
+                    logger.error(f"[QA验证] Blocks {indices} 失败: {e}")
+                    for idx in indices:
+                        block = collected_blocks[idx]
+                        block["verified_content"] = self._fallback_content(block)
                         block["verification_passed"] = False
-                        verified_blocks_map[idx] = block
-
+                for idx in indices:
+                    verified_blocks_map[idx] = collected_blocks[idx]
+                    for dup in followers.get(idx, ()):
+                        self._copy_verification(collected_blocks[idx], collected_blocks[dup])
+                        verified_blocks_map[dup] = collected_blocks[dup]
+                llm_indices.extend(indices)
+                
                 if progress_callback:
-                    progress_callback(k + len(batch_indices), total_blocks, f"Batch验证 RED Blocks...")
+                    progress_callback(len(verified_blocks_map), total_blocks, f"验证块 {indices}...")
 
-        # --- 2. Parallel Process YELLOW/Special Blocks ---
-        # Reuse existing threading logic for Images/Tables
-        from concurrent.futures import ThreadPoolExecutor
-        import concurrent.futures
+        # 写回块级 QA 缓存 (仅缓存经过 LLM 且验证成功的块)
+        if self.cache:
+            for idx in llm_indices:
+                block = verified_blocks_map[idx]
+                if block.get("verification_passed"):
+                    self.cache.set(self._qa_cache_key(block), block["verified_content"])
+
+        # Reassemble
+        verified_blocks = [verified_blocks_map[i] for i in range(total_blocks)]
+        return verified_blocks
+
+    def _batch_kind(self, block: Dict[str, Any]):
+        """
+        判断块可合并进哪类批量请求: RED 文本块为 "text"，RED/YELLOW 表格块为 "table"，
+        RED/YELLOW 图片块为 "image" (多模态批量请求)；无需 LLM 的块返回 None
+        """
+        tier = block.get("tier", "GREEN")
+        b_type = block.get("type", "text")
+        if tier == "RED" and b_type == "text":
+            return "text"
+        if tier in ("RED", "YELLOW") and b_type == "table":
+            return "table"
+        if tier in ("RED", "YELLOW") and b_type == "image":
+            return "image"
+        return None
+
+    def _needs_llm(self, block: Dict[str, Any]) -> bool:
+        """
+        块是否需要调用 LLM 验证 (文本/表格/图片块均走批量请求)
+        """
+        return self._batch_kind(block) is not None
+
+    def _copy_verification(self, source: Dict[str, Any], target: Dict[str, Any]) -> None:
+        """
+        将已验证块的结果回填到内容相同的重复块
+        """
+        target["verified_content"] = source.get("verified_content", target.get("content", ""))
+        target["verification_passed"] = source.get("verification_passed", False)
+
+    def _build_batch_prompt(self, batch, kind: str = "text") -> str:
+        """
+        构造批量解析 Prompt
         
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_to_idx = {
-                executor.submit(self._verify_single_block, block, idx, gemini_client): idx 
-                for idx, block in yellow_blocks_with_indices
-            }
+        Args:
+            batch: [(idx, block), ...]
+            kind: "text" (RED 文本块)、"table" (Markdown 表格块) 或 "image" (图片块)
+        """
+        import json
+        
+        if kind == "image":
+            # 图片随请求按顺序附带，每张图片前标注其 Block_ID
+            return (
+                f"请分析以下 IC/BCD 工艺相关的图片，每张图片前标注了其 Block_ID。对每张图片：\n"
+                f"{self._IMAGE_INSTRUCTIONS}\n"
+                f"请严格按照JSON格式返回，Key为Block_ID (e.g. 'Block_12')，Value为该图片的解析结果。"
+            )
+        
+        if kind == "table":
+            # 表格依赖换行保持结构，按 JSON 对象整体序列化传入
+            items = {f"Block_{idx}": block.get("content", "") for idx, block in batch}
+            return (
+                f"请准确解析以下工艺参数表格(Markdown格式)，提取关键参数和层级关系。\n"
+                f"请严格按照JSON格式返回，Key为Block_ID (e.g. 'Block_12')，Value为该表格的解析结果。\n"
+                f"\n{json.dumps(items, ensure_ascii=False)}"
+            )
+        
+        batch_content = []
+        for idx, block in batch:
+            # Strip newlines to make it cleaner in prompt
+            content_clean = block.get("content", "").replace("\n", " ")
+            batch_content.append(f"Block_{idx}: {content_clean}")
+        
+        prompt_text = "\n\n".join(batch_content)
+        return (
+            f"作为 IC/BCD 工艺专家，请批量解析以下技术内容块。提取关键参数。\n"
+            f"请严格按照JSON格式返回，Key为Block_ID (e.g. 'Block_12')，Value为解析后的修正文本。\n"
+            f"\n{prompt_text}"
+        )
+
+    def _batch_images(self, batch):
+        """
+        图片批量请求的 (Block_ID, image_base64) 列表
+        """
+        return [(f"Block_{idx}", block["content"]) for idx, block in batch]
+
+    def _apply_batch_response(self, batch, response_text: str) -> None:
+        """
+        解析批量请求的 JSON 响应并原地写回各块
+        """
+        # 简单解析 JSON-like response (Gemini sometimes returns markdown json)
+        import json
+        # Try to find JSON structure
+        json_str = response_text
+        if "```json" in response_text:
+            json_str = response_text.split("```json")[1].split("```")[0].strip()
+        elif "```" in response_text:
+            json_str = response_text.split("```")[1].split("```")[0].strip()
+        
+        try:
+            parsed_batch = json.loads(json_str)
+        except:
+            logger.warning(f"[QA验证] Batch JSON解析失败，尝试Fallback")
+            parsed_batch = {}
+
+        # Fill results
+        for idx, block in batch:
+            key = f"Block_{idx}"
+            if key in parsed_batch:
+                block["verified_content"] = str(parsed_batch[key])
+                block["verification_passed"] = True
+            else:
+                # 响应中缺少该块 (或 JSON 解析失败): 回退内容且标记未通过，不写入 QA 缓存，下次处理时重新验证
+                # 图片的原文是 base64，回退为空串而不是当作描述
+                block["verified_content"] = self._fallback_content(block)
+                block["verification_passed"] = False
+
+    @staticmethod
+    def _fallback_content(block: Dict[str, Any]) -> str:
+        """
+        LLM 验证失败时的回退内容: 文本/表格沿用原文；图片块的原文是 base64，
+        不能当作描述去嵌入或抽取实体，回退为空串
+        """
+        if block.get("type") == "image":
+            return ""
+        return str(block.get("content", ""))
+
+    def _fail_batch(self, batch, error) -> None:
+        logger.error(f"[QA验证] Batch处理异常: {error}")
+        # Fallback for entire batch
+        for idx, block in batch:
+            block["verified_content"] = self._fallback_content(block)
+            block["verification_passed"] = False
+
+    def _verify_batch(self, batch, gemini_client, kind: str = "text"):
+        """
+        批量验证一组同类型块 (单次 LLM 调用，结果原地写入各块)
+        
+        Args:
+            batch: [(idx, block), ...]
+            gemini_client: Gemini 客户端实例
+            kind: 批量类型，见 _batch_kind
+        """
+        try:
+            logger.info(f"[QA验证] 发送Batch请求 ({kind}, Size: {len(batch)})")
+            prompt = self._build_batch_prompt(batch, kind)
+            if kind == "image":
+                response_text = gemini_client.generate_multimodal_batch(prompt, self._batch_images(batch), use_pro=True)
+            else:
+                response_text = gemini_client.generate_text(prompt, use_pro=True)
+            logger.info(f"[QA验证] Batch请求成功，解析完成")
+            self._apply_batch_response(batch, response_text)
+        except Exception as e:
+            self._fail_batch(batch, e)
+
+    async def _averify_batch(self, batch, gemini_client, kind: str = "text"):
+        """
+        批量验证一组同类型块的异步版本
+        """
+        try:
+            logger.info(f"[QA验证] 发送异步Batch请求 ({kind}, Size: {len(batch)})")
+            prompt = self._build_batch_prompt(batch, kind)
+            if kind == "image":
+                response_text = await gemini_client.generate_multimodal_batch_async(prompt, self._batch_images(batch), use_pro=True)
+            else:
+                response_text = await gemini_client.generate_text_async(prompt, use_pro=True)
+            self._apply_batch_response(batch, response_text)
+        except Exception as e:
+            self._fail_batch(batch, e)
+
+    async def atiered_qa_verification(self, blocks: List[Dict[str, Any]], gemini_client, progress_callback=None) -> List[Dict[str, Any]]:
+        """
+        分级 QA 验证的异步版本: 所有 LLM 请求在事件循环上以 asyncio.gather 并发执行，
+        由信号量限制在途请求数 (settings.LLM_CONCURRENCY)，不再受线程池大小约束
+        """
+        from core.config import settings
+        
+        total_blocks = len(blocks)
+        logger.info(f"[QA验证] 开始异步QA验证，共 {total_blocks} 个块")
+        
+        semaphore = asyncio.Semaphore(settings.LLM_CONCURRENCY)
+        batch_sizes = {"text": settings.QA_BATCH_SIZE, "table": settings.QA_BATCH_SIZE, "image": settings.QA_IMAGE_BATCH_SIZE}
+        llm_indices = []
+        pending = {"text": [], "table": [], "image": []}
+        jobs = []  # (协程, 涉及的块索引)
+        leaders = {}
+        followers = {}
+        
+        def add_batch(kind):
+            batch = pending[kind]
+            pending[kind] = []
+            jobs.append((self._averify_batch(batch, gemini_client, kind), [idx for idx, _ in batch]))
+        
+        for i, block in enumerate(blocks):
+            if self._apply_cached_qa(block):
+                continue
+            
+            if self._needs_llm(block):
+                leader = leaders.setdefault(self._qa_cache_key(block), i)
+                if leader != i:
+                    followers.setdefault(leader, []).append(i)
+                    continue
             
-            for future in concurrent.futures.as_completed(future_to_idx):
-                idx = future_to_idx[future]
+            kind = self._batch_kind(block)
+            if kind:
+                pending[kind].append((i, block))
+                if len(pending[kind]) >= batch_sizes[kind]:
+                    add_batch(kind)
+            else:
+                block["verified_content"] = block["content"]
+                block["verification_passed"] = True
+        
+        for kind in pending:
+            if pending[kind]:
+                add_batch(kind)
+        
+        async def run_bounded(coro, indices):
+            async with semaphore:
                 try:
-                    result_block = future.result()
-                    verified_blocks_map[idx] = result_block
-                    logger.info(f"[QA验证] YELLOW/Special Block {idx} 验证完成")
+                    await coro
                 except Exception as e:
-                    logger.error(f"[QA验证] Special Block {idx} 失败: {e}")
-                    block = blocks[idx]
-                    block["verified_content"] = str(block.get("content", ""))
-                    verified_blocks_map[idx] = block
-                
+                    logger.error(f"[QA验证] Blocks {indices} 失败: {e}")
+                    for idx in indices:
+                        blocks[idx]["verified_content"] = self._fallback_content(blocks[idx])
+                        blocks[idx]["verification_passed"] = False
+            return indices
+        
+        tasks = [asyncio.ensure_future(run_bounded(coro, indices)) for coro, indices in jobs]
+        done_count = total_blocks - sum(len(indices) for _, indices in jobs) - sum(len(dups) for dups in followers.values())
+        try:
+            for finished in asyncio.as_completed(tasks):
+                indices = await finished
+                llm_indices.extend(indices)
+                done_count += len(indices)
+                for idx in indices:
+                    for dup in followers.get(idx, ()):
+                        self._copy_verification(blocks[idx], blocks[dup])
+                        done_count += 1
                 if progress_callback:
-                    progress_callback(len(red_blocks_indices) + len(verified_blocks_map), total_blocks, f"验证表格/图片 {idx}...")
+                    progress_callback(done_count, total_blocks, f"验证块 {indices}...")
+        except BaseException:
+            # 回调抛出异常 (如用户取消) 时取消所有未完成的请求
+            for task in tasks:
+                task.cancel()
+            raise
+        
+        if self.cache:
+            for idx in llm_indices:
+                if blocks[idx].get("verification_passed"):
+                    self.cache.set(self._qa_cache_key(blocks[idx]), blocks[idx]["verified_content"])
+        
+        return blocks
 
-        # --- 3. Process GREEN Blocks ---
-        for idx in green_blocks_indices:
-            block = blocks[idx]
-            block["verified_content"] = block["content"]
-            block["verification_passed"] = True
-            verified_blocks_map[idx] = block
+    def _qa_cache_key(self, block: Dict[str, Any]) -> str:
+        """
+        块级 QA 缓存键: 内容哈希 + 级别 + 类型 (修改单个块只会使该块的缓存失效)
+        """
+        from core.cache import content_hash
+        return f"qa_{content_hash(str(block.get('content', '')))}_{block.get('tier', 'GREEN')}_{block.get('type', 'text')}"
 
-        # Reassemble
-        verified_blocks = [verified_blocks_map[i] for i in range(total_blocks)]
-        return verified_blocks
+    def _apply_cached_qa(self, block: Dict[str, Any]) -> bool:
+        """
+        尝试用缓存的 QA 结果填充块，命中返回 True
+        """
+        # GREEN 块本身不经过 LLM，无需查缓存
+        if not self.cache or "content" not in block or block.get("tier", "GREEN") == "GREEN":
+            return False
+        cached = self.cache.get(self._qa_cache_key(block))
+        if cached is None:
+            return False
+        block["verified_content"] = cached
+        block["verification_passed"] = True
+        return True
+
+
+class _RawBlockExtractor(PDFParser):
+    """
+    解析子进程使用的轻量解析器: 只加载 Docling 转换器，负责解析与原始块提取
+    (不加载嵌入模型；合并与分级在主进程中进行)
+    """
+    def __init__(self, use_ocr: bool):
+        self.converter = _get_converter(use_ocr)
+        self._type_hit = {}
+    
+    def classify_block(self, block_content: str, heuristic_tier: str = None) -> str:
+        # 原始块的级别会在主进程合并后统一重算，这里只给占位值
+        return heuristic_tier or "GREEN"
+
+
+# 子进程内的解析器实例 (进程池 initializer 中创建，每个工作进程只加载一次模型)
+_worker_extractor = None
+
+def _init_parse_worker(use_ocr: bool) -> None:
+    global _worker_extractor
+    _worker_extractor = _RawBlockExtractor(use_ocr)
+
+def _extract_raw_blocks_worker(chunk_path: str) -> List[Dict[str, Any]]:
+    """
+    子进程工作函数：解析单个页码分片并返回未合并的原始块列表 (页码相对分片)
+    """
+    document = _worker_extractor.parse_pdf(chunk_path)
+    return list(_worker_extractor._iter_raw_blocks(document))
+
+# 解析进程池 (进程级单例，跨文件复用，子进程的模型只加载一次)
+_parse_pool = None
+_parse_pool_lock = threading.Lock()
+
+def _get_parse_pool(n_workers: int, use_ocr: bool):
+    """
+    获取 (首次调用时创建) 解析进程池
+    
+    使用 spawn 启动子进程: 父进程已加载 CUDA 模型 (Docling 转换器、嵌入模型)，fork 出的子进程无法重新初始化 CUDA
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is None:
+            from concurrent.futures import ProcessPoolExecutor
+            import multiprocessing
+            
+            logger.info(f"[PDF解析] 创建解析进程池 (workers={n_workers})")
+            _parse_pool = ProcessPoolExecutor(
+                max_workers=n_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_parse_worker,
+                initargs=(use_ocr,)
+            )
+        return _parse_pool
 
+def _reset_parse_pool() -> None:
+    """
+    丢弃已损坏的进程池 (子进程异常退出后不可再用)，下次调用 _get_parse_pool 时重新创建
+    """
+    global _parse_pool
+    with _parse_pool_lock:
+        if _parse_pool is not None:
+            _parse_pool.shutdown(wait=False)
+            _parse_pool = None
@@ -1,10 +1,18 @@
-from qdrant_client import QdrantClient
-from qdrant_client.models import PointStruct, CollectionDescription, VectorParams, TextIndexParams, TokenizerType
+from qdrant_client import QdrantClient, AsyncQdrantClient, models
+from qdrant_client.models import (
+    PointStruct, CollectionDescription, VectorParams, TextIndexParams, TokenizerType, PayloadSchemaType,
+    ScalarQuantization, ScalarQuantizationConfig, ScalarType, SearchParams, QuantizationSearchParams
+)
 from typing import List, Dict, Any
 from core.embedding import LocalEmbedding
 import os
 from dotenv import load_dotenv
+import asyncio
+import hashlib
+import httpx
 import logging
+import threading
+import time
 import uuid
 
 # 加载环境变量
@@ -12,6 +20,33 @@ load_dotenv()
 
 logger = logging.getLogger(__name__)
 
+# int8 标量量化: 向量内存降为 1/4，量化向量常驻内存
+QUANTIZATION_CONFIG = ScalarQuantization(
+    scalar=ScalarQuantizationConfig(type=ScalarType.INT8, quantile=0.99, always_ram=True)
+)
+# 检索时先在量化向量上取 2 倍候选，再用原始向量重打分，召回损失可忽略
+QUANTIZED_SEARCH = QuantizationSearchParams(ignore=False, rescore=True, oversampling=2.0)
+
+
+def _search_params(limit: int, hnsw_ef: int = None) -> SearchParams:
+    """
+    按返回条数设置 HNSW ef (默认 max(64, limit * 8))，top-k 较小时无需使用集合的默认 ef
+    """
+    return SearchParams(
+        hnsw_ef=hnsw_ef or max(64, limit * 8),
+        exact=False,
+        quantization=QUANTIZED_SEARCH
+    )
+
+# 常用的块类型过滤条件 (模块级常量，检索时直接复用)
+_TABLE_FILTER = models.Filter(
+    must=[models.FieldCondition(key="type", match=models.MatchValue(value="table"))]
+)
+_IMAGE_FILTER = models.Filter(
+    must=[models.FieldCondition(key="type", match=models.MatchValue(value="image"))]
+)
+_TYPE_FILTERS = {"table": _TABLE_FILTER, "image": _IMAGE_FILTER}
+
 class VectorStore:
     def __init__(self):
         """
@@ -20,12 +55,33 @@ class VectorStore:
         if hasattr(self, "_initialized") and self._initialized:
             return
         
+        from core.config import settings
+        
+        # REST 连接池: 默认池过小会让 retrieval_node 的并发检索和异步写入排队等待连接
+        # (并发查询数 x 每次查询的检索路数不应超过 QDRANT_POOL_SIZE)
+        limits = httpx.Limits(
+            max_connections=settings.QDRANT_POOL_SIZE,
+            max_keepalive_connections=settings.QDRANT_POOL_SIZE // 2
+        )
+        
         # 连接到 Qdrant 服务
         self.client = QdrantClient(
             url=os.getenv("QDRANT_URL", "http://localhost:6333"),
-            api_key=os.getenv("QDRANT_API_KEY")
+            api_key=os.getenv("QDRANT_API_KEY"),
+            limits=limits
+        )
+        # 异步客户端: 仅用于并发写入 (读请求仍走同步客户端)
+        # 其连接池会绑定到首次使用它的事件循环，因此只在 _get_ingest_loop 的常驻循环中使用
+        self.aclient = AsyncQdrantClient(
+            url=os.getenv("QDRANT_URL", "http://localhost:6333"),
+            api_key=os.getenv("QDRANT_API_KEY"),
+            timeout=60,
+            limits=limits
         )
         
+        self._ingest_loop = None
+        self._ingest_loop_lock = threading.Lock()
+        
         # 初始化本地嵌入模型
         self.embedding_model = LocalEmbedding()
         
@@ -46,6 +102,9 @@ class VectorStore:
         collections = self.client.get_collections().collections
         collection_names = [col.name for col in collections]
         
+        # 已有的 payload 索引 (新建/重建的集合为空)
+        existing_indexes = set()
+        
         # 如果集合不存在，则创建
         if self.collection_name not in collection_names:
             logger.info(f"[向量库] 创建新集合: {self.collection_name}")
@@ -54,7 +113,8 @@ class VectorStore:
                 vectors_config=VectorParams(
                     size=1024,  # BGE-M3 dimension
                     distance="Cosine"
-                )
+                ),
+                quantization_config=QUANTIZATION_CONFIG
             )
         else:
             # Check existing collection dimension
@@ -68,22 +128,56 @@ class VectorStore:
                     vectors_config=VectorParams(
                         size=target_dim,
                         distance="Cosine"
-                    )
+                    ),
+                    quantization_config=QUANTIZATION_CONFIG
                 )
-            
-            # 创建全文索引
-            logger.info("[向量库] 为 content 字段创建全文索引")
-            self.client.create_payload_index(
-                collection_name=self.collection_name,
-                field_name="content",
-                field_schema=TextIndexParams(
-                    type="text",
-                    tokenizer=TokenizerType.WORD,
-                    min_token_len=2,
-                    max_token_len=15,
-                    lowercase=True
+            else:
+                existing_indexes = set(info.payload_schema or {})
+                if info.config.quantization_config is None:
+                    # 旧集合未启用量化，原地开启 (Qdrant 后台构建量化向量)
+                    logger.info("[向量库] 为现有集合启用 int8 标量量化")
+                    self.client.update_collection(
+                        collection_name=self.collection_name,
+                        quantization_config=QUANTIZATION_CONFIG
+                    )
+        
+        self._ensure_payload_indexes(existing_indexes)
+    
+    def _ensure_payload_indexes(self, existing_indexes: set = frozenset()):
+        """
+        为过滤字段创建 payload 索引 (type / file_name / tier 为 keyword, page 为 integer, content 为全文)
+        
+        search_tables / search_images / delete_document 按这些字段过滤，无索引时 Qdrant 只能全量扫描 payload
+        
+        Args:
+            existing_indexes: 集合中已建索引的字段名，这些字段不再重复创建
+        """
+        payload_indexes = {
+            "type": PayloadSchemaType.KEYWORD,
+            "file_name": PayloadSchemaType.KEYWORD,
+            "tier": PayloadSchemaType.KEYWORD,
+            "page": PayloadSchemaType.INTEGER,
+            "content": TextIndexParams(
+                type="text",
+                tokenizer=TokenizerType.WORD,
+                min_token_len=2,
+                max_token_len=15,
+                lowercase=True
+            ),
+        }
+        for field_name, field_schema in payload_indexes.items():
+            if field_name in existing_indexes:
+                continue
+            logger.info(f"[向量库] 为 {field_name} 字段创建 payload 索引")
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=field_schema
                 )
-            )
+            except Exception as e:
+                # 索引已存在等情况直接忽略
+                logger.debug("[向量库] 创建 %s 字段索引跳过: %s", field_name, e)
     
     def generate_embedding(self, text: str) -> List[float]:
         """
@@ -97,6 +191,18 @@ class VectorStore:
         """
         return self.embedding_model.embed(text)
     
+    def _text_to_embed(self, block: Dict[str, Any]) -> str:
+        """
+        获取文档块用于嵌入和检索的文本
+        """
+        if block["type"] == "text" or block["type"] == "table":
+            # 文本或表格，使用验证后的内容
+            return block["verified_content"]
+        elif block["type"] == "image":
+            # 图像，使用生成的描述
+            return block["verified_content"]
+        return str(block["content"])
+    
     def add_document_block(self, block: Dict[str, Any], file_name: str) -> str:
         """
         添加文档块到向量存储
@@ -108,72 +214,172 @@ class VectorStore:
         Returns:
             添加的点的 ID
         """
-        # 准备要嵌入的文本
-        if block["type"] == "text" or block["type"] == "table":
-            # 文本或表格，使用验证后的内容
-            text_to_embed = block["verified_content"]
-        elif block["type"] == "image":
-            # 图像，使用生成的描述
-            text_to_embed = block["verified_content"]
-        else:
-            text_to_embed = str(block["content"])
+        point_ids = self.add_document_blocks([block], file_name)
+        return point_ids[0] if point_ids else None
+    
+    def add_document_blocks(self, blocks: List[Dict[str, Any]], file_name: str) -> List[str]:
+        """
+        批量添加文档块到向量存储 (批量嵌入 + 分批 upsert)
         
-        logger.debug(f"[向量库] 准备添加文档块 - 文件: {file_name}, 类型: {block['type']}, 页码: {block['page']}, 内容长度: {len(text_to_embed)}")
+        Args:
+            blocks: 文档块列表 (块内自带的 file_name 优先于参数)
+            file_name: 文件名
+            
+        Returns:
+            与输入顺序一致的点 ID 列表，嵌入为空而跳过的块对应 None
+        """
+        from core.config import settings
         
-        # 生成嵌入向量
-        embedding = self.generate_embedding(text_to_embed)
+        texts = [self._text_to_embed(block) for block in blocks]
+        logger.debug("[向量库] 准备批量添加文档块 - 文件: %s, 块数: %s", file_name, len(blocks))
         
-        if not embedding or len(embedding) == 0:
-            logger.warning(f"[向量库] 嵌入向量为空，跳过文档块 - ID: {block.get('id', 'unknown')}")
-            return None
-
-        logger.debug(f"[向量库] 嵌入向量生成完成，维度: {len(embedding)}")
-        
-        # 准备元数据
-        metadata = {
-            "file_name": file_name,
-            "type": block["type"],
-            "page": block["page"],
-            "tier": block["tier"],
-            "coordinates": block["coordinates"],
-            "content": text_to_embed
-        }
+        # 生成嵌入向量 (单次批量前向)
+        embeddings = self.embedding_model.embed_batch(texts, batch_size=settings.EMBEDDING_BATCH_SIZE)
+        point_ids, points = self._build_points(blocks, texts, embeddings, file_name)
         
-        # 如果是图像，添加图像的 Base64 编码
-        if block["type"] == "image":
-            metadata["image_base64"] = block["content"]
+        # 分批 upsert: 前面的批次不等待落盘，最后一批 wait=True
+        # (Qdrant 按顺序应用同一集合的更新，最后一批完成即表示全部可见)
+        batch_size = settings.VECTOR_UPSERT_BATCH_SIZE
+        for start in range(0, len(points), batch_size):
+            batch = points[start:start + batch_size]
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=batch,
+                wait=start + batch_size >= len(points)
+            )
         
-        # 生成点 ID - 使用 UUID 格式
-        point_id = str(uuid.uuid4())
+        logger.debug("[向量库] 批量添加完成 - 写入 %s 个点", len(points))
+        return point_ids
+    
+    async def aadd_document_blocks(self, blocks: List[Dict[str, Any]], file_name: str, progress_callback=None) -> List[str]:
+        """
+        异步批量添加文档块: 按嵌入批大小分段，嵌入在工作线程中计算，各批 upsert 通过 AsyncQdrantClient 并发发送
+        (并发数由 settings.VECTOR_UPSERT_CONCURRENCY 限制)
         
-        # 添加点到集合
-        self.client.upsert(
-            collection_name=self.collection_name,
-            points=[
-                PointStruct(
-                    id=point_id,
-                    vector=embedding,
-                    payload=metadata
+        必须运行在 _get_ingest_loop 的事件循环中，同步调用方使用 run_async_ingest
+        
+        Args:
+            blocks: 文档块列表
+            file_name: 文件名
+            progress_callback: 每段写入完成后调用 progress_callback(已写入块数, 总块数)，抛出异常可中止写入
+            
+        Returns:
+            与输入顺序一致的点 ID 列表
+        """
+        from core.config import settings
+        
+        semaphore = asyncio.Semaphore(settings.VECTOR_UPSERT_CONCURRENCY)
+        upsert_size = settings.VECTOR_UPSERT_BATCH_SIZE
+        embed_size = settings.EMBEDDING_BATCH_SIZE
+        
+        async def upsert_batch(batch):
+            async with semaphore:
+                # 并发批次之间无先后顺序，每批都等待写入完成
+                await self.aclient.upsert(
+                    collection_name=self.collection_name,
+                    points=batch,
+                    wait=True
                 )
-            ]
+        
+        all_ids = []
+        written = 0
+        for start in range(0, len(blocks), embed_size):
+            segment = blocks[start:start + embed_size]
+            texts = [self._text_to_embed(block) for block in segment]
+            embeddings = await asyncio.to_thread(self.embedding_model.embed_batch, texts, embed_size)
+            point_ids, points = self._build_points(segment, texts, embeddings, file_name)
+            
+            await asyncio.gather(*(
+                upsert_batch(points[i:i + upsert_size])
+                for i in range(0, len(points), upsert_size)
+            ))
+            all_ids.extend(point_ids)
+            written += len(points)
+            
+            if progress_callback:
+                progress_callback(start + len(segment), len(blocks))
+        
+        logger.info(f"[向量库] 异步批量添加完成 - 文件: {file_name}, 写入 {written} 个点")
+        return all_ids
+    
+    def _get_ingest_loop(self) -> asyncio.AbstractEventLoop:
+        """
+        异步写入专用的常驻事件循环 (首次使用时在后台线程中启动)
+        每次 asyncio.run 都会新建并关闭一个循环，而 AsyncQdrantClient 的 keep-alive 连接仍绑定在已关闭的循环上，
+        第二次写入即报 "Event loop is closed"；所有写入统一提交到同一个循环，多个上传线程也共享同一个连接池
+        """
+        with self._ingest_loop_lock:
+            if self._ingest_loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="qdrant-ingest", daemon=True).start()
+                self._ingest_loop = loop
+        return self._ingest_loop
+    
+    def run_async_ingest(self, blocks: List[Dict[str, Any]], file_name: str = "unknown", progress_callback=None) -> List[str]:
+        """
+        在同步上下文 (如后台任务线程) 中执行异步并发写入，阻塞直到写入完成
+        (progress_callback 在写入循环所在的线程中调用)
+        """
+        future = asyncio.run_coroutine_threadsafe(
+            self.aadd_document_blocks(blocks, file_name, progress_callback=progress_callback),
+            self._get_ingest_loop()
         )
+        return future.result()
+    
+    @staticmethod
+    def _point_id(file_name: str, page: Any, block_type: str, text: str) -> str:
+        """
+        确定性点 ID: BLAKE2b(文件名|页码|类型|内容) 的 128 位摘要，格式化为 UUID
+        """
+        digest = hashlib.blake2b(f"{file_name}|{page}|{block_type}|{text}".encode("utf-8"), digest_size=16).digest()
+        return str(uuid.UUID(bytes=digest))
+    
+    def _build_points(self, blocks, texts, embeddings, file_name):
+        """
+        组装 PointStruct 列表，嵌入为空的块跳过
         
-        logger.debug(f"[向量库] 文档块添加成功 - ID: {point_id}")
-        return point_id
+        Returns:
+            (与输入顺序一致的点 ID 列表 (跳过的块为 None), PointStruct 列表)
+        """
+        point_ids = []
+        points = []
+        for block, text_to_embed, embedding in zip(blocks, texts, embeddings):
+            if not embedding or len(embedding) == 0:
+                logger.warning(f"[向量库] 嵌入向量为空，跳过文档块 - ID: {block.get('id', 'unknown')}")
+                point_ids.append(None)
+                continue
+            
+            block_file_name = block.get("file_name", file_name)
+            
+            # 准备元数据
+            metadata = {
+                "file_name": block_file_name,
+                "type": block["type"],
+                "page": block["page"],
+                "tier": block["tier"],
+                "coordinates": block["coordinates"],
+                "content": text_to_embed
+            }
+            
+            # 如果是图像，添加图像的 Base64 编码
+            if block["type"] == "image":
+                metadata["image_base64"] = block["content"]
+            
+            # 生成点 ID - 由文件名/页码/类型/内容哈希得到的确定性 UUID，重复入库时原地覆盖而非新增重复点
+            point_id = self._point_id(block_file_name, block["page"], block["type"], text_to_embed)
+            point_ids.append(point_id)
+            points.append(PointStruct(id=point_id, vector=embedding, payload=metadata))
+        return point_ids, points
     
     def add_documents(self, blocks: List[Dict[str, Any]], file_name: str = "unknown"):
         """
         批量添加文档块到向量存储
         """
-        count = 0
-        for block in blocks:
-            # 优先使用 block 中可能自带的 file_name，否则使用参数传入的
-            fname = block.get("file_name", file_name)
-            self.add_document_block(block, fname)
-            count += 1
-        return count
+        # 优先使用 block 中可能自带的 file_name，否则使用参数传入的
+        self.add_document_blocks(blocks, file_name)
+        return len(blocks)
     
-    def search_similar(self, query: str, limit: int = 5, filter_criteria: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+    def search_similar(self, query: str, limit: int = 5, filter_criteria: Dict[str, Any] = None, query_embedding: List[float] = None, hnsw_ef: int = None) -> List[Dict[str, Any]]:
         """
         搜索相似的文档块
         
@@ -181,21 +387,26 @@ class VectorStore:
             query: 查询文本
             limit: 返回结果的数量
             filter_criteria: 过滤条件
+            query_embedding: 预先计算的查询向量 (同一查询的多路检索共用，省去重复嵌入)
+            hnsw_ef: HNSW 搜索宽度 (可选，高召回场景可调大)
             
         Returns:
             相似的文档块列表
         """
-        logger.debug(f"[向量库] 开始相似性搜索 - 查询: {query}, 限制: {limit}")
+        start = time.perf_counter()
+        logger.debug("[向量库] 开始相似性搜索 - 查询: %s, 限制: %s", query, limit)
         
         # 生成查询的嵌入向量
-        query_embedding = self.generate_embedding(query)
+        if query_embedding is None:
+            query_embedding = self.generate_embedding(query)
         
         # 执行搜索
         results = self.client.query_points(
             collection_name=self.collection_name,
             query=query_embedding,
             limit=limit,
-            query_filter=filter_criteria
+            query_filter=filter_criteria,
+            search_params=_search_params(limit, hnsw_ef)
         ).points
         
         # 处理搜索结果
@@ -206,112 +417,254 @@ class VectorStore:
                 "metadata": result.payload,
                 "id": result.id
             })
-            logger.info(f"[向量库] 搜索结果 - ID: {result.id}, 分数: {result.score}")
-            if hasattr(result, 'payload') and result.payload:
-                content = result.payload.get('content', result.payload.get('verified_content', ''))
-                logger.info(f"[向量库] 搜索结果内容 - 文件: {result.payload.get('file_name', 'N/A')}, 页码: {result.payload.get('page', 'N/A')}")
-                logger.info(f"[向量库] 搜索结果内容预览: {content[:200]}...")
         
-        logger.info(f"[向量库] 搜索完成，返回 {len(search_results)} 个结果")
+        # 逐条结果日志仅在 DEBUG 级别输出，避免 INFO 下每次查询格式化大段内容
+        if logger.isEnabledFor(logging.DEBUG):
+            for result in results:
+                logger.debug("[向量库] 搜索结果 - ID: %s, 分数: %s", result.id, result.score)
+                if result.payload:
+                    content = result.payload.get('content', result.payload.get('verified_content', ''))
+                    logger.debug("[向量库] 搜索结果内容 - 文件: %s, 页码: %s", result.payload.get('file_name', 'N/A'), result.payload.get('page', 'N/A'))
+                    logger.debug("[向量库] 搜索结果内容预览: %s...", content[:200])
+        
+        logger.info("[向量库] 搜索完成，返回 %d 个结果，耗时 %.1f ms", len(search_results), (time.perf_counter() - start) * 1000)
         return search_results
     
+    def search_similar_batch(self, query: str, searches: List[Dict[str, Any]], query_embedding: List[float] = None) -> List[List[Dict[str, Any]]]:
+        """
+        同一查询的多路向量检索合并为一次 query_batch_points 请求 (服务端并行执行)
+        
+        Args:
+            query: 查询文本
+            searches: 每路检索的参数 [{"limit": int, "filter": Filter 或 None, "hnsw_ef": int (可选), "query_embedding": 向量 (可选)}, ...]
+            query_embedding: 预先计算的查询向量
+            
+        Returns:
+            与 searches 顺序一致的结果列表
+        """
+        if not searches:
+            return []
+        if query_embedding is None:
+            query_embedding = self.generate_embedding(query)
+        
+        requests = [
+            models.QueryRequest(
+                query=search.get("query_embedding", query_embedding),
+                filter=search.get("filter"),
+                limit=search["limit"],
+                params=_search_params(search["limit"], search.get("hnsw_ef")),
+                with_payload=True
+            )
+            for search in searches
+        ]
+        responses = self.client.query_batch_points(
+            collection_name=self.collection_name,
+            requests=requests
+        )
+        
+        batch_results = [
+            [{"score": point.score, "metadata": point.payload, "id": point.id} for point in response.points]
+            for response in responses
+        ]
+        logger.info(f"[向量库] 批量搜索完成 - {len(searches)} 路检索，共 {sum(map(len, batch_results))} 个结果")
+        return batch_results
+    
+    def batch_search(self, queries: List[tuple]) -> List[List[Dict[str, Any]]]:
+        """
+        多类型子查询合并检索: 共用一次嵌入，并在一次 query_batch_points 往返中完成
+        
+        Args:
+            queries: [(查询文本, 类型), ...]，类型为 exact / vector / tables / images，
+                     可选第三项为返回条数
+            
+        Returns:
+            与 queries 顺序一致的结果列表
+        """
+        if not queries:
+            return []
+        # 只有精确匹配时无需嵌入，直接走全文索引 scroll
+        if all(kind == "exact" for _, kind, *_ in queries):
+            return [self.exact_match_search(text, limit=(rest[0] if rest else 5)) for text, _, *rest in queries]
+        
+        default_limits = {"exact": 5, "vector": 5, "tables": 3, "images": 3}
+        embeddings = {}
+        searches = []
+        for text, kind, *rest in queries:
+            if kind == "exact":
+                # 与向量检索同批发送: 全文命中的块按相似度排序
+                query_filter = models.Filter(
+                    must=[models.FieldCondition(key="content", match=models.MatchText(text=text))]
+                )
+            elif kind == "vector":
+                query_filter = None
+            elif kind == "tables":
+                query_filter = _TABLE_FILTER
+            elif kind == "images":
+                query_filter = _IMAGE_FILTER
+            else:
+                raise ValueError(f"未知的检索类型: {kind}")
+            if text not in embeddings:
+                embeddings[text] = self.generate_embedding(text)
+            searches.append({
+                "limit": rest[0] if rest else default_limits[kind],
+                "filter": query_filter,
+                "query_embedding": embeddings[text]
+            })
+        
+        return self.search_similar_batch(queries[0][0], searches, query_embedding=searches[0]["query_embedding"])
+    
+    def type_filter(self, block_type: str):
+        """
+        按块类型过滤的条件 (table / image 复用模块级常量)
+        """
+        type_filter = _TYPE_FILTERS.get(block_type)
+        if type_filter is None:
+            type_filter = models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="type",
+                        match=models.MatchValue(value=block_type)
+                    )
+                ]
+            )
+        return type_filter
+    
     def exact_match_search(self, query: str, limit: int = 5) -> List[Dict[str, Any]]:
         """
-        精确匹配搜索
+        精确匹配搜索 (仅走 content 全文索引，不计算嵌入)
         
         Args:
             query: 查询文本
             limit: 返回结果的数量
             
         Returns:
-            匹配的文档块列表
+            匹配的文档块列表 (关键词命中无相似度，score 固定为 1.0)
         """
-        # 使用 Qdrant 的关键字过滤功能
-        # 注意：这是一个简单的实现，实际应用中可能需要更复杂的 BM25 实现
-        results = self.client.query_points(
+        records, _ = self.client.scroll(
             collection_name=self.collection_name,
-            query=self.generate_embedding(query),
-            limit=limit,
-            query_filter={
-                "must": [
-                    {
-                        "key": "content",
-                        "match": {
-                            "text": query
-                        }
-                    }
+            scroll_filter=models.Filter(
+                must=[
+                    models.FieldCondition(
+                        key="content",
+                        match=models.MatchText(text=query)
+                    )
                 ]
-            }
-        ).points
+            ),
+            limit=limit,
+            with_payload=True,
+            with_vectors=False
+        )
         
         # 处理搜索结果
         search_results = []
-        for result in results:
+        for record in records:
             search_results.append({
-                "score": result.score,
-                "metadata": result.payload,
-                "id": result.id
+                "score": 1.0,
+                "metadata": record.payload,
+                "id": record.id
             })
         
         return search_results
-
-    def search_tables(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+    
+    def hybrid_search(self, query: str, limit: int = 5, query_embedding: List[float] = None, hnsw_ef: int = None) -> List[Dict[str, Any]]:
         """
-        专门搜索表格内容
+        混合搜索: 在 content 全文命中的文档块中按向量相似度排序
         
         Args:
             query: 查询文本
             limit: 返回结果的数量
+            query_embedding: 预先计算的查询向量
+            hnsw_ef: HNSW 搜索宽度 (可选)
+            
+        Returns:
+            匹配的文档块列表
         """
-        from qdrant_client import models
-        logger.info(f"[向量库] 执行表格专项搜索 - 查询: {query}")
-        
         return self.search_similar(
             query,
             limit=limit,
             filter_criteria=models.Filter(
                 must=[
                     models.FieldCondition(
-                        key="type",
-                        match=models.MatchValue(value="table")
+                        key="content",
+                        match=models.MatchText(text=query)
                     )
                 ]
-            )
-            )
+            ),
+            query_embedding=query_embedding,
+            hnsw_ef=hnsw_ef
+        )
+
+    def search_tables(self, query: str, limit: int = 3, query_embedding: List[float] = None, hnsw_ef: int = None) -> List[Dict[str, Any]]:
+        """
+        专门搜索表格内容
+        
+        Args:
+            query: 查询文本
+            limit: 返回结果的数量
+            query_embedding: 预先计算的查询向量
+            hnsw_ef: HNSW 搜索宽度 (可选)
+        """
+        logger.info(f"[向量库] 执行表格专项搜索 - 查询: {query}")
+        
+        return self.search_similar(
+            query,
+            limit=limit,
+            filter_criteria=_TABLE_FILTER,
+            query_embedding=query_embedding,
+            hnsw_ef=hnsw_ef
+        )
 
 
-    def search_images(self, query: str, limit: int = 3) -> List[Dict[str, Any]]:
+    def search_images(self, query: str, limit: int = 3, query_embedding: List[float] = None, hnsw_ef: int = None) -> List[Dict[str, Any]]:
         """
         专门搜索图像内容
         
         Args:
             query: 查询文本
             limit: 返回结果的数量
+            query_embedding: 预先计算的查询向量
+            hnsw_ef: HNSW 搜索宽度 (可选)
         """
-        from qdrant_client import models
         logger.info(f"[向量库] 执行图像专项搜索 - 查询: {query}")
         
         return self.search_similar(
             query,
             limit=limit,
-            filter_criteria=models.Filter(
-                must=[
-                    models.FieldCondition(
-                        key="type",
-                        match=models.MatchValue(value="image")
-                    )
-                ]
-            )
+            filter_criteria=_IMAGE_FILTER,
+            query_embedding=query_embedding,
+            hnsw_ef=hnsw_ef
         )
     
-    def delete_document(self, file_name: str):
+    # 异步检索接口: 目前在线程中执行同步检索，供 graph_flow 的异步检索节点 asyncio.gather 并发调用
+    async def asearch_similar(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search_similar, *args, **kwargs)
+    
+    async def asearch_similar_batch(self, *args, **kwargs) -> List[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.search_similar_batch, *args, **kwargs)
+    
+    async def abatch_search(self, *args, **kwargs) -> List[List[Dict[str, Any]]]:
+        return await asyncio.to_thread(self.batch_search, *args, **kwargs)
+    
+    async def aexact_match_search(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.exact_match_search, *args, **kwargs)
+    
+    async def asearch_tables(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search_tables, *args, **kwargs)
+    
+    async def asearch_images(self, *args, **kwargs) -> List[Dict[str, Any]]:
+        return await asyncio.to_thread(self.search_images, *args, **kwargs)
+    
+    def delete_document(self, file_name: str, wait: bool = False):
         """
         根据文件名删除文档块 (Standardized API)
         
+        依赖 file_name 的 keyword 索引 (见 _ensure_payload_indexes)，删除开销与命中点数成正比而非集合大小；
+        默认不等待落盘，同一集合上后续的 upsert 仍按提交顺序应用
+        
         Args:
             file_name: 文件名
+            wait: 是否等待删除完成
         """
-        from qdrant_client import models
         self.client.delete(
             collection_name=self.collection_name,
             points_selector=models.FilterSelector(
@@ -323,9 +676,14 @@ class VectorStore:
                         )
                     ]
                 )
-            )
+            ),
+            wait=wait,
+            ordering=models.WriteOrdering.MEDIUM
         )
     
+    # app.py 使用的旧名称
+    delete_by_file_name = delete_document
+    
     def get_collection_info(self):
         """
         获取集合信息
@@ -1,15 +1,17 @@
 from langgraph.graph import StateGraph, END
 from typing import List, Dict, Any, TypedDict
+import asyncio
+import functools
 import logging
-from concurrent.futures import ThreadPoolExecutor
 
 # Logic components imported for type hinting or usage if needed
 from agents.router import QueryRouter
-from agents.analyzer import DomainAnalyzer
+from agents.analyzer import DomainAnalyzer, format_context_text
 from agents.auditor import ResponseAuditor
 from core.vector_store import VectorStore
 from core.graph_store import GraphStore
 from core.config import settings
+from core.cache import content_hash, TTLCache
 
 logger = logging.getLogger("graph_flow")
 
@@ -18,6 +20,7 @@ class AgentState(TypedDict):
     query: str
     route: Dict[str, Any]
     retrieved_contexts: List[Dict[str, Any]]
+    context_text: str  # 检索节点拼接好的上下文文本，分析/生成/审计/修正共用
     analysis_result: Dict[str, Any]
     generated_answer: str
     audit_result: Dict[str, Any]
@@ -25,6 +28,29 @@ class AgentState(TypedDict):
     revision_count: int
     components: Dict[str, Any]
 
+# 检索结果缓存: (查询哈希, 路由类型, 关键词) -> (去重排序后的上下文, 拼接好的上下文文本)；入库/删除后由调用方清空
+_retrieval_cache = TTLCache(settings.RETRIEVAL_CACHE_SIZE, settings.RETRIEVAL_CACHE_TTL)
+
+def invalidate_retrieval_cache():
+    """
+    清空检索结果缓存 (向量库或图谱内容变化后调用)
+    """
+    _retrieval_cache.clear()
+
+def _fallback_search_terms(query: str, max_terms: int = 3) -> List[str]:
+    """
+    路由未给出关键词时的图谱检索词回退
+
+    中文查询没有空格，按空白切分只会得到整句；此时改用 jieba 分词，jieba 不可用则不做图谱检索
+    """
+    if any('\u4e00' <= c <= '\u9fff' for c in query):
+        try:
+            import jieba
+        except ImportError:
+            return []
+        return [w for w in jieba.lcut(query) if len(w.strip()) > 1][:max_terms]
+    return [w for w in query.split() if len(w) > 1][:max_terms]
+
 # Nodes
 
 def router_node(state: AgentState) -> AgentState:
@@ -33,159 +59,162 @@ def router_node(state: AgentState) -> AgentState:
     """
     router = state["components"]["router"]
     query = state["query"]
-    logger.info(f"[路由节点] 开始处理用户查询：'{query}'")
+    logger.info("[路由节点] 开始处理用户查询：'%s'", query)
     
-    logger.info(f"[路由节点] 调用路由器进行查询分类")
+    logger.info("[路由节点] 调用路由器进行查询分类")
     route_result = router.route_query(query)
-    logger.info(f"[路由节点] 查询路由结果：{route_result}")
+    logger.debug("[路由节点] 查询路由结果：%s", route_result)
     
     return {"route": route_result, "revision_count": 0}
 
-def retrieval_node(state: AgentState) -> AgentState:
+async def retrieval_node(state: AgentState) -> AgentState:
     """
-    检索节点：根据路由结果执行相应的检索策略
+    检索节点：根据路由结果执行相应的检索策略 (各路检索在事件循环上 asyncio.gather 并发)
     """
     router = state["components"]["router"]
     vector_store = state["components"]["vector_store"]
     graph_store = state["components"]["graph_store"]
-    executor = state["components"].get("executor")
     
     query = state["query"]
     route_type = state["route"]["route_type"]
     keywords = state["route"].get("keywords", [])
     
-    logger.info(f"[检索节点] 开始检索 - 查询: '{query}', 路由类型: '{route_type}', 关键词: {keywords}")
+    logger.info("[检索节点] 开始检索 - 查询: '%s', 路由类型: '%s', 关键词: %s", query, route_type, keywords)
+    
+    cache_key = (content_hash(query), route_type, tuple(keywords))
+    cached = _retrieval_cache.get(cache_key)
+    if cached is not None:
+        cached_contexts, cached_text = cached
+        logger.info("[检索节点] 命中检索缓存，返回 %d 个上下文", len(cached_contexts))
+        return {"retrieved_contexts": cached_contexts, "context_text": cached_text}
     
     retrieval_strategy = router.get_retrieval_strategy(route_type)
+    methods = set(retrieval_strategy["methods"])
     
-    # Retrieval definitions
-    def run_exact_match():
-        if "exact_match" in retrieval_strategy["methods"]:
-            return vector_store.exact_match_search(query, limit=settings.EXACT_MATCH_LIMIT)
-        return []
+    # 精确匹配 / 向量 / 表格 / 图像子查询共用同一个查询向量，合并为一次 Qdrant 批量请求
+    sub_queries = []
+    if "exact_match" in methods:
+        sub_queries.append((query, "exact", settings.EXACT_MATCH_LIMIT))
+    if "vector_search" in methods:
+        sub_queries.append((query, "vector", settings.VECTOR_SEARCH_LIMIT))
+    if "table_extraction" in methods:
+        sub_queries.append((query, "tables", 3))
+    if "image_retrieval" in methods:
+        sub_queries.append((query, "images", 2))
 
-    def run_vector_search():
-        if "vector_search" in retrieval_strategy["methods"]:
-            limit = settings.VECTOR_SEARCH_LIMIT
-            if hasattr(vector_store, 'search_similar'):
-                return vector_store.search_similar(query, limit=limit)
-            return vector_store.search(query, limit=limit)
-        return []
+    # Retrieval definitions (只提交路由策略启用的检索)
+    async def run_vector_searches():
+        results = []
+        for batch in await vector_store.abatch_search(sub_queries):
+            results.extend(batch)
+        return results
 
-    def run_graph_search():
-        if "graph_search" in retrieval_strategy["methods"]:
-            graph_results = []
-            search_terms = keywords if keywords else [w for w in query.split() if len(w) > 1][:3]
-            if not search_terms: return []
-            
-            seen = set()
-            all_relations = []
-            for term in search_terms:
-                rels = graph_store.search_relations(term)
-                for r in rels:
-                    k = f"{r['source']}|{r['relation']}|{r['target']}"
-                    if k not in seen:
-                        seen.add(k)
-                        all_relations.append(r)
-            
-            if all_relations:
-                txt = "图谱关系：\n" + "\n".join([f"- {r['source']} {r['relation']} {r['target']}" for r in all_relations[:settings.GRAPH_SEARCH_LIMIT]])
-                graph_results.append({
-                    "score": 1.0, 
-                    "metadata": {"file_name": "knowledge_graph", "content": txt, "page": 0, "type": "graph"},
-                    "id": "graph_1"
-                })
-            return graph_results
-        return []
-
-    def run_table_search():
-        if "table_extraction" in retrieval_strategy["methods"]:
-            return vector_store.search_tables(query, limit=3)
-        return []
+    async def run_graph_search():
+        search_terms = keywords if keywords else _fallback_search_terms(query)
+        if not search_terms: return []
+        
+        # 所有关键词一次 UNWIND 查询，只需一次 Neo4j 往返
+        seen = set()
+        lines = []
+        for r in await graph_store.asearch_relations_bulk(search_terms):
+            k = (r['source'], r['relation'], r['target'])
+            if k not in seen:
+                seen.add(k)
+                lines.append(f"- {r['source']} {r['relation']} {r['target']}")
+                if len(lines) >= settings.GRAPH_SEARCH_LIMIT:
+                    break
+        
+        if not lines:
+            return []
+        txt = "图谱关系：\n" + "\n".join(lines)
+        return [{
+            "score": 1.0, 
+            "metadata": {"file_name": "knowledge_graph", "content": txt, "page": 0, "type": "graph"},
+            "id": "graph_1"
+        }]
 
-    def run_image_search():
-        if "image_retrieval" in retrieval_strategy["methods"]:
-            return vector_store.search_images(query, limit=2)
-        return []
+    vector_task = asyncio.ensure_future(run_vector_searches()) if sub_queries else None
+    graph_task = asyncio.ensure_future(run_graph_search()) if "graph_search" in methods else None
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + settings.RETRIEVAL_TIMEOUT
 
+    # 向量检索 (含查询嵌入) 是主要上下文来源，始终等待其完成；两路检索同时进行
     retrieved_contexts = []
+    timed_out = False
+    if vector_task is not None:
+        try:
+            retrieved_contexts.extend(await vector_task)
+        except Exception as e:
+            logger.error("Search task failed: %s", e)
     
-    # Use injected executor or local fallback (safe fallback if executor missing for tests)
-    local_executor = None
-    if executor is None:
-        logger.warning("No executor provided in components, creating local ThreadPoolExecutor")
-        local_executor = ThreadPoolExecutor(max_workers=settings.MAX_WORKERS)
-        run_executor = local_executor
-    else:
-        run_executor = executor
-
-    try:
-        futures = []
-        if executor:
-            # If using shared executor, we submit tasks
-            futures.append(executor.submit(run_exact_match))
-            futures.append(executor.submit(run_vector_search))
-            futures.append(executor.submit(run_graph_search))
-            futures.append(executor.submit(run_table_search))
-            futures.append(executor.submit(run_image_search))
-        else:
-             # Logic duplicate mostly to handle Context Manager if creating new
-             futures.append(run_executor.submit(run_exact_match))
-             futures.append(run_executor.submit(run_vector_search))
-             futures.append(run_executor.submit(run_graph_search))
-             futures.append(run_executor.submit(run_table_search))
-             futures.append(run_executor.submit(run_image_search))
+    # 图谱检索是补充来源: 已有向量结果时超过时限即丢弃，不拖累整体延迟；
+    # 它是唯一来源时等待其完成，避免超时变成无上下文作答
+    if graph_task is not None:
+        timeout = max(0.0, deadline - loop.time()) if retrieved_contexts else None
+        try:
+            retrieved_contexts.extend(await asyncio.wait_for(graph_task, timeout))
+        except asyncio.TimeoutError:
+            timed_out = True
+            logger.warning("[检索节点] 图谱检索超过 %.1f 秒未完成，已丢弃", settings.RETRIEVAL_TIMEOUT)
+        except Exception as e:
+            logger.error("Search task failed: %s", e)
 
-        for f in futures:
-            try:
-                retrieved_contexts.extend(f.result())
-            except Exception as e:
-                logger.error(f"Search task failed: {e}")
-                
-    finally:
-        if local_executor:
-            local_executor.shutdown()
-
-    # Deduplication
-    seen_contents = set()
+    # Deduplication: 同一个点在多路检索中命中时 ID 相同 (入库时由内容确定的 UUID)
+    # 无 ID 的合成条目才退回到 (file, page, 内容哈希) 键，集合中不保留完整内容
+    seen_keys = set()
     unique_contexts = []
     for ctx in retrieved_contexts:
-        # Use content+file+page hash key
-        content = ctx['metadata'].get('content', '')
-        file_name = ctx['metadata'].get('file_name', '')
-        page = ctx['metadata'].get('page', '')
-        content_key = f"{content}_{file_name}_{page}"
-        content_hash = hash(content_key)
+        key = ctx.get('id')
+        if key is None:
+            metadata = ctx['metadata']
+            key = (metadata.get('file_name', ''), metadata.get('page', ''), content_hash(metadata.get('content', '')))
         
-        if content_hash not in seen_contents:
-            seen_contents.add(content_hash)
+        if key not in seen_keys:
+            seen_keys.add(key)
             unique_contexts.append(ctx)
     
-    logger.info(f"[检索节点] 检索完成，找到 {len(unique_contexts)} 个上下文")
-    return {"retrieved_contexts": unique_contexts}
+    # 按稳定键排序: 相同的上下文集合总是以相同顺序拼入提示词，便于 LLM 侧复用前缀缓存
+    # (各上下文在提示词中以【来源：…，页码：…】分隔)
+    unique_contexts.sort(key=lambda c: (c['metadata'].get('file_name', ''), c['metadata'].get('page', 0), str(c.get('id', ''))))
+    # 上下文文本只在此处拼接一次，后续各节点直接复用
+    context_text = format_context_text(unique_contexts)
+    
+    # 有检索被超时丢弃时结果不完整，不写入缓存
+    if not timed_out:
+        _retrieval_cache.set(cache_key, (unique_contexts, context_text))
+    logger.info("[检索节点] 检索完成，找到 %d 个上下文", len(unique_contexts))
+    return {"retrieved_contexts": unique_contexts, "context_text": context_text}
 
 def analysis_node(state: AgentState) -> AgentState:
     domain_analyzer = state["components"]["domain_analyzer"]
     query = state["query"]
     retrieved_contexts = state["retrieved_contexts"]
     
-    logger.info(f"[分析节点] 开始分析上下文")
-    analysis_result = domain_analyzer.analyze_context(query, retrieved_contexts)
-    logger.debug(f"[分析节点] 分析结果: {analysis_result}")
+    logger.info("[分析节点] 开始分析上下文")
+    analysis_result = domain_analyzer.analyze_context(query, retrieved_contexts, state.get("context_text"))
+    logger.debug("[分析节点] 分析结果: %s", analysis_result)
     
     return {"analysis_result": analysis_result}
 
+async def retrieve_and_analyze_node(state: AgentState) -> AgentState:
+    """
+    检索 + 分析合并为一个节点，省去一次节点切换与状态合并
+    """
+    retrieval_update = await retrieval_node(state)
+    analysis_update = await asyncio.to_thread(analysis_node, {**state, **retrieval_update})
+    return {**retrieval_update, **analysis_update}
+
 def generation_node(state: AgentState) -> AgentState:
     domain_analyzer = state["components"]["domain_analyzer"]
     query = state["query"]
     retrieved_contexts = state["retrieved_contexts"]
     analysis_result = state["analysis_result"]
     
-    logger.info(f"[生成节点] 开始生成回答")
-    generated_answer = domain_analyzer.generate_answer(query, retrieved_contexts, analysis_result)
+    logger.info("[生成节点] 开始生成回答")
+    generated_answer = domain_analyzer.generate_answer(query, retrieved_contexts, analysis_result, state.get("context_text"))
     
     formatted_answer = domain_analyzer.format_answer_with_references(generated_answer, retrieved_contexts)
-    logger.info(f"[生成节点] 生成完成, 长度: {len(formatted_answer)}")
+    logger.info("[生成节点] 生成完成, 长度: %d", len(formatted_answer))
     
     return {"generated_answer": formatted_answer}
 
@@ -194,9 +223,9 @@ def audit_node(state: AgentState) -> AgentState:
     retrieved_contexts = state["retrieved_contexts"]
     generated_answer = state["generated_answer"]
     
-    logger.info(f"[审计节点] 开始审计")
-    audit_result = auditor.audit_response(retrieved_contexts, generated_answer)
-    logger.info(f"[审计节点] 审计结果: {'通过' if audit_result['audit_passed'] else '不通过'}")
+    logger.info("[审计节点] 开始审计")
+    audit_result = auditor.audit_response(retrieved_contexts, generated_answer, state.get("context_text"))
+    logger.info("[审计节点] 审计结果: %s", '通过' if audit_result['audit_passed'] else '不通过')
     
     return {
         "audit_result": audit_result, 
@@ -204,47 +233,72 @@ def audit_node(state: AgentState) -> AgentState:
         "revision_count": state["revision_count"] + 1
     }
 
-def correction_node(state: AgentState) -> AgentState:
+async def correction_node(state: AgentState) -> AgentState:
+    """
+    修正节点：并发生成多个候选修正回答并同时审计，取第一个通过审计的候选 (均未通过则取第一个)
+    
+    候选已在本节点内审计，审计结果直接写回状态，无需再经过审计节点
+    """
     auditor = state["components"]["auditor"]
     domain_analyzer = state["components"]["domain_analyzer"]
     audit_result = state["audit_result"]
+    # 审计结果不再携带上下文副本，直接引用状态中的检索结果
+    original_contexts = state["retrieved_contexts"]
+    context_text = state.get("context_text")
     
-    logger.info(f"[修正节点] 开始修正")
-    correction_prompt = auditor.generate_correction_prompt(audit_result)
+    logger.info("[修正节点] 开始修正")
+    correction_prompt = auditor.generate_correction_prompt(audit_result, original_contexts, context_text)
+    empty_analysis = {"key_information": [], "context_summary": "", "context_relations": [], "information_gaps": "无"}
     
-    corrected_answer = domain_analyzer.generate_answer(
-        correction_prompt, 
-        audit_result["original_contexts"], 
-        {"key_information": [], "context_summary": "", "context_relations": [], "information_gaps": "无"}
-    )
+    candidates = await asyncio.gather(*(
+        domain_analyzer.agenerate_answer(correction_prompt, original_contexts, empty_analysis, context_text)
+        for _ in range(max(1, settings.CORRECTION_CANDIDATES))
+    ))
+    formatted_candidates = [
+        domain_analyzer.format_answer_with_references(candidate, original_contexts)
+        for candidate in candidates
+    ]
+    audits = await asyncio.gather(*(
+        auditor.aaudit_response(original_contexts, candidate, context_text)
+        for candidate in formatted_candidates
+    ))
     
-    formatted_corrected_answer = domain_analyzer.format_answer_with_references(
-        corrected_answer, 
-        audit_result["original_contexts"]
-    )
+    chosen = next((i for i, audit in enumerate(audits) if audit["audit_passed"]), 0)
+    logger.info("[修正节点] %d 个候选中 %d 个通过审计", len(audits), sum(audit["audit_passed"] for audit in audits))
     
-    return {"generated_answer": formatted_corrected_answer}
+    return {
+        "generated_answer": formatted_candidates[chosen],
+        "audit_result": audits[chosen],
+        "audit_passed": audits[chosen]["audit_passed"],
+        "revision_count": state["revision_count"] + 1
+    }
 
 def should_revise(state: AgentState) -> bool:
-    need_revision = not state["audit_passed"] and state["revision_count"] < 3
-    logger.info(f"[条件判断] 是否需要修订: {need_revision}")
+    # 审计置信度 (可能缺失): 高置信度直接结束；通过但置信度过低时仍修正
+    score = state["audit_result"].get("score")
+    if state["revision_count"] >= 3 or (score is not None and score >= settings.AUDIT_HIGH_CONFIDENCE):
+        need_revision = False
+    elif not state["audit_passed"]:
+        need_revision = True
+    else:
+        need_revision = score is not None and score < settings.AUDIT_MIN_SCORE
+    logger.info("[条件判断] 是否需要修订: %s", need_revision)
     return need_revision
 
 # Build Graph
 # Notice: Dependencies are injected at runtime, so graph definition is static
+@functools.lru_cache(maxsize=1)
 def build_workflow():
     workflow = StateGraph(AgentState)
     
     workflow.add_node("router", router_node)
-    workflow.add_node("retrieve", retrieval_node)
-    workflow.add_node("analyze", analysis_node)
+    workflow.add_node("retrieve", retrieve_and_analyze_node)
     workflow.add_node("generate", generation_node)
     workflow.add_node("audit", audit_node)
     workflow.add_node("correct", correction_node)
     
     workflow.add_edge("router", "retrieve")
-    workflow.add_edge("retrieve", "analyze")
-    workflow.add_edge("analyze", "generate")
+    workflow.add_edge("retrieve", "generate")
     workflow.add_edge("generate", "audit")
     
     workflow.add_conditional_edges(
@@ -252,22 +306,37 @@ def build_workflow():
         should_revise,
         {True: "correct", False: END}
     )
-    workflow.add_edge("correct", "audit")
+    # 修正节点自带审计，直接决定是否继续修正
+    workflow.add_conditional_edges(
+        "correct",
+        should_revise,
+        {True: "correct", False: END}
+    )
     
     workflow.set_entry_point("router")
     return workflow.compile()
 
+# 图结构与查询无关，模块导入时编译一次，各次查询复用
+_APP = build_workflow()
+
+def reset_workflow_cache():
+    """
+    丢弃已编译的工作流并重新编译 (测试或修改节点定义后使用)
+    """
+    global _APP
+    build_workflow.cache_clear()
+    _APP = build_workflow()
+
 # Run Workflow
-def run_workflow(query: str, components: Dict[str, Any] = None) -> Dict[str, Any]:
+async def arun_workflow(query: str, components: Dict[str, Any] = None) -> Dict[str, Any]:
     if components is None:
         raise ValueError("Components must be provided to run_workflow")
 
-    app = build_workflow()
-    
     initial_state = {
         "query": query,
         "route": {},
         "retrieved_contexts": [],
+        "context_text": "",
         "analysis_result": {},
         "generated_answer": "",
         "audit_result": {},
@@ -276,7 +345,8 @@ def run_workflow(query: str, components: Dict[str, Any] = None) -> Dict[str, Any
         "components": components
     }
     
-    result = app.invoke(initial_state)
+    # 检索节点为异步节点，其余同步节点由 LangGraph 放到线程中执行
+    result = await _APP.ainvoke(initial_state)
     
     return {
         "query": result["query"],
@@ -285,3 +355,9 @@ def run_workflow(query: str, components: Dict[str, Any] = None) -> Dict[str, Any
         "revision_count": result["revision_count"],
         "retrieved_contexts": result["retrieved_contexts"]
     }
+
+def run_workflow(query: str, components: Dict[str, Any] = None) -> Dict[str, Any]:
+    """
+    同步入口 (供无事件循环的调用方使用，如 Streamlit)
+    """
+    return asyncio.run(arun_workflow(query, components))
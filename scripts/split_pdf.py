@@ -1,5 +1,10 @@
+import hashlib
+import json
 import os
 import sys
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
 from math import ceil
 
 # 尝试导入 pypdf，如果不存在则提示安装
@@ -10,6 +15,56 @@ except ImportError:
     print("请运行以下命令进行安装: pip install pypdf")
     sys.exit(1)
 
+PDF_EXTENSIONS = (".pdf",)
+
+def _load_pdf(file_path):
+    """
+    一次性读入整个文件并从内存解析，后续按页的随机访问只在内存中 seek
+    """
+    with open(file_path, "rb") as f:
+        data = f.read()
+    return PdfReader(BytesIO(data))
+
+def _manifest_path(base_name):
+    return f"{base_name}.split.manifest.json"
+
+def _is_split_cached(base_name, ext, file_hash, chunk_size):
+    """
+    清单中的内容哈希与分片大小一致，且所有分片文件都还在时，视为已切分过
+    """
+    try:
+        with open(_manifest_path(base_name), "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return False
+    
+    if manifest.get("hash") != file_hash or manifest.get("chunk_size") != chunk_size:
+        return False
+    return all(
+        os.path.exists(f"{base_name}_part{index}{ext}")
+        for index in range(1, manifest.get("num_chunks", 0) + 1)
+    )
+
+def _write_chunk(args):
+    """
+    写出单个分片 (在子进程中运行)
+    每个进程自行打开 PdfReader，避免跨进程传递页对象
+    :param args: (file_path, start_page, end_page, output_filename)
+    """
+    file_path, start_page, end_page, output_filename = args
+    reader = _load_pdf(file_path)
+    writer = PdfWriter()
+    
+    # 整段页码一次性追加，引用对象批量解析，避免逐页 add_page 重复解析间接引用
+    writer.append(reader, pages=(start_page, end_page), import_outline=False)
+    
+    # 先写入内存缓冲，再一次性落盘
+    buffer = BytesIO()
+    writer.write(buffer)
+    with open(output_filename, "wb") as out_file:
+        out_file.write(buffer.getbuffer())
+    return output_filename, start_page, end_page
+
 def split_pdf(file_path, chunk_size=30):
     """
     将 PDF 文件按指定页数切分
@@ -24,15 +79,24 @@ def split_pdf(file_path, chunk_size=30):
         return
 
     try:
-        reader = PdfReader(file_path)
+        base_name = os.path.splitext(file_path)[0]
+        ext = os.path.splitext(file_path)[1]
+        
+        # 按内容哈希判断是否已切分过，相同文件重复运行时直接跳过
+        with open(file_path, "rb") as f:
+            data = f.read()
+        file_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+        if _is_split_cached(base_name, ext, file_hash, chunk_size):
+            print(f"[缓存命中] {os.path.basename(file_path)} 已切分过 (内容未变化)，跳过。")
+            return
+        
+        reader = PdfReader(BytesIO(data))
         total_pages = len(reader.pages)
         
         if total_pages == 0:
             print("错误: PDF 文件为空。")
             return
 
-        base_name = os.path.splitext(file_path)[0]
-        ext = os.path.splitext(file_path)[1]
         num_chunks = ceil(total_pages / chunk_size)
         
         print(f"文档信息: {os.path.basename(file_path)}")
@@ -40,22 +104,20 @@ def split_pdf(file_path, chunk_size=30):
         print(f"计划切分为 {num_chunks} 份 (每份 {chunk_size} 页)...")
         print("-" * 30)
 
-        for i in range(0, total_pages, chunk_size):
-            writer = PdfWriter()
-            start_page = i
-            end_page = min(i + chunk_size, total_pages)
-            
-            # 由于 pypdf 的 lazy loading 特性，这里直接添加页引用
-            for page_num in range(start_page, end_page):
-                writer.add_page(reader.pages[page_num])
-            
-            chunk_index = (i // chunk_size) + 1
-            output_filename = f"{base_name}_part{chunk_index}{ext}"
-            
-            with open(output_filename, "wb") as out_file:
-                writer.write(out_file)
-            
-            print(f"[✓] 已保存: {os.path.basename(output_filename)} (页码 {start_page+1}-{end_page})")
+        tasks = [
+            (file_path, i, min(i + chunk_size, total_pages), f"{base_name}_part{(i // chunk_size) + 1}{ext}")
+            for i in range(0, total_pages, chunk_size)
+        ]
+        
+        # 分片写出 (序列化/压缩) 是 CPU 密集型，按分片并行到多个进程，进程数不超过分片数
+        max_workers = min(os.cpu_count() or 1, num_chunks)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for output_filename, start_page, end_page in executor.map(_write_chunk, tasks):
+                print(f"[✓] 已保存: {os.path.basename(output_filename)} (页码 {start_page+1}-{end_page})")
+        
+        # 全部分片写出后再记录清单，中途失败不会留下有效缓存
+        with open(_manifest_path(base_name), "w", encoding="utf-8") as f:
+            json.dump({"hash": file_hash, "num_chunks": num_chunks, "chunk_size": chunk_size}, f)
             
         print("-" * 30)
         print("切分完成！")
@@ -63,6 +125,27 @@ def split_pdf(file_path, chunk_size=30):
     except Exception as e:
         print(f"发生错误: {e}")
 
+def _find_pdfs(root, max_depth=3):
+    """
+    从 root 开始按层遍历 (广度优先)，收集 max_depth 层以内的 PDF 文件路径
+    scandir 的目录项自带文件类型，无需逐个 stat；不跟随符号链接
+    """
+    pdfs = []
+    queue = deque([(root, 0)])
+    while queue:
+        directory, depth = queue.popleft()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if depth < max_depth:
+                            queue.append((entry.path, depth + 1))
+                    elif entry.is_file(follow_symlinks=False) and entry.name.lower().endswith(PDF_EXTENSIONS):
+                        pdfs.append(entry.path)
+        except OSError as e:
+            print(f"⚠️  无法读取文件夹 {directory}: {e}")
+    return pdfs
+
 def process_path(raw_input):
     # 清洗逻辑
     clean_path = raw_input.strip()
@@ -79,17 +162,18 @@ def process_path(raw_input):
     
     if os.path.exists(clean_path):
         if os.path.isdir(clean_path):
-            print(f"⚠️  这是一个文件夹。正在查找内部的 PDF 文件...")
-            files = [f for f in os.listdir(clean_path) if f.lower().endswith('.pdf')]
+            print(f"⚠️  这是一个文件夹。正在查找内部 (含子文件夹) 的 PDF 文件...")
+            files = _find_pdfs(clean_path)
             if not files:
                 print("❌ 该文件夹内没有找到 .pdf 文件")
                 return
             
             print(f"✓ 找到 {len(files)} 个 PDF 文件:")
-            for f in files:
-                full_p = os.path.join(clean_path, f)
-                print(f"   - {f}")
-                split_pdf(full_p, chunk_size=30)
+            for path in files:
+                print(f"   - {os.path.relpath(path, clean_path)}")
+            # 文件逐个处理，每个文件内部已按分片并行 (进程池中不能再嵌套进程池)
+            for path in files:
+                split_pdf(path, chunk_size=30)
         else:
             split_pdf(clean_path, chunk_size=30)
     else:
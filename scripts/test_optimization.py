@@ -16,6 +16,8 @@ from core.config import settings
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+_BLOCK_RE = re.compile(r"Block_(\d+)")
+
 class MockGeminiClient(GeminiClient):
     """Mock Client to track API usage without real calls."""
     def __init__(self):
@@ -32,9 +34,9 @@ class MockGeminiClient(GeminiClient):
         
         # Simulate Batch Response
         if "Block_" in prompt:
-            ids = re.findall(r"Block_(\d+)", prompt)
+            ids = _BLOCK_RE.findall(prompt)
             resp = {f"Block_{i}": f"Verified Content for Block {i}" for i in ids}
-            return f"```json\n{json.dumps(resp)}\n```"
+            return f"```json\n{json.dumps(resp, separators=(',', ':'))}\n```"
             
         return "Verified Content"
 
@@ -42,6 +44,11 @@ class MockGeminiClient(GeminiClient):
         self.call_count += 1
         return "Image Description"
 
+    def generate_multimodal_batch(self, prompt, images, use_pro=True):
+        self.call_count += 1
+        resp = {label: "Image Description" for label, _ in images}
+        return f"```json\n{json.dumps(resp)}\n```"
+
 def test_pipeline(use_mock=True):
     file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "test.pdf")
     
@@ -1,18 +1,27 @@
 import os
-import shutil
+import asyncio
+import hashlib
+import json
+import re
+import time
 import logging
 import uuid
 from typing import List, Optional
 from contextlib import asynccontextmanager
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
+from dataclasses import dataclass, asdict
+from functools import lru_cache
 import threading
+from pathlib import Path
 
+import aiofiles
 from dotenv import load_dotenv
-from fastapi import FastAPI, UploadFile, File, HTTPException, Form, BackgroundTasks
+from fastapi import FastAPI, UploadFile, File, HTTPException, Form
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.requests import Request
-from fastapi.responses import JSONResponse
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 
 from core.parser import PDFParser
@@ -23,8 +32,16 @@ from utils.gemini_client import GeminiClient
 from agents.router import QueryRouter
 from agents.analyzer import DomainAnalyzer
 from agents.auditor import ResponseAuditor
-from graph_flow import run_workflow
+from graph_flow import arun_workflow, invalidate_retrieval_cache
 from core.config import settings
+from core.cache import TTLCache
+
+# 可选: orjson 序列化更快 (任务进度轮询是请求量最大的接口)；未安装时退回标准 JSONResponse
+try:
+    import orjson  # noqa: F401
+    DefaultResponse = ORJSONResponse
+except ImportError:
+    DefaultResponse = JSONResponse
 
 # Load env vars
 load_dotenv()
@@ -46,9 +63,16 @@ logging.getLogger("httpx").setLevel(logging.WARNING)
 logging.getLogger("sentence_transformers").setLevel(logging.WARNING)
 
 # Filter out repetitive polling logs from uvicorn
+_POLLING_PATH_PREFIX = "/api/task/"
+
 class EndpointFilter(logging.Filter):
     def filter(self, record: logging.LogRecord) -> bool:
-        return "/api/task/" not in record.getMessage()
+        # uvicorn 访问日志的 args 为 (client_addr, method, path, http_version, status_code)
+        # 直接检查路径参数，被过滤的记录不再做 % 格式化
+        args = record.args
+        if isinstance(args, tuple) and len(args) >= 3:
+            return not str(args[2]).startswith(_POLLING_PATH_PREFIX)
+        return _POLLING_PATH_PREFIX not in record.getMessage()
 
 logging.getLogger("uvicorn.access").addFilter(EndpointFilter())
 
@@ -60,28 +84,35 @@ async def lifespan(app: FastAPI):
     app.state.is_ready = False
     app.state.init_step = "正在启动服务..."
     app.state.init_progress = 0
-    app.state.executor = ThreadPoolExecutor(max_workers=settings.MAX_WORKERS)
     
     # Background Initialization Function
     def background_init():
         logger.info("Initializing system components in background...")
         try:
             # 1. Core Components
-            app.state.init_step = "正在加载 PDF 解析器..."
+            # PDF 解析器 (Docling 版面/表格模型) 只有上传时才需要，推迟到首次上传时加载，见 get_parser
+            # 嵌入模型加载与 Neo4j 连接互不依赖，并行进行，就绪耗时取决于最慢的一项而非总和
+            stages = {
+                "vector_store": (VectorStore, "向量嵌入模型 (BAAI/bge-m3)"),
+                "graph_store": (GraphStore, "知识图谱 (Neo4j)"),
+                "graph_builder": (GraphBuilder, "图谱构建器"),
+            }
+            pending = {name: label for name, (_, label) in stages.items()}
+            app.state.init_step = f"正在并行加载: {'、'.join(pending.values())}..."
             app.state.init_progress = 10
-            app.state.parser = PDFParser()
-            
-            app.state.init_step = "正在加载向量嵌入模型 (BAAI/bge-m3)..."
-            app.state.init_progress = 30
-            app.state.vector_store = VectorStore()
-            
-            app.state.init_step = "正在连接知识图谱 (Neo4j)..."
-            app.state.init_progress = 60
-            app.state.graph_store = GraphStore()
+            with ThreadPoolExecutor(max_workers=len(stages), thread_name_prefix="init") as pool:
+                futures = {pool.submit(factory): name for name, (factory, _) in stages.items()}
+                for future in as_completed(futures):
+                    name = futures[future]
+                    setattr(app.state, name, future.result())
+                    del pending[name]
+                    app.state.init_progress = 10 + 70 * (len(stages) - len(pending)) // len(stages)
+                    if pending:
+                        app.state.init_step = f"正在并行加载: {'、'.join(pending.values())}..."
             
+            # 2. Agents (轻量，组件全部就绪后再创建)
             app.state.init_step = "正在初始化智能 Agent..."
             app.state.init_progress = 80
-            app.state.graph_builder = GraphBuilder()
             app.state.gemini_client = GeminiClient()
             app.state.router = QueryRouter()
             app.state.domain_analyzer = DomainAnalyzer()
@@ -94,8 +125,7 @@ async def lifespan(app: FastAPI):
                 "graph_store": app.state.graph_store,
                 "domain_analyzer": app.state.domain_analyzer,
                 "auditor": app.state.auditor,
-                "gemini_client": app.state.gemini_client,
-                "executor": app.state.executor
+                "gemini_client": app.state.gemini_client
             }
             
             app.state.init_step = "系统就绪"
@@ -111,13 +141,28 @@ async def lifespan(app: FastAPI):
     # Start Initialization Thread
     threading.Thread(target=background_init, daemon=True).start()
     
+    # 定时把缓冲的文档元数据合并写入 Neo4j
+    async def flush_document_metadata():
+        while True:
+            await asyncio.sleep(settings.DOC_METADATA_FLUSH_INTERVAL)
+            if app.state.is_ready:
+                await asyncio.to_thread(document_buffer.flush, app.state.graph_store)
+    
+    flusher = asyncio.create_task(flush_document_metadata())
+    
+    # 上传处理线程池: 多个文件并行处理 (BackgroundTasks 会把同一请求的文件串行执行)
+    app.state.upload_executor = ThreadPoolExecutor(max_workers=settings.UPLOAD_CONCURRENCY, thread_name_prefix="upload")
+    
     yield
     
     # Shutdown
     logger.info("Shutting down...")
-    app.state.executor.shutdown(wait=True)
+    flusher.cancel()
+    app.state.upload_executor.shutdown(wait=False, cancel_futures=True)
+    if app.state.is_ready:
+        document_buffer.flush(app.state.graph_store)
 
-app = FastAPI(lifespan=lifespan)
+app = FastAPI(lifespan=lifespan, default_response_class=DefaultResponse)
 
 # Status Check API for Frontend
 @app.get("/api/status")
@@ -135,9 +180,46 @@ def check_ready(request: Request):
     if not getattr(request.app.state, "is_ready", False):
         raise HTTPException(status_code=503, detail="系统初始化中，请稍候...")
 
+# 文件名中不允许出现的片段: 上级目录、路径分隔符、空字符
+_UNSAFE_FILENAME_RE = re.compile(r"\.\.|[\\/\x00]")
+
+def sanitize_filename(name: str) -> Optional[str]:
+    """
+    去掉目录部分后返回安全的文件名 (上传与删除共用同一规则)；不安全或为空时返回 None
+    """
+    base = os.path.basename(name)
+    if not base or _UNSAFE_FILENAME_RE.search(base):
+        return None
+    return base
+
+_parser_lock = threading.Lock()
+
+def get_parser(app_state) -> PDFParser:
+    """
+    首次调用时创建 PDF 解析器并缓存到 app.state (只在上传处理的后台线程中调用)
+    """
+    parser = getattr(app_state, "parser", None)
+    if parser is None:
+        with _parser_lock:
+            parser = getattr(app_state, "parser", None)
+            if parser is None:
+                logger.info("Loading PDF parser on first upload...")
+                parser = PDFParser()
+                app_state.parser = parser
+    return parser
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="static"), name="static")
 templates = Jinja2Templates(directory="templates")
+# 超过 1 KiB 的响应 (页面、JS/CSS、文件列表) 按客户端 Accept-Encoding 进行 gzip 压缩
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
+@lru_cache(maxsize=1)
+def _render_index() -> str:
+    """
+    首页模板不依赖请求内容，只在首次访问时查找并渲染一次，之后直接返回缓存的 HTML
+    """
+    return templates.env.get_template("index.html").render()
 
 # Types
 class ChatRequest(BaseModel):
@@ -150,77 +232,180 @@ class ChatResponse(BaseModel):
     revision_count: int
 
 # Task Manager
+@dataclass(slots=True)
+class Task:
+    status: str = "pending"
+    progress: int = 0
+    message: str = "等待开始..."
+    details: str = ""
+    search_ready: bool = False
+    is_cancelled: bool = False
+
 class TaskManager:
+    FINAL_STATUSES = ("completed", "error", "cancelled")
+
     def __init__(self):
-        self.tasks = {}
+        self.tasks: dict[str, Task] = {}
+        # 每个任务一个 asyncio.Event，状态变化时唤醒 SSE 推送 (后台线程经 call_soon_threadsafe 触发)
+        self.events: dict[str, asyncio.Event] = {}
+        self._loop = None
+        # 已结束任务 -> 结束时间；超过 TASK_RETENTION 秒后在创建新任务时清理，内存占用有上界
+        self._finished: dict[str, float] = {}
+        # 锁只保护任务的增删；单个字段的赋值在 GIL 下是原子的，回调与轮询无需加锁
+        self._lock = threading.RLock()
     
     def create_task(self):
         task_id = str(uuid.uuid4())
-        self.tasks[task_id] = {
-            "status": "pending",
-            "progress": 0,
-            "message": "等待开始...",
-            "details": "",
-            "search_ready": False,
-            "is_cancelled": False
-        }
+        with self._lock:
+            self._evict_finished()
+            self.tasks[task_id] = Task()
+            try:
+                self._loop = asyncio.get_running_loop()
+                self.events[task_id] = asyncio.Event()
+            except RuntimeError:
+                pass
         return task_id
 
+    def _evict_finished(self):
+        cutoff = time.monotonic() - settings.TASK_RETENTION
+        for expired_id in [tid for tid, finished_at in self._finished.items() if finished_at < cutoff]:
+            del self._finished[expired_id]
+            self.tasks.pop(expired_id, None)
+            self.events.pop(expired_id, None)
+
+    def _notify(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is not None and task.status in self.FINAL_STATUSES:
+            with self._lock:
+                self._finished.setdefault(task_id, time.monotonic())
+        event = self.events.get(task_id)
+        if event is not None and self._loop is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(event.set)
+
     def update_task(self, task_id, status, progress, message, details=""):
-        if task_id in self.tasks:
-             # Prevent overwriting if already cancelled
-            if self.tasks[task_id].get("is_cancelled"):
-                return
-            self.tasks[task_id].update({
-                "status": status,
-                "progress": progress, 
-                "message": message,
-                "details": details
-            })
+        task = self.tasks.get(task_id)
+        # Prevent overwriting if already cancelled
+        if task is None or task.is_cancelled:
+            return
+        task.status = status
+        task.progress = progress
+        task.message = message
+        task.details = details
+        self._notify(task_id)
+
+    def mark_search_ready(self, task_id):
+        task = self.tasks.get(task_id)
+        if task is not None:
+            task.search_ready = True
+            self._notify(task_id)
 
     def get_task(self, task_id):
         return self.tasks.get(task_id)
 
     def cancel_task(self, task_id):
-        if task_id in self.tasks:
-            self.tasks[task_id]["is_cancelled"] = True
-            self.tasks[task_id]["status"] = "cancelled"
-            self.tasks[task_id]["message"] = "已取消"
+        task = self.tasks.get(task_id)
+        if task is not None:
+            task.is_cancelled = True
+            task.status = "cancelled"
+            task.message = "已取消"
+            self._notify(task_id)
             logger.info(f"Task {task_id} marked for cancellation")
 
 task_manager = TaskManager()
 
+class DocumentMetadataBuffer:
+    def __init__(self):
+        """
+        文档元数据写缓冲: 各上传任务的 Document 节点先入队，定时或攒够一批后一次 UNWIND 写入
+        """
+        self.rows = []
+        self._lock = threading.Lock()
+        # 写入锁: 刷新时从取出队列到写入 Neo4j (或失败放回) 全程持有，与 discard 互斥
+        self._write_lock = threading.Lock()
+
+    def add(self, graph_store, file_hash, filename, size, upload_time):
+        with self._lock:
+            self.rows.append({"hash": file_hash, "filename": filename, "size": size, "upload_time": upload_time})
+            should_flush = len(self.rows) >= settings.DOC_METADATA_FLUSH_SIZE
+        if should_flush:
+            self.flush(graph_store)
+
+    def get(self, file_hash):
+        """
+        返回尚未写入的同内容文档元数据 (去重检查用)，没有则返回 None
+        """
+        with self._lock:
+            return next((row for row in self.rows if row["hash"] == file_hash), None)
+
+    def discard(self, filename):
+        """
+        丢弃尚未写入的某个文件的元数据 (取消/删除时调用，避免删除后又被写回)
+        会等待正在进行的刷新结束: 返回后调用方再删除图数据库中的节点，不会被刷新写回
+        """
+        with self._write_lock, self._lock:
+            self.rows = [row for row in self.rows if row["filename"] != filename]
+
+    def flush(self, graph_store):
+        with self._write_lock:
+            with self._lock:
+                rows, self.rows = self.rows, []
+            if not rows:
+                return
+            try:
+                graph_store.add_documents(rows)
+                _file_list_cache.clear()
+            except Exception as e:
+                # 写入失败时放回队列，下次刷新重试 (持有写入锁，期间不会有 discard 被绕过)
+                logger.error(f"Failed to flush document metadata ({len(rows)} rows): {e}")
+                with self._lock:
+                    self.rows = rows + self.rows
+
+document_buffer = DocumentMetadataBuffer()
+
+# /api/files 结果缓存: 文档节点增删时清空
+_file_list_cache = TTLCache(1, settings.FILE_LIST_CACHE_TTL)
+
 # Routes
 @app.get("/favicon.ico", include_in_schema=False)
 async def favicon():
-    return JSONResponse(content={})
+    return DefaultResponse(content={})
 # Routes
 @app.get("/")
 async def get(request: Request):
-    response = templates.TemplateResponse("index.html", {"request": request})
+    response = HTMLResponse(_render_index())
     response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
     response.headers["Pragma"] = "no-cache"
     response.headers["Expires"] = "0"
     return response
 
 # Background Processing
-def process_file_background(task_id: str, file_path: str, filename: str, app_state):
+def process_file_background(task_id: str, file_path: str, filename: str, app_state, file_hash: str, file_size: int):
     try:
-        if task_manager.get_task(task_id).get("is_cancelled"): return
+        if task_manager.get_task(task_id).is_cancelled: return
+
+        # 0. Deduplication: 内容哈希已存在时跳过解析、向量入库与图谱构建
+        existing_doc = document_buffer.get(file_hash) or app_state.graph_store.get_document(file_hash)
+        if existing_doc:
+            logger.info(f"File {filename} already processed as {existing_doc.get('filename')} (hash: {file_hash}), skipping")
+            task_manager.mark_search_ready(task_id)
+            task_manager.update_task(task_id, "completed", 100, "文档已存在", f"内容与已入库文件 {existing_doc.get('filename')} 相同，已跳过处理")
+            return
 
         task_manager.update_task(task_id, "processing", 10, "解析 PDF...", "开始解析文档结构")
         
         def parse_callback(current, total, msg=""):
-            if task_manager.get_task(task_id).get("is_cancelled"): raise Exception("Task Cancelled")
+            if task_manager.get_task(task_id).is_cancelled: raise Exception("Task Cancelled")
             p = 10 + int((current / total) * 40) if total > 0 else 10
             task_manager.update_task(task_id, "processing", p, "QA 验证与解析中...", f"{msg} ({current}/{total})")
 
         def graph_callback(current, total, msg=""):
-            if task_manager.get_task(task_id).get("is_cancelled"): raise Exception("Task Cancelled")
+            if task_manager.get_task(task_id).is_cancelled: raise Exception("Task Cancelled")
             p = 50 + int((current / total) * 40) if total > 0 else 50
             task_manager.update_task(task_id, "processing", p, "构建知识图谱中...", f"{msg} ({current}/{total})")
 
-        parser = app_state.parser
+        if getattr(app_state, "parser", None) is None:
+            task_manager.update_task(task_id, "processing", 10, "加载 PDF 解析器...", "首次上传需要加载解析模型")
+        parser = get_parser(app_state)
         vector_store = app_state.vector_store
         graph_builder = app_state.graph_builder
         graph_store = app_state.graph_store
@@ -231,51 +416,71 @@ def process_file_background(task_id: str, file_path: str, filename: str, app_sta
         # We assume parser supports progress_callback as per previous edits
         docs = parser.process_pdf(file_path, gemini_client, progress_callback=parse_callback)
         
-        if task_manager.get_task(task_id).get("is_cancelled"): return
+        if task_manager.get_task(task_id).is_cancelled: return
 
         logger.info(f"Parsed {len(docs)} documents/chunks")
         task_manager.update_task(task_id, "processing", 50, "写入向量库...", f"共 {len(docs)} 个块")
         
-        # 2. Add to Vector Store
-        vector_store.add_documents(docs, file_name=filename)
-        
-        if task_manager.get_task(task_id).get("is_cancelled"): return
-
         # ==================================================================================
         # SCHEME A+: Async Graph Building with Progress Feedback
         # ==================================================================================
         
-        # 3. Mark Vector Search as Ready (Intermediate State)
+        # Graph Building Callback (Real Progress 50% -> 100%)
+        def graph_progress_callback(current, total, msg=""):
+            if task_manager.get_task(task_id).is_cancelled: raise Exception("Task Cancelled")
+            
+            # Scale progress from 50 to 95 (leave last 5% for finalization)
+            p = 50 + int((current / total) * 45) if total > 0 else 50
+            logger.info(f"[Callback Debug] Updating Task {task_id}: {p}% - {msg} ({current}/{total})")
+            task_manager.update_task(task_id, "processing", p, "构建知识图谱中...", f"{msg} ({current}/{total})")
+        
+        # 2. 图谱构建 (LLM/Neo4j 密集) 在独立线程中启动，与向量入库 (嵌入/Qdrant 密集) 重叠执行
+        logger.info(f"Async Graph Building started for {filename}...")
+        graph_executor = ThreadPoolExecutor(max_workers=1)
+        graph_future = graph_executor.submit(graph_builder.build_graph_from_blocks, docs, file_name=filename, progress_callback=graph_progress_callback)
+        graph_executor.shutdown(wait=False)
+        
+        # 3. Add to Vector Store (batched upserts sent concurrently via AsyncQdrantClient)
+        # 整个文件一次异步写入，内部按嵌入批大小分段，逐段汇报进度并响应取消
+        def vector_progress_callback(done, total):
+            if task_manager.get_task(task_id).is_cancelled: raise Exception("Task Cancelled")
+            task_manager.update_task(task_id, "processing", 50, "写入向量库...", f"已写入 {done}/{total} 个块")
+        
+        try:
+            if task_manager.get_task(task_id).is_cancelled: raise Exception("Task Cancelled")
+            vector_store.run_async_ingest(docs, file_name=filename, progress_callback=vector_progress_callback)
+        except Exception:
+            # 向量入库失败或取消时，先等图谱线程停下 (取消后其回调会抛出)，再进入外层清理
+            wait([graph_future])
+            raise
+        invalidate_retrieval_cache()
+        
+        if task_manager.get_task(task_id).is_cancelled:
+            wait([graph_future])
+            return
+        
+        # 4. Mark Vector Search as Ready (Intermediate State)
         task_manager.update_task(task_id, "processing", 50, "向量入库完成", "✨ 您可以开始提问了！深度图谱构建中...")
-        task_manager.tasks[task_id]["search_ready"] = True
+        task_manager.mark_search_ready(task_id)
         
         # We save basic metadata to Graph Store first so file lists apppear
-        import hashlib
-        import time
-        file_hash = hashlib.md5(filename.encode()).hexdigest()
-        file_size = os.path.getsize(file_path)
-        # Add basic document node
-        graph_store.add_document(file_hash, filename, file_size, time.strftime("%Y-%m-%d %H:%M:%S"))
-        
-        logger.info(f"Async Graph Building started for {filename}...")
+        # file_hash / file_size 在上传时已随写盘一并算出 (内容哈希，与 app.py 去重一致)
+        # Add basic document node (缓冲后批量写入，多文件上传时合并为一次 Neo4j 往返)
+        document_buffer.add(graph_store, file_hash, filename, file_size, time.strftime("%Y-%m-%d %H:%M:%S"))
         
+        # 5. 等待图谱构建完成
         try:
-            # Graph Building Callback (Real Progress 50% -> 100%)
-            def graph_progress_callback(current, total, msg=""):
-                if task_manager.get_task(task_id).get("is_cancelled"): raise Exception("Task Cancelled")
-                
-                # Scale progress from 50 to 95 (leave last 5% for finalization)
-                p = 50 + int((current / total) * 45) if total > 0 else 50
-                logger.info(f"[Callback Debug] Updating Task {task_id}: {p}% - {msg} ({current}/{total})")
-                task_manager.update_task(task_id, "processing", p, "构建知识图谱中...", f"{msg} ({current}/{total})")
-
-            graph_builder.build_graph_from_blocks(docs, file_name=filename, progress_callback=graph_progress_callback)
+            graph_future.result()
+            invalidate_retrieval_cache()
             
             logger.info(f"Async Graph Building finished for {filename}")
             task_manager.update_task(task_id, "completed", 100, "处理完成", "向量索引与知识图谱均已构建完成")
             
         except Exception as e:
+            # 取消交给外层统一清理
+            if str(e) == "Task Cancelled": raise
             logger.error(f"Async Graph Building failed for {filename}: {e}")
+            invalidate_retrieval_cache()
             # If graph building fails, we still mark as completed because vector search is good?
             # Or mark as 'completed_with_warning'? For now, just complete since partial is usable.
             task_manager.update_task(task_id, "completed", 100, "处理完成 (图谱部分失败)", f"向量可用，图谱错误: {e}")
@@ -296,32 +501,31 @@ def process_file_background(task_id: str, file_path: str, filename: str, app_sta
                     logger.warning("VectorStore missing delete_document method")
                 
                 # 2. Graph Store
+                document_buffer.discard(filename)
                 graph_store.delete_document(filename)
                 logger.info(f"Cleaned up Graph Store for {filename}")
+                invalidate_retrieval_cache()
+                _file_list_cache.clear()
                 
             except Exception as cleanup_error:
                 logger.error(f"Error during cleanup for cancelled task {task_id}: {cleanup_error}")
                 
         else:
-            logger.error(f"Error processing file: {e}")
-            import traceback
-            traceback.print_exc()
+            logger.exception(f"Error processing file: {e}")
             task_manager.update_task(task_id, "error", 0, "处理失败", str(e))
     finally:
-        if os.path.exists(file_path):
-            try:
-                os.remove(file_path)
-            except:
-                pass
+        # 直接删除，仅忽略文件不存在 (省去一次 exists 调用，也没有检查与删除之间的竞态)
+        try:
+            Path(file_path).unlink(missing_ok=True)
+        except OSError as e:
+            logger.warning(f"[Cleanup] 临时文件删除失败 {file_path}: {e}")
 
 @app.post("/api/upload")
-async def upload_files(request: Request, files: List[UploadFile] = File(...), background_tasks: BackgroundTasks = None):
+async def upload_files(request: Request, files: List[UploadFile] = File(...)):
     results = []
     
     # Check dependencies
     check_ready(request)
-    if not hasattr(request.app.state, 'parser'):
-        raise HTTPException(status_code=503, detail="System initializing...")
 
     os.makedirs(settings.TEMP_DIR, exist_ok=True)
 
@@ -332,29 +536,62 @@ async def upload_files(request: Request, files: List[UploadFile] = File(...), ba
         task_id = task_manager.create_task()
         
         # SECURITY FIX: Path Traversal
-        safe_filename = os.path.basename(file.filename)
-        # Add basic check
-        if ".." in safe_filename or "/" in safe_filename or "\\" in safe_filename:
+        safe_filename = sanitize_filename(file.filename)
+        if safe_filename is None:
              task_manager.update_task(task_id, "error", 0, "非法文件名", "Filename blocked for security")
              continue
 
         file_path = os.path.join(settings.TEMP_DIR, f"{task_id}_{safe_filename}")
         
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+        # 写盘的同时计算内容哈希与大小，避免之后再读一遍文件
+        # 读写均为异步 (4 MiB 分块)，大文件上传期间事件循环仍可响应进度轮询
+        md5_hash = hashlib.md5()
+        file_size = 0
+        async with aiofiles.open(file_path, "wb") as buffer:
+            while chunk := await file.read(4 * 1024 * 1024):
+                md5_hash.update(chunk)
+                await buffer.write(chunk)
+                file_size += len(chunk)
             
-        background_tasks.add_task(process_file_background, task_id, file_path, safe_filename, request.app.state)
+        request.app.state.upload_executor.submit(process_file_background, task_id, file_path, safe_filename, request.app.state, md5_hash.hexdigest(), file_size)
         
         results.append({"filename": safe_filename, "task_id": task_id})
 
+    _file_list_cache.clear()
     return results
 
 @app.get("/api/task/{task_id}")
 async def get_task_status(task_id: str):
+    # 轮询最频繁的接口: 直接返回响应对象，跳过 FastAPI 对返回值的 jsonable_encoder 转换
     task = task_manager.get_task(task_id)
     if not task:
+        return DefaultResponse(content={"detail": "Task not found"}, status_code=404)
+    return DefaultResponse(content=asdict(task))
+
+@app.get("/api/task/{task_id}/stream")
+async def stream_task_status(task_id: str):
+    """
+    以 Server-Sent Events 推送任务状态: 仅在状态变化时发送，任务结束后关闭连接
+    """
+    task = task_manager.get_task(task_id)
+    event = task_manager.events.get(task_id)
+    if not task or event is None:
         raise HTTPException(status_code=404, detail="Task not found")
-    return task
+
+    async def event_stream():
+        while True:
+            # 先清除再取快照，取快照之后的更新会再次触发事件，不会丢失
+            event.clear()
+            yield f"data: {json.dumps(asdict(task), ensure_ascii=False)}\n\n"
+            if task.status in TaskManager.FINAL_STATUSES:
+                return
+            try:
+                # 长时间无更新时也定期重发当前状态，兼作保活
+                await asyncio.wait_for(event.wait(), timeout=15)
+            except asyncio.TimeoutError:
+                pass
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
 
 @app.post("/api/task/{task_id}/cancel")
 async def cancel_task(task_id: str):
@@ -367,7 +604,7 @@ async def chat(request: Request, body: ChatRequest):
     check_ready(request)
     try:
         logger.info(f"Received chat query: {body.query}")
-        result = run_workflow(body.query, components=request.app.state.components)
+        result = await arun_workflow(body.query, components=request.app.state.components)
         
         # Flatten sources for frontend
         flat_sources = []
@@ -395,6 +632,10 @@ async def chat(request: Request, body: ChatRequest):
 async def list_files(request: Request):
     try:
         check_ready(request)
+        cached_files = _file_list_cache.get("files")
+        if cached_files is not None:
+            return DefaultResponse(content=cached_files)
+        
         # User reported 'null' filenames.
         # Root cause: add_document sets 'filename', but this query was reading 'name'.
         query = "MATCH (d:Document) RETURN DISTINCT d.filename as filename, d.upload_time as time, d.size as size"
@@ -407,17 +648,18 @@ async def list_files(request: Request):
                 "upload_time": r.get("time"),
                 "size": r.get("size")
             })
-        return JSONResponse(content=files)
+        _file_list_cache.set("files", files)
+        return DefaultResponse(content=files)
     except Exception as e:
         logger.warning(f"Could not list files from Graph: {e}")
-        return JSONResponse(content=[])
+        return DefaultResponse(content=[])
 
 @app.delete("/api/files/{filename}")
 async def delete_file(request: Request, filename: str):
     try:
         # SECURITY FIX: Path Traversal
-        safe_filename = os.path.basename(filename)
-        if safe_filename != filename:
+        safe_filename = sanitize_filename(filename)
+        if safe_filename is None or safe_filename != filename:
              raise HTTPException(status_code=400, detail="Invalid filename format")
 
         logger.info(f"Received delete request for file: {safe_filename}")
@@ -429,6 +671,7 @@ async def delete_file(request: Request, filename: str):
             logger.warning("VectorStore missing delete_document method")
 
         # 2. Delete from Graph Store
+        document_buffer.discard(safe_filename)
         # Use the dedicated method which handles property names correctly (filename vs name)
         if hasattr(request.app.state.graph_store, 'delete_document'):
             request.app.state.graph_store.delete_document(safe_filename)
@@ -437,6 +680,8 @@ async def delete_file(request: Request, filename: str):
             query = "MATCH (d:Document {filename: $name}) DETACH DELETE d"
             request.app.state.graph_store.query(query, {"name": safe_filename})
         
+        invalidate_retrieval_cache()
+        _file_list_cache.clear()
         logger.info(f"File {safe_filename} deleted successfully from all stores.")
         return {"status": "deleted", "filename": safe_filename}
         
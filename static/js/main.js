@@ -11,7 +11,7 @@ const previewContent = document.getElementById('previewContent');
 const closeModal = document.querySelector('.close-modal');
 
 // State
-let pollingIntervals = {}; // taskId -> intervalId
+let pollingIntervals = {}; // taskId -> EventSource or intervalId
 
 // Initialize
 document.addEventListener('DOMContentLoaded', () => {
@@ -234,9 +234,65 @@ function updateTaskUI(taskId, data) {
     }
 }
 
+// Apply a task status update; returns true once the task has finished
+function handleTaskUpdate(taskId, data) {
+    updateTaskUI(taskId, data);
+
+    // UX Improvement: Notify when Vector Search is ready
+    // Check custom flag search_ready. 
+    // We use a local set to avoid spamming the toast.
+    if (data.search_ready && !taskIdToReadyState[taskId]) {
+        taskIdToReadyState[taskId] = true;
+        // Show toast
+        const toast = document.createElement('div');
+        toast.className = 'toast-notification';
+        toast.textContent = `✨ ${data.filename || "文件"} 向量处理完成，您可以开始提问了！(后台将继续构建图谱)`;
+        document.body.appendChild(toast);
+        setTimeout(() => {
+            toast.style.opacity = '0';
+            setTimeout(() => toast.remove(), 500);
+        }, 5000);
+
+        // Refresh file list so user can see it in sidebar
+        try {
+            loadFileList();
+        } catch (err) {
+            console.error("Failed to load file list:", err);
+        }
+    }
+
+    return data.status === 'completed' || data.status === 'error' || data.status === 'cancelled';
+}
+
 function startPolling(taskId) {
     if (pollingIntervals[taskId]) return;
 
+    // Prefer server push (SSE): updates arrive only when the task changes
+    if (window.EventSource) {
+        const source = new EventSource(`/api/task/${taskId}/stream`);
+        pollingIntervals[taskId] = source;
+        source.onmessage = (event) => {
+            if (handleTaskUpdate(taskId, JSON.parse(event.data))) {
+                source.close();
+                delete pollingIntervals[taskId];
+            }
+        };
+        source.onerror = () => {
+            // Connection refused (e.g. 404) -> fall back to interval polling
+            if (source.readyState === EventSource.CLOSED && pollingIntervals[taskId] === source) {
+                delete pollingIntervals[taskId];
+                startIntervalPolling(taskId);
+            }
+        };
+        return;
+    }
+
+    startIntervalPolling(taskId);
+}
+
+function startIntervalPolling(taskId) {
+    if (pollingIntervals[taskId]) return;
+
     pollingIntervals[taskId] = setInterval(async () => {
         try {
             // Anti-caching: append timestamp
@@ -246,32 +302,8 @@ function startPolling(taskId) {
                 return;
             }
             const data = await res.json();
-            updateTaskUI(taskId, data);
-
-            // UX Improvement: Notify when Vector Search is ready
-            // Check custom flag search_ready. 
-            // We use a local set to avoid spamming the toast.
-            if (data.search_ready && !taskIdToReadyState[taskId]) {
-                taskIdToReadyState[taskId] = true;
-                // Show toast
-                const toast = document.createElement('div');
-                toast.className = 'toast-notification';
-                toast.textContent = `✨ ${data.filename || "文件"} 向量处理完成，您可以开始提问了！(后台将继续构建图谱)`;
-                document.body.appendChild(toast);
-                setTimeout(() => {
-                    toast.style.opacity = '0';
-                    setTimeout(() => toast.remove(), 500);
-                }, 5000);
-
-                // Refresh file list so user can see it in sidebar
-                try {
-                    loadFileList();
-                } catch (err) {
-                    console.error("Failed to load file list:", err);
-                }
-            }
 
-            if (data.status === 'completed' || data.status === 'error' || data.status === 'cancelled') {
+            if (handleTaskUpdate(taskId, data)) {
                 clearInterval(pollingIntervals[taskId]);
                 delete pollingIntervals[taskId];
             }
@@ -1,10 +1,12 @@
 import google.genai as genai
 from dotenv import load_dotenv
+import functools
+import importlib.util
 import os
 import base64
-from PIL import Image
 import io
 import logging
+import re
 import httpx
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, before_sleep_log
 import sys
@@ -15,6 +17,49 @@ sys.stderr.reconfigure(encoding='utf-8')
 
 load_dotenv()
 
+# 默认实体抽取提示词 (未提供分级模板时使用)，{text} 为待分析文本
+DEFAULT_ENTITY_PROMPT = """你是一位资深的 IC 设计和 BCD 工艺专家。请从以下文本中提取实体和它们之间的关系：
+
+文本：{text}
+
+请按照以下格式输出：
+实体1,关系,实体2
+实体1,关系,实体3
+...
+
+关系类型包括：Defined_in, Restricted_by, Has_property, Connected_to, Used_in, etc.
+
+请只输出提取的内容，不要添加任何其他解释。"""
+
+# 批量抽取时附加在提示词末尾的分组输出要求
+BATCH_ENTITY_SUFFIX = """
+
+注意：以上共有 {count} 段文本，以“### 文本 编号”分隔。请按文本分组输出：每组先单独输出一行“### 文本 编号”，其后紧跟从该段文本中提取的 CSV 行；某段文本没有可提取的内容时只输出其标记行。"""
+
+@functools.lru_cache(maxsize=1)
+def _shared_genai_client():
+    """
+    进程内共享一个 genai.Client: 各 GeminiClient 实例复用同一组 keep-alive 连接，避免重复 TLS 握手
+    连接池大小由 settings.GEMINI_POOL_SIZE 控制；安装了 h2 时启用 HTTP/2 多路复用
+    """
+    from google.genai import types
+    from core.config import settings
+    
+    limits = httpx.Limits(
+        max_connections=settings.GEMINI_POOL_SIZE,
+        max_keepalive_connections=settings.GEMINI_POOL_SIZE
+    )
+    client_args = {"limits": limits, "http2": importlib.util.find_spec("h2") is not None}
+    return genai.Client(
+        api_key=os.getenv("GOOGLE_API_KEY"),
+        http_options=types.HttpOptions(client_args=client_args, async_client_args=dict(client_args))
+    )
+
+# 实体关系三元组 "实体1,关系,实体2"
+_TRIPLE_RE = re.compile(r"([^,]*),([^,]*),(.*)")
+
+_SECTION_RE = re.compile(r"^[#*\s]*文本\s*(\d+)[\s*:：]*$")
+
 class GeminiClient:
     def __init__(self):
         """
@@ -32,10 +77,8 @@ class GeminiClient:
             os.environ["HTTPS_PROXY"] = https_proxy
             os.environ["https_proxy"] = https_proxy
         
-        # 初始化客户端
-        self.client = genai.Client(
-            api_key=os.getenv("GOOGLE_API_KEY")
-        )
+        # 初始化客户端 (进程内共享)
+        self.client = _shared_genai_client()
         
         self.pro_model = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-pro")
         self.flash_model = os.getenv("GEMINI_FLASH_MODEL_NAME", "gemini-1.5-flash")
@@ -71,44 +114,201 @@ class GeminiClient:
             logging.error(f"[GeminiClient] 生成失败: {e}")
             return ""
     
+    def generate_text_stream(self, prompt: str, use_pro: bool = False, **kwargs):
+        """
+        流式生成文本，按行产出 (调用方可在生成过程中逐行解析，无需等待完整响应)
+        失败时记录错误并结束，已产出的行保留 (与 generate_text 失败返回空串一致，不抛异常)
+        """
+        model = self.pro_model if use_pro else self.flash_model
+        buffer = ""
+        try:
+            for chunk in self.client.models.generate_content_stream(
+                model=model,
+                contents=prompt,
+                config=kwargs
+            ):
+                text = getattr(chunk, 'text', None)
+                if not text:
+                    continue
+                buffer += text
+                *lines, buffer = buffer.split("\n")
+                yield from lines
+        except Exception as e:
+            logging.error(f"[GeminiClient] 流式生成失败: {e}")
+        if buffer:
+            yield buffer
+    
+    def _image_part(self, image_path: str = None, image_base64: str = None, image_bytes: bytes = None):
+        """
+        将图片原始字节直接封装为请求 Part (不经 PIL 解码再重新编码，仅在发送时编码一次)
+        """
+        from google.genai import types
+        
+        if image_bytes is None:
+            if image_path:
+                with open(image_path, "rb") as f:
+                    image_bytes = f.read()
+            elif image_base64:
+                image_bytes = base64.b64decode(image_base64)
+            else:
+                raise ValueError("必须提供 image_path、image_base64 或 image_bytes")
+        
+        # PIL 只在多模态请求时才需要，首次调用时再导入 (加快服务启动)
+        from PIL import Image
+        
+        # Image.open 只读取文件头识别格式，不解码像素
+        image_format = Image.open(io.BytesIO(image_bytes)).format
+        mime_type = Image.MIME.get(image_format, "image/png")
+        return types.Part.from_bytes(data=image_bytes, mime_type=mime_type)
+    
     @retry(
         stop=stop_after_attempt(3),
         wait=wait_exponential(multiplier=1, min=1, max=10),
         reraise=True,
         before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING)
     )
-    def generate_multimodal(self, prompt: str, image_path: str = None, image_base64: str = None, use_pro: bool = True) -> str:
+    def generate_multimodal(self, prompt: str, image_path: str = None, image_base64: str = None, use_pro: bool = True, image_bytes: bytes = None) -> str:
         """
         生成多模态内容
         """
         model = self.pro_model if use_pro else self.flash_model
         
-        contents = [prompt]
+        contents = [prompt, self._image_part(image_path, image_base64, image_bytes)]
+        
+        try:
+            response = self.client.models.generate_content(
+                model=model,
+                contents=contents
+            )
+            if hasattr(response, 'text') and response.text:
+                return response.text
+            else:
+                logging.warning(f"[GeminiClient] 多模态生成内容为空 or 被拦截。Response: {response}")
+                return ""
+        except Exception as e:
+            logging.error(f"[GeminiClient] 多模态生成失败: {e}")
+            return ""
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        reraise=True,
+        before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING)
+    )
+    def generate_multimodal_batch(self, prompt: str, images: list, use_pro: bool = True) -> str:
+        """
+        单次请求发送多张图片，每张图片前附带其标签，由模型按标签返回结果
         
-        if image_path:
-            image = Image.open(image_path)
-        elif image_base64:
-            image_data = base64.b64decode(image_base64)
-            image = Image.open(io.BytesIO(image_data))
-        else:
-            raise ValueError("必须提供 image_path 或 image_base64")
+        Args:
+            prompt: 批量任务说明
+            images: [(标签, image_base64), ...]
+        """
+        model = self.pro_model if use_pro else self.flash_model
         
-        contents.append(image)
+        contents = [prompt]
+        for label, image_base64 in images:
+            contents.append(f"{label}:")
+            contents.append(self._image_part(image_base64=image_base64))
         
         try:
             response = self.client.models.generate_content(
                 model=model,
                 contents=contents
             )
+            if hasattr(response, 'text') and response.text:
+                return response.text
+            else:
+                logging.warning(f"[GeminiClient] 多模态批量生成内容为空 or 被拦截。Response: {response}")
+                return ""
+        except Exception as e:
+            logging.error(f"[GeminiClient] 多模态批量生成失败: {e}")
+            return ""
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        reraise=True,
+        before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING)
+    )
+    async def generate_multimodal_batch_async(self, prompt: str, images: list, use_pro: bool = True) -> str:
+        """
+        多图批量请求 (异步版本)
+        """
+        model = self.pro_model if use_pro else self.flash_model
+
+        contents = [prompt]
+        for label, image_base64 in images:
+            contents.append(f"{label}:")
+            contents.append(self._image_part(image_base64=image_base64))
+
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=contents
+            )
+            if hasattr(response, 'text') and response.text:
+                return response.text
+            else:
+                logging.warning(f"[GeminiClient] 多模态批量生成内容为空 or 被拦截。Response: {response}")
+                return ""
+        except Exception as e:
+            logging.error(f"[GeminiClient] 异步多模态批量生成失败: {e}")
+            return ""
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        reraise=True,
+        before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING)
+    )
+    async def generate_text_async(self, prompt: str, use_pro: bool = False, **kwargs) -> str:
+        """
+        生成文本内容 (异步版本，基于 google-genai 的 aio 接口)
+        """
+        model = self.pro_model if use_pro else self.flash_model
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=prompt,
+                config=kwargs
+            )
+            if hasattr(response, 'text') and response.text:
+                return response.text
+            else:
+                logging.warning(f"[GeminiClient] 生成内容为空 or 被拦截。Response: {response}")
+                return ""
+        except Exception as e:
+            logging.error(f"[GeminiClient] 异步生成失败: {e}")
+            return ""
+
+    @retry(
+        stop=stop_after_attempt(3),
+        wait=wait_exponential(multiplier=1, min=1, max=10),
+        reraise=True,
+        before_sleep=before_sleep_log(logging.getLogger(__name__), logging.WARNING)
+    )
+    async def generate_multimodal_async(self, prompt: str, image_path: str = None, image_base64: str = None, use_pro: bool = True, image_bytes: bytes = None) -> str:
+        """
+        生成多模态内容 (异步版本)
+        """
+        model = self.pro_model if use_pro else self.flash_model
+
+        contents = [prompt, self._image_part(image_path, image_base64, image_bytes)]
+
+        try:
+            response = await self.client.aio.models.generate_content(
+                model=model,
+                contents=contents
+            )
             if hasattr(response, 'text') and response.text:
                 return response.text
             else:
                 logging.warning(f"[GeminiClient] 多模态生成内容为空 or 被拦截。Response: {response}")
                 return ""
         except Exception as e:
-            logging.error(f"[GeminiClient] 多模态生成失败: {e}")
+            logging.error(f"[GeminiClient] 异步多模态生成失败: {e}")
             return ""
-    
+
     def generate_embedding(self, text: str) -> list:
         """
         [DEPRECATED] 生成文本嵌入
@@ -125,51 +325,78 @@ class GeminiClient:
             prompt_template: 可选的自定义提示词模板，必须包含 {text} 占位符
         """
         logger = logging.getLogger(__name__)
-        logger.info(f"[LLM实体提取] 开始提取实体和关系 - 文本长度: {len(text)} 字符")
+        logger.info("[LLM实体提取] 开始提取实体和关系 - 文本长度: %d 字符", len(text))
         
-        if prompt_template:
-            prompt = prompt_template.format(text=text)
-        else:
-            # Default Fallback Prompt
-            prompt = f"""你是一位资深的 IC 设计和 BCD 工艺专家。请从以下文本中提取实体和它们之间的关系：
-
-文本：{text}
-
-请按照以下格式输出：
-实体1,关系,实体2
-实体1,关系,实体3
-...
-
-关系类型包括：Defined_in, Restricted_by, Has_property, Connected_to, Used_in, etc.
-
-请只输出提取的内容，不要添加任何其他解释。"""
-        
-        # logger.debug(f"[LLM实体提取] 生成的提示词: {prompt}")
-        response = self.generate_text(prompt, use_pro=True)
-        # logger.info(f"[LLM实体提取] LLM返回结果长度: {len(response)} 字符")
+        prompt = (prompt_template or DEFAULT_ENTITY_PROMPT).format(text=text)
         
+        # 流式接收，边生成边解析
         entities = []
-        lines = response.strip().split("\n")
-        
-        for line in lines:
-            line = line.strip()
-            if line:
-                # Handle CSV parsing robustly (some LLMs imply quotes)
-                # Quick & Dirty split by comma, improvement: use csv module if needed
-                parts = line.split(",")
-                if len(parts) >= 3:
-                    # Merge extra commas into the target if 3+ (simple heuristic)
-                    source = parts[0].strip()
-                    relation = parts[1].strip()
-                    target = ",".join(parts[2:]).strip() 
-                    
-                    entity_relation = {
-                        "source": source,
-                        "relation": relation,
-                        "target": target
-                    }
-                    entities.append(entity_relation)
-                    # logger.info(f"[LLM实体提取] 成功解析实体关系: {entity_relation}")
-        
-        logger.info(f"[LLM实体提取] 提取完成 - 共提取到 {len(entities)} 个实体关系")
+        for line in self.generate_text_stream(prompt, use_pro=True):
+            entity_relation = self._parse_entity_line(line)
+            if entity_relation:
+                entities.append(entity_relation)
+        
+        logger.info("[LLM实体提取] 提取完成 - 共提取到 %d 个实体关系", len(entities))
         return entities
+
+    def extract_entities_batch(self, texts: list, prompt_template: str = None) -> list:
+        """
+        单次请求从多段文本中提取实体和关系 (共用同一提示词前缀，N 段文本只需一次往返)
+        Args:
+            texts: 待分析文本列表
+            prompt_template: 可选的自定义提示词模板，必须包含 {text} 占位符
+        Returns:
+            与 texts 顺序一致的实体关系列表的列表
+            (响应中缺少某段文本的 "### 文本 N" 标记时，该段改为单独请求提取)
+        """
+        if len(texts) == 1:
+            return [self.extract_entities(texts[0], prompt_template)]
+        
+        logger = logging.getLogger(__name__)
+        logger.info("[LLM实体提取] 批量提取实体和关系 - 文本数: %d", len(texts))
+        
+        numbered_text = "\n\n".join(f"### 文本 {i}\n{text}" for i, text in enumerate(texts, 1))
+        prompt = (prompt_template or DEFAULT_ENTITY_PROMPT).format(text=numbered_text) + BATCH_ENTITY_SUFFIX.format(count=len(texts))
+        # 流式接收，按 "### 文本 N" 分组标记把 CSV 行归到对应文本；标记之前的行无法归属，丢弃
+        results = [[] for _ in texts]
+        seen_sections = set()
+        current = None
+        for line in self.generate_text_stream(prompt, use_pro=True):
+            match = _SECTION_RE.match(line.strip())
+            if match:
+                index = int(match.group(1)) - 1
+                current = index if 0 <= index < len(texts) else None
+                if current is not None:
+                    seen_sections.add(current)
+                continue
+            if current is None:
+                continue
+            entity_relation = self._parse_entity_line(line)
+            if entity_relation:
+                results[current].append(entity_relation)
+        
+        # 模型漏写或改写了分组标记 (或请求失败返回空) 时，缺失的文本逐段回退为单独提取，不静默丢弃
+        missing = [i for i in range(len(texts)) if i not in seen_sections]
+        if missing:
+            logger.warning("[LLM实体提取] 批量响应缺少 %d/%d 段文本的分组标记，逐段单独提取", len(missing), len(texts))
+            for i in missing:
+                results[i] = self.extract_entities(texts[i], prompt_template)
+        
+        logger.info("[LLM实体提取] 批量提取完成 - 共提取到 %d 个实体关系", sum(len(r) for r in results))
+        return results
+
+    @staticmethod
+    def _parse_entity_line(line: str) -> dict:
+        """
+        解析一行 "实体1,关系,实体2"，不是合法三元组时返回 None
+        """
+        # 单次预编译正则匹配代替 split + join；第二个逗号之后的内容 (含多余逗号) 全部归入目标实体
+        match = _TRIPLE_RE.match(line)
+        if not match:
+            return None
+        source, relation, target = match.groups()
+        return {
+            "source": source.strip(),
+            "relation": relation.strip(),
+            "target": target.strip()
+        }